@@ -0,0 +1,6 @@
+"""
+Caching, call coalescing and fan-out for backend calls
+
+Independent of any one service, so both the API (biolink) and the service
+clients (scigraph, ...) can use them without depending on each other.
+"""
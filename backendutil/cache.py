@@ -0,0 +1,276 @@
+"""
+Caches for backend results
+
+LRUCache is an in-process cache. SQLiteCache persists bytes to a file
+that several processes (e.g. gunicorn workers) can share. TieredCache
+puts the first in front of the second.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# returned by get() on a miss when no default is given
+MISSING = object()
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with optional expiry
+
+    Arguments
+    ---------
+    maxsize
+        maximum number of entries; the least recently used entry is evicted first
+
+    ttl
+        default time-to-live in seconds (None means entries never expire)
+
+    maxbytes
+        if set, also bound the total size of values, as measured by sizeof
+        (len by default, so suited to caches of bytes)
+    """
+    def __init__(self, maxsize=1024, ttl=None, maxbytes=None, sizeof=len):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        entry = self.get_entry(key)
+        if entry is None:
+            return default
+        return entry[0]
+
+    def get_entry(self, key):
+        """
+        Return (value, expires) for key, or None on a miss
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                (expires, value, size) = entry
+                if expires is None or expires > time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return (value, expires)
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires = None
+        if ttl is not None:
+            expires = time.time() + ttl
+        size = 0
+        if self.maxbytes is not None:
+            size = self.sizeof(value)
+            if size > self.maxbytes:
+                return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires, value, size)
+            self.nbytes += size
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self.nbytes > self.maxbytes):
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key):
+        (_, _, size) = self._data.pop(key)
+        self.nbytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {'size': len(self._data),
+                'maxsize': self.maxsize,
+                'bytes': self.nbytes,
+                'maxbytes': self.maxbytes,
+                'hits': self.hits,
+                'misses': self.misses}
+
+class SQLiteCache:
+    """
+    Cache of bytes values in an SQLite file
+
+    Processes that point at the same file share entries, so a result fetched
+    by one gunicorn worker is a hit for the others.
+
+    Arguments
+    ---------
+    path
+        location of the SQLite file, and of any missing parent directories,
+        created on first use
+
+    ttl
+        default time-to-live in seconds (None means entries never expire)
+
+    purge_every
+        expired entries are deleted after this many puts by this process
+        (None means only when purge_expired is called)
+    """
+    def __init__(self, path, ttl=None, timeout=5, purge_every=1000):
+        self.path = path
+        self.ttl = ttl
+        self.timeout = timeout
+        self.purge_every = purge_every
+        self.hits = 0
+        self.misses = 0
+        self.purged = 0
+        self._puts = 0
+        self._puts_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite connections may not be shared between threads or forked processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            parent = os.path.dirname(self.path)
+            if parent != '':
+                os.makedirs(parent, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, default=MISSING):
+        entry = self.get_entry(key)
+        if entry is None:
+            return default
+        return entry[0]
+
+    def get_entry(self, key):
+        """
+        Return (value, expires) for key, or None on a miss
+        """
+        try:
+            row = self._connection().execute('SELECT value, expires FROM cache WHERE key=?', (key,)).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logging.warning("Cache read failed: {}".format(e))
+            row = None
+        if row is not None and (row[1] is None or row[1] > time.time()):
+            self.hits += 1
+            return (bytes(row[0]), row[1])
+        self.misses += 1
+        return None
+
+    def put(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires = None
+        if ttl is not None:
+            expires = time.time() + ttl
+        try:
+            with self._connection() as conn:
+                conn.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?,?,?)',
+                             (key, sqlite3.Binary(value), expires))
+        except (sqlite3.Error, OSError) as e:
+            logging.warning("Cache write failed: {}".format(e))
+        if self.purge_every is not None:
+            with self._puts_lock:
+                self._puts += 1
+                purge = self._puts % self.purge_every == 0
+            if purge:
+                try:
+                    self.purge_expired()
+                except sqlite3.Error as e:
+                    logging.warning("Cache purge failed: {}".format(e))
+
+    def purge_expired(self):
+        """
+        Delete expired entries, returning how many were deleted
+        """
+        with self._connection() as conn:
+            n = conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),)).rowcount
+        self.purged += n
+        return n
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM cache')
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def stats(self):
+        return {'path': self.path,
+                'size': len(self),
+                'hits': self.hits,
+                'misses': self.misses,
+                'purged': self.purged}
+
+class TieredCache:
+    """
+    In-process cache backed by an optional shared cache
+
+    Hits in the shared tier are copied into the in-process tier for the
+    remainder of their lifetime.
+    """
+    def __init__(self, memory, shared=None):
+        self.memory = memory
+        self.shared = shared
+
+    def get(self, key, default=MISSING):
+        entry = self.memory.get_entry(key)
+        if entry is None and self.shared is not None:
+            entry = self.shared.get_entry(key)
+            if entry is not None:
+                (value, expires) = entry
+                ttl = None
+                if expires is not None:
+                    ttl = expires - time.time()
+                self.memory.put(key, value, ttl=ttl)
+        if entry is None:
+            return default
+        return entry[0]
+
+    def put(self, key, value, ttl=None):
+        self.memory.put(key, value, ttl=ttl)
+        if self.shared is not None:
+            self.shared.put(key, value, ttl=ttl)
+
+    def clear(self):
+        self.memory.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        stats = {'memory': self.memory.stats()}
+        if self.shared is not None:
+            stats['shared'] = self.shared.stats()
+        return stats
+
+def make_key(prefix, kwargs):
+    """
+    Normalized cache key for a call with keyword arguments
+
+    Arguments that are None are dropped and the remainder are serialized
+    with sorted keys. Returns None if an argument cannot be serialized,
+    in which case the call should not be cached.
+    """
+    norm = {k: v for (k, v) in kwargs.items() if v is not None}
+    try:
+        s = json.dumps(norm, sort_keys=True)
+    except TypeError:
+        return None
+    return prefix + ':' + hashlib.sha1(s.encode('utf-8')).hexdigest()
@@ -0,0 +1,111 @@
+"""
+Run independent backend calls concurrently and collect their results.
+
+Typical use is assembling a composite object from one object fetch plus
+several association queries:
+
+    fo = FanOut()
+    fo.add('obj', scigraph.bioobject, id, 'Gene')
+    fo.add('phenotype', search_associations, subject=id, object_category='phenotype')
+    r = fo.run()
+    obj = r.get('obj')
+
+Under gunicorn/gevent the worker threads are monkey-patched into greenlets,
+so the pool costs no more than spawning greenlets directly.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 20
+
+class FanOutResult:
+    """
+    Results of a fan-out, keyed by branch
+
+    Branches that raised or ran out of time appear in errors (mapped to the
+    exception) rather than in results.
+    """
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+
+    def get(self, key, default=None):
+        return self.results.get(key, default)
+
+    def is_complete(self):
+        return len(self.errors) == 0
+
+    def failed(self):
+        """
+        Sorted list of branch keys that did not produce a result
+        """
+        return sorted(self.errors.keys())
+
+    def raise_for_errors(self):
+        """
+        Re-raise the error of the first failed branch, if any
+        """
+        if not self.is_complete():
+            raise self.errors[self.failed()[0]]
+
+class FanOut:
+    """
+    Bounded pool of concurrent calls for a single request
+
+    Arguments
+    ---------
+    max_workers
+        maximum number of calls in flight at once
+
+    timeout
+        default per-branch timeout in seconds, counted from the start of run()
+    """
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.branches = []
+
+    def add(self, key, fn, *args, timeout=None, **kwargs):
+        """
+        Register a call fn(*args, **kwargs) under key
+
+        timeout overrides the default for this branch only
+        """
+        if timeout is None:
+            timeout = self.timeout
+        self.branches.append((key, fn, args, kwargs, timeout))
+        return self
+
+    def run(self):
+        """
+        Run all branches concurrently and wait for them
+
+        Never raises on a branch failure; check FanOutResult.errors.
+        Branches that time out are abandoned, the caller does not wait for them.
+        """
+        result = FanOutResult()
+        if len(self.branches) == 0:
+            return result
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.branches)))
+        start = time.time()
+        try:
+            futures = [(key, executor.submit(fn, *args, **kwargs), timeout)
+                       for (key, fn, args, kwargs, timeout) in self.branches]
+            for (key, future, timeout) in futures:
+                remaining = max(0, start + timeout - time.time())
+                try:
+                    result.results[key] = future.result(timeout=remaining)
+                except TimeoutError:
+                    future.cancel()
+                    logging.warning("Branch {} timed out after {}s".format(key, timeout))
+                    result.errors[key] = TimeoutError("{} timed out after {}s".format(key, timeout))
+                except Exception as e:
+                    logging.warning("Branch {} failed: {}".format(key, e))
+                    result.errors[key] = e
+        finally:
+            executor.shutdown(wait=False)
+        logging.info("Fan-out of {} branches took {:.3f}s".format(len(self.branches), time.time() - start))
+        return result
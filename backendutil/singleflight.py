@@ -0,0 +1,67 @@
+"""
+Coalesce identical concurrent backend calls
+
+When many requests (threads or greenlets) ask for the same thing at once,
+only the first one calls the backend; the others wait for it and receive
+the same result, or the same exception.
+
+    flight = SingleFlight()
+    r = flight.do(key, fn, *args, **kwargs)
+
+The result object is shared by all waiting callers, so callers must not
+modify it; wrap fn to return an immutable form (e.g. bytes) if they do.
+"""
+
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Group of in-flight calls, keyed by a hashable description of the call
+    """
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Call fn(*args, **kwargs), unless a call with the same key is in flight,
+        in which case wait for that call and return its result
+        """
+        with self._lock:
+            call = self._inflight.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._inflight[key] = call
+                self.calls += 1
+                leader = True
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    def stats(self):
+        return {'calls': self.calls,
+                'shared': self.shared,
+                'in_flight': len(self._inflight)}
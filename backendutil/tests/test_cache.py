@@ -0,0 +1,71 @@
+import time
+from backendutil.cache import LRUCache, SQLiteCache, TieredCache, make_key, MISSING
+
+def test_lru_eviction():
+    c = LRUCache(maxsize=2)
+    c.put('a', 1)
+    c.put('b', 2)
+    assert c.get('a') == 1
+    c.put('c', 3)
+    assert c.get('b') is MISSING
+    assert c.get('a') == 1
+    assert c.get('c') == 3
+    assert c.stats()['hits'] == 3
+    assert c.stats()['misses'] == 1
+
+def test_ttl():
+    c = LRUCache(ttl=0.05)
+    c.put('a', None)
+    c.put('b', 2, ttl=10)
+    assert c.get('a') is None
+    time.sleep(0.1)
+    assert c.get('a', 'gone') == 'gone'
+    assert c.get('b') == 2
+
+def test_maxbytes():
+    c = LRUCache(maxbytes=10)
+    c.put('a', b'12345')
+    c.put('b', b'12345')
+    c.put('c', b'123')
+    assert c.get('a') is MISSING
+    assert c.get('b') == b'12345'
+    assert c.stats()['bytes'] == 8
+    c.put('d', b'x' * 11)
+    assert c.get('d') is MISSING
+
+def test_tiered(tmpdir):
+    path = str(tmpdir.join('cache.db'))
+    c1 = TieredCache(LRUCache(), SQLiteCache(path, ttl=10))
+    c2 = TieredCache(LRUCache(), SQLiteCache(path, ttl=10))
+    c1.put('a', b'abc')
+    assert c2.get('a') == b'abc'
+    assert c2.memory.get('a') == b'abc'
+    assert c2.get('b') is MISSING
+    assert c2.stats()['shared']['hits'] == 1
+    assert c2.stats()['shared']['misses'] == 1
+
+def test_sqlite_purge(tmpdir):
+    c = SQLiteCache(str(tmpdir.join('cache.db')), purge_every=3)
+    c.put('a', b'1', ttl=0.01)
+    c.put('b', b'2', ttl=0.01)
+    time.sleep(0.05)
+    assert len(c) == 2
+    # the third put purges the two expired entries
+    c.put('c', b'3')
+    assert len(c) == 1
+    assert c.get('c') == b'3'
+    assert c.stats()['purged'] == 2
+
+def test_make_key():
+    assert make_key('p', {'a': 1, 'b': None}) == make_key('p', {'a': 1})
+    assert make_key('p', {'a': 1}) != make_key('p', {'a': 2})
+    assert make_key('p', {'a': object()}) is None
+
+def test_sqlite_created_on_first_use(tmpdir):
+    path = tmpdir.join('sub', 'cache.db')
+    c = SQLiteCache(str(path))
+    assert not path.exists()
+    assert c.get('a', None) is None
+    c.put('a', b'1')
+    assert path.exists()
+    assert c.get('a') == b'1'
@@ -0,0 +1,29 @@
+import time
+from backendutil.fanout import FanOut
+
+def slow(x, delay=0.2):
+    time.sleep(delay)
+    return x
+
+def fail():
+    raise ValueError("backend down")
+
+def test_concurrent():
+    fo = FanOut()
+    for i in range(4):
+        fo.add(i, slow, i)
+    t = time.time()
+    r = fo.run()
+    assert time.time() - t < 0.5
+    assert r.is_complete()
+    assert [r.get(i) for i in range(4)] == [0, 1, 2, 3]
+
+def test_partial_results():
+    fo = FanOut()
+    fo.add('ok', slow, 'x', delay=0)
+    fo.add('bad', fail)
+    fo.add('slow', slow, 'y', delay=1, timeout=0.1)
+    r = fo.run()
+    assert r.get('ok') == 'x'
+    assert r.failed() == ['bad', 'slow']
+    assert isinstance(r.errors['bad'], ValueError)
@@ -0,0 +1,45 @@
+import threading
+import time
+import pytest
+from backendutil.singleflight import SingleFlight
+
+def run_concurrently(n, fn):
+    results = [None] * n
+    def target(i):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def test_coalesce():
+    flight = SingleFlight()
+    calls = []
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return x * 2
+    results = run_concurrently(10, lambda: flight.do('k', slow, 21))
+    assert results == [42] * 10
+    assert len(calls) == 1
+    assert flight.stats()['shared'] == 9
+    assert flight.stats()['in_flight'] == 0
+    # once finished, the next call goes to the backend again
+    assert flight.do('k', slow, 1) == 2
+    assert len(calls) == 2
+
+def test_errors_shared():
+    flight = SingleFlight()
+    def fail():
+        time.sleep(0.2)
+        raise ValueError('backend down')
+    results = run_concurrently(5, lambda: flight.do('k', fail))
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.stats()['calls'] == 1
+    with pytest.raises(ValueError):
+        flight.do('k', fail)
@@ -5,8 +5,10 @@ from flask_restplus import Resource
 from biolink.datamodel.serializers import node, named_object, bio_object, association_results, association, publication, gene, substance, genotype, allele, search_result
 #import biolink.datamodel.serializers
 from biolink.api.restplus import api
-from ontobio.golr.golr_associations import search_associations, search_associations_go, select_distinct_subjects
+from ontobio.golr.golr_associations import search_associations_go
+from biolink.golr.associations import search_associations, select_distinct_subjects
 from scigraph.scigraph_util import SciGraph
+from backendutil.fanout import FanOut
 from biowikidata.wd_sparql import doid_to_wikidata, resolve_to_wikidata, condition_to_drug
 from ontobio.vocabulary.relations import HomologyTypes
 
@@ -27,26 +29,48 @@ core_parser.add_argument('evidence', help="""Object id, e.g. ECO:0000501 (for IE
                     or a specific publication or other supporting ibject, e.g. ZFIN:ZDB-PUB-060503-2.
                     """)
 
-scigraph = SciGraph('https://scigraph-data.monarchinitiative.org/scigraph/')
+scigraph = SciGraph('https://scigraph-data.monarchinitiative.org/scigraph/', endpoint='scigraph_data')
 
 homol_rel = HomologyTypes.Homolog.value
 
+FANOUT_TIMEOUT = 20
+
+def get_object_with_associations(id, class_name, assoc_queries, **args):
+        """
+        Fetch an object plus several association sets concurrently
+
+        assoc_queries maps the attribute to be populated on the object to the
+        search_associations arguments for that set. Sets that fail or time out
+        are left empty and listed in incomplete_associations.
+        """
+        fo = FanOut(timeout=FANOUT_TIMEOUT)
+        fo.add('object', scigraph.bioobject, id, class_name)
+        for (attr, qargs) in assoc_queries.items():
+            fo.add(attr, search_associations, subject=id, **dict(args, **qargs))
+        r = fo.run()
+        if 'object' in r.errors:
+            raise r.errors['object']
+
+        obj = r.get('object')
+        for attr in assoc_queries.keys():
+            setattr(obj, attr, r.get(attr, {}).get('associations', []))
+        obj.incomplete_associations = r.failed()
+        return obj
+
 def get_object_gene(id, **args):
-        obj = scigraph.bioobject(id, 'Gene')
-        obj.phenotype_associations = search_associations(subject=id, object_category='phenotype', **args)['associations']
-        obj.homology_associations = search_associations(subject=id, rel=homol_rel, object_category='gene', **args)['associations']
-        obj.disease_associations = search_associations(subject=id, object_category='disease', **args)['associations']
-        obj.genotype_associations = search_associations(subject=id, invert_subject_object=True, object_category='genotype', **args)['associations']
-        
-        return(obj)
+        return get_object_with_associations(id, 'Gene', {
+            'phenotype_associations': {'object_category': 'phenotype'},
+            'homology_associations': {'rel': homol_rel, 'object_category': 'gene'},
+            'disease_associations': {'object_category': 'disease'},
+            'genotype_associations': {'invert_subject_object': True, 'object_category': 'genotype'},
+        }, **args)
 
 def get_object_genotype(id, **args):
-        obj = scigraph.bioobject(id, 'Genotype')
-        obj.phenotype_associations = search_associations(subject=id, object_category='phenotype', **args)['associations']
-        obj.disease_associations = search_associations(subject=id, object_category='disease', **args)['associations']
-        obj.gene_associations = search_associations(subject=id, object_category='gene', **args)['associations']
-        
-        return(obj)
+        return get_object_with_associations(id, 'Genotype', {
+            'phenotype_associations': {'object_category': 'phenotype'},
+            'disease_associations': {'object_category': 'disease'},
+            'gene_associations': {'object_category': 'gene'},
+        }, **args)
     
 @ns.route('/<id>')
 @api.doc(params={'id': 'id, e.g. NCBIGene:84570'})
@@ -210,7 +234,7 @@ class GeneFunctionAssociations(AbstractGeneAssociationResource):
             # Note that GO currently uses UniProt as primary ID for some sources: https://github.com/biolink/biolink-api/issues/66
             # https://github.com/monarch-initiative/dipper/issues/461   
             logging.debug("Found no associations using {} - will try mapping to other IDs".format(id))
-            sg_dev = SciGraph(url='https://scigraph-data-dev.monarchinitiative.org/scigraph/')
+            sg_dev = SciGraph(url='https://scigraph-data-dev.monarchinitiative.org/scigraph/', endpoint='scigraph_data')
             prots = sg_dev.gene_to_uniprot_proteins(id)
             for prot in prots:
                 pr_assocs = search_associations(
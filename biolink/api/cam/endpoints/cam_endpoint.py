@@ -1,10 +1,10 @@
 import logging
 
-from flask import request
+from flask import request, abort
 from flask_restplus import Resource
 from biolink.datamodel.serializers import association
 from biolink.api.restplus import api
-from causalmodels.lego_sparql_util import lego_query, ModelQuery
+from causalmodels.lego_sparql_util import lego_query, model_query, ModelQuery
 
 log = logging.getLogger(__name__)
 
@@ -118,11 +118,10 @@ class Model(Resource):
         Returns a complete model
         """
         args = parser.parse_args()
-        return lego_query("""
-        CONSTRUCT { ?i ?p ?v } WHERE 
-        {?i rdfs:isDefinedBy <http://model.geneontology.org/%s>; 
-           ?p ?v
-        }""" % id, limit=1000)
+        try:
+            return model_query(id, limit=1000)
+        except ValueError as e:
+            abort(400, str(e))
 
         return []
 
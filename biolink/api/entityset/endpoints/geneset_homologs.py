@@ -1,40 +1,41 @@
 import logging
 
-from flask import request
-from flask_restplus import Resource
+from flask import request, Response, stream_with_context
+from flask_restplus import Resource, marshal
 from biolink.datamodel.serializers import compact_association_set, association_results
-from ontobio.golr.golr_associations import search_associations, GolrFields
+from ontobio.golr.golr_associations import GolrFields
+from biolink.golr.bulk import iter_subject_set, merge_compact
+from biolink.util.stream import ndjson_lines, encoded_chunks
 
 from biolink.api.restplus import api
 import pysolr
 
-MAX_ROWS=10000
-
 log = logging.getLogger(__name__)
 
 ns = api.namespace('bioentityset/homologs', description='Map gene IDs to their homologs')
 
 parser = api.parser()
 parser.add_argument('subject', action='append', help='Entity ids to be examined, e.g. NCBIGene:9342, NCBIGene:7227, NCBIGene:8131, NCBIGene:157570, NCBIGene:51164, NCBIGene:6689, NCBIGene:6387')
+parser.add_argument('format', choices=['json', 'ndjson'], default='json', help='ndjson streams one compact association per line as chunks of the set complete')
 
 @ns.route('/')
 class EntitySetHomologs(Resource):
 
     @api.expect(parser)
-    @api.marshal_list_with(compact_association_set)
+    @api.response(200, 'Success', [compact_association_set])
     def get(self):
         """
         Returns homology associations for a given input set of genes
+
+        Large sets are fetched in concurrent chunks, each paged through in full.
         """
         args = parser.parse_args()
 
         M=GolrFields()
         rel = 'RO:0002434'  # TODO; allow other types
-        results = search_associations(subjects=args.get('subject'),
-                                      select_fields=[M.SUBJECT, M.RELATION, M.OBJECT],
-                                      use_compact_associations=True,
-                                      relation=rel,
-                                      rows=MAX_ROWS,
-                                      facet_fields=[],
-                                      **args)
-        return results
+        rows = iter_subject_set(args.get('subject') or [],
+                                select_fields=[M.SUBJECT, M.SUBJECT_LABEL, M.RELATION, M.OBJECT],
+                                relation=rel)
+        if args.get('format') == 'ndjson':
+            return Response(stream_with_context(encoded_chunks(ndjson_lines(rows))), mimetype='application/x-ndjson')
+        return marshal(merge_compact(rows), compact_association_set)
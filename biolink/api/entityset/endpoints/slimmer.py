@@ -46,7 +46,7 @@ class EntitySetSlimmer(Resource):
             # nota bene:
             # currently incomplete because code is not checking for the possibility of >1 subjects
             logging.info("Found no associations using {} - will try mapping to other IDs".format(subjects[0]))
-            sg_dev = SciGraph(url='https://scigraph-data-dev.monarchinitiative.org/scigraph/')
+            sg_dev = SciGraph(url='https://scigraph-data-dev.monarchinitiative.org/scigraph/', endpoint='scigraph_data')
             prots = sg_dev.gene_to_uniprot_proteins(subjects[0])
             if len(prots) > 0:
                 results = map2slim(subjects=prots,
@@ -1,11 +1,17 @@
 import logging
 
-from flask import request
-from flask_restplus import Resource
+from flask import request, abort, Response, stream_with_context
+from flask_restplus import Resource, marshal
 from biolink.datamodel.serializers import compact_association_set, association_results
-from ontobio.golr.golr_associations import search_associations, GolrFields
+from ontobio.golr.golr_associations import GolrFields
 
 from biolink.api.restplus import api
+from biolink.enrichment.ora import count_terms, over_representation, CORRECTIONS
+from biolink.golr.associations import search_associations
+from biolink.golr.annotations import annotation_pairs
+from biolink.enrichment.background import backgrounds
+from biolink.golr.bulk import iter_subject_set, merge_compact
+from biolink.util.stream import ndjson_lines, encoded_chunks
 import pysolr
 
 MAX_ROWS=10000
@@ -21,16 +27,50 @@ parser.add_argument('background', action='append', help='Entity ids in backgroun
 parser.add_argument('object_category', help='E.g. phenotype, function')
 parser.add_argument('object_slim', help='Slim or subset to which the descriptors are to be mapped, NOT IMPLEMENTED')
 
+associations_parser = parser.copy()
+associations_parser.add_argument('format', choices=['json', 'ndjson'], default='json', help='ndjson streams one compact association per line as chunks of the set complete')
+
+counts_parser = parser.copy()
+counts_parser.add_argument('taxon', help='If set, count distinct subjects per descriptor, in the set and genome-wide for this taxon, e.g. NCBITaxon:9606; if no subjects are given, only the genome-wide counts are returned')
+counts_parser.add_argument('subject_category', default='gene', help='CATEGORY of the genome-wide subjects counted with taxon, e.g. gene, disease')
+
+ora_parser = parser.copy()
+ora_parser.add_argument('taxon', help='Use all entities of this taxon as the background, e.g. NCBITaxon:9606; ignored if a background set is given')
+ora_parser.add_argument('subject_category', default='gene', help='CATEGORY of the entities of the taxon used as the background, e.g. gene, disease')
+ora_parser.add_argument('correction', choices=CORRECTIONS, default='bh', help='Multiple testing correction: bh (Benjamini-Hochberg), bonferroni or none')
+ora_parser.add_argument('max_p_value', type=float, help='If set, only return terms whose adjusted p-value is at most this')
+
 @ns.route('/descriptor/counts/')
 class EntitySetSummary(Resource):
 
-    @api.expect(parser)
+    @api.expect(counts_parser)
     #@api.marshal_list_with(association)
     def get(self):
         """
         Summary statistics for objects associated
+
+        Without a taxon, results are numbers of associations per descriptor.
+        With a taxon, results, background and their totals are all numbers
+        of distinct subjects, as used by the over-representation test.
         """
-        args = parser.parse_args()
+        args = counts_parser.parse_args()
+        taxon = args.pop('taxon', None)
+        subject_category = args.pop('subject_category', None) or 'gene'
+        if taxon is not None:
+            object_category = args.get('object_category')
+            if object_category is None:
+                abort(400, "object_category is required with taxon")
+            background = backgrounds.get(taxon, object_category, subject_category)
+            if args.get('subject') is None:
+                return {'results': dict(zip(background.terms, background.counts.tolist())),
+                        'facets': {},
+                        'background_total': background.total}
+            sample = count_terms(annotation_pairs(args.get('subject'), object_category))
+            return {'results': dict(zip(sample.terms, sample.counts.tolist())),
+                    'facets': {},
+                    'total': sample.total,
+                    'background': dict(zip(sample.terms, background.lookup_ids(sample.ids).tolist())),
+                    'background_total': background.total}
 
         M=GolrFields()
         results = search_associations(subjects=args.get('subject'),
@@ -38,7 +78,6 @@ class EntitySetSummary(Resource):
                                       facet_fields=[M.OBJECT_CLOSURE, M.IS_DEFINED_BY],
                                       facet_limit=-1,
                                       **args)
-        print("RESULTS="+str(results))
         obj_count_dict = results['facet_counts'][M.OBJECT_CLOSURE]
         del results['facet_counts'][M.OBJECT_CLOSURE]
         return {'results':obj_count_dict, 'facets': results['facet_counts']}
@@ -47,29 +86,25 @@ class EntitySetSummary(Resource):
 @ns.route('/associations/')
 class EntitySetAssociations(Resource):
 
-    @api.expect(parser)
-    @api.marshal_list_with(association_results)
+    @api.expect(associations_parser)
+    @api.response(200, 'Success', association_results)
     #@api.marshal_list_with(compact_association_set)
     def get(self):
         """
         Returns compact associations for a given input set
+
+        Large sets are fetched in concurrent chunks, each paged through in full.
         """
-        args = parser.parse_args()
+        args = associations_parser.parse_args()
 
         M=GolrFields()
-        #results = search_associations(subjects=args.get('subject'),
-        #                              rows=0,
-        #                              pivot_subject_object=True,
-        #                              facet_fields=[],
-        #                              facet_limit=-1,
-        #                              **args)
-        results = search_associations(subjects=args.get('subject'),
-                                      select_fields=[M.SUBJECT, M.RELATION, M.OBJECT],
-                                      use_compact_associations=True,
-                                      rows=MAX_ROWS,
-                                      facet_fields=[],
-                                      **args)
-        return results
+        rows = iter_subject_set(args.get('subject') or [],
+                                object_category=args.get('object_category'),
+                                select_fields=[M.SUBJECT, M.SUBJECT_LABEL, M.RELATION, M.OBJECT])
+        if args.get('format') == 'ndjson':
+            return Response(stream_with_context(encoded_chunks(ndjson_lines(rows))), mimetype='application/x-ndjson')
+        assocs = merge_compact(rows)
+        return marshal({'compact_associations': assocs, 'numFound': len(assocs)}, association_results)
 
 #@ns.route('/DEPRECATEDhomologs/')
 #class EntitySetHomologsDEPRECATED(Resource):
@@ -100,14 +135,43 @@ class EntitySetAssociations(Resource):
 @api.doc(params={'object_category': 'CATEGORY of entity at link OBJECT (target), e.g. phenotype, disease'})
 class EntitySetOverRepresentationAnalysis(Resource):
 
-    @api.expect(parser)
+    @api.expect(ora_parser)
     def get(self, object_category=None):
         """
-        TODO Over-representation analysis
-        """
-        args = parser.parse_args()
+        Over-representation analysis
 
-        return "TODO"    
+        Tests every term annotated to the subject set, directly or via the
+        ontology closure, for over-representation relative to the background
+        set, or to all entities of a taxon (hypergeometric test), and returns
+        terms ranked by p-value.
+        """
+        args = ora_parser.parse_args()
+        if object_category is None:
+            object_category = args.get('object_category')
+        sample = args.get('subject') or []
+        background = args.get('background') or []
+        if len(sample) == 0:
+            abort(400, "A subject set is required")
+        if len(background) == 0 and args.get('taxon') is None:
+            abort(400, "Either a background set or a taxon is required")
+        if object_category is None:
+            abort(400, "object_category is required")
+
+        if len(background) == 0:
+            sample_counts = count_terms(annotation_pairs(sample, object_category))
+            background_counts = backgrounds.get(args.get('taxon'), object_category, args.get('subject_category') or 'gene')
+        else:
+            # one query for both sets; the sample is counted as part of the background
+            pairs = annotation_pairs(sorted(set(sample) | set(background)), object_category)
+            sample_counts = count_terms(pairs, sample)
+            background_counts = count_terms(pairs, set(sample) | set(background))
+        try:
+            return over_representation(sample_counts, background_counts,
+                                       correction=args.get('correction'),
+                                       max_p_value=args.get('max_p_value'))
+        except ValueError as e:
+            # e.g. subjects outside the taxon of the background
+            abort(400, "Sample is not part of the background: {}".format(e))
     
 @ns.route('/graph/')
 class EntitySetGraphResource(Resource):
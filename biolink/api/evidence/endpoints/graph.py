@@ -3,7 +3,7 @@ import logging
 from flask import request, send_file
 from flask_restplus import Resource
 from biolink.datamodel.serializers import association, bbop_graph
-from ontobio.golr.golr_associations import get_association, search_associations
+from biolink.golr.associations import get_association, search_associations
 from biolink.api.restplus import api
 from ontobio.obograph_util import convert_json_object
 import tempfile
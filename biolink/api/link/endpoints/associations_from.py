@@ -4,7 +4,7 @@ from flask import request
 from flask_restplus import Resource
 from biolink.datamodel.serializers import association, association_results
 from biolink.api.restplus import api
-from ontobio.golr.golr_associations import get_association, search_associations
+from biolink.golr.associations import search_associations
 import pysolr
 
 log = logging.getLogger(__name__)
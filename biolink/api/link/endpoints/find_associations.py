@@ -4,7 +4,8 @@ from flask import request
 from flask_restplus import Resource
 from biolink.datamodel.serializers import association, association_results
 from biolink.api.restplus import api
-from ontobio.golr.golr_associations import get_association, search_associations, GolrFields
+from ontobio.golr.golr_associations import GolrFields
+from biolink.golr.associations import get_association, search_associations
 import pysolr
 
 log = logging.getLogger(__name__)
@@ -71,7 +72,7 @@ class AssociationSearch(Resource):
         """
         args = parser.parse_args()
 
-        return search_associations(subject_category, object_category, **args)
+        return search_associations(subject_category=subject_category, object_category=object_category, **args)
 
     
     
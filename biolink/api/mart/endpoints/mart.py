@@ -1,11 +1,16 @@
 import logging
+import os
 
 from flask import request
 from flask import abort
-from flask_restplus import Resource
+from flask import Response, stream_with_context, send_file
+from flask_restplus import Resource, inputs
 from biolink.api.restplus import api
+from biolink.golr.bulk import iter_compact_associations, COMPACT_COLUMNS
+from biolink.golr.export import exports
+from biolink.golr.snapshot import snapshots
+from biolink.util.stream import ndjson_lines, tsv_lines, encoded_chunks, gzip_chunks
 from ontobio.golr.golr_associations import bulk_fetch
-from ontobio.golr.golr_associations import search_associations
 from ontobio.golr.golr_associations import MAX_ROWS
 from biolink.datamodel.serializers import compact_association_set
 
@@ -27,6 +32,54 @@ ns = api.namespace('mart', description='Bulk operations')
 
 parser = api.parser()
 parser.add_argument('slim', action='append', help='Map objects up (slim) to a higher level category. Value can be ontology class ID or subset ID')
+parser.add_argument('format', choices=['json', 'ndjson', 'tsv'], default='json', help='json returns a single document; ndjson and tsv are streamed row by row as results arrive')
+parser.add_argument('gzip', type=inputs.boolean, default=False, help='If true, gzip-compress a streamed (ndjson or tsv) response')
+
+def bulk_response(subject_category, object_category, taxon):
+    """
+    Fetch associations in bulk, streaming them if a streamed format was requested
+
+    Served from a precomputed snapshot when there is one for the current version.
+    """
+    args = parser.parse_args()
+    snapshot = snapshots.get(subject_category, object_category, taxon)
+    if args.format == 'json':
+        if snapshot is not None:
+            return list(snapshot.rows())
+        return bulk_fetch(subject_category=subject_category,
+                          object_category=object_category,
+                          taxon=taxon,
+                          iterate=True)
+    if snapshot is not None:
+        rows = snapshot.rows()
+    else:
+        rows = iter_compact_associations(subject_category, object_category, taxon)
+    if args.format == 'tsv':
+        (lines, mimetype) = (tsv_lines(rows, COMPACT_COLUMNS), 'text/tab-separated-values')
+    else:
+        (lines, mimetype) = (ndjson_lines(rows), 'application/x-ndjson')
+    chunks = encoded_chunks(lines)
+    headers = {}
+    if args.gzip:
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+export_parser = api.parser()
+export_parser.add_argument('format', choices=['ndjson', 'tsv'], default='ndjson', help='format of the exported part files (always gzipped)')
+
+def submit_export(subject_category, object_category, taxon):
+    """
+    Queue a background export job, see MartExportJobResource for its status
+    """
+    args = export_parser.parse_args()
+    job = exports.submit(subject_category, object_category, taxon, format=args.format)
+    return with_links(job), 202
+
+def with_links(job):
+    job['url'] = api.url_for(MartExportJobResource, job_id=job['id'])
+    job['downloads'] = [api.url_for(MartExportPartResource, job_id=job['id'], part=part) for part in job['parts']]
+    return job
 
 @ns.route('/gene/<object_category>/<taxon>')
 #@limiter.limit("1 per minute")
@@ -42,11 +95,16 @@ class MartGeneAssociationsResource(Resource):
 
         NOTE: this route has a limiter on it, you may be restricted in the number of downloads per hour. Use carefully.
         """
-        assocs = bulk_fetch(subject_category='gene',
-                            object_category=object_category,
-                            taxon=taxon,
-                            iterate=True)
-        return assocs
+        return bulk_response('gene', object_category, taxon)
+
+    @api.expect(export_parser)
+    def post(self, object_category, taxon):
+        """
+        Start a background bulk export of gene associations.
+
+        Returns the job status, including a URL to poll; download links for each part appear as they are written.
+        """
+        return submit_export('gene', object_category, taxon)
 
 @ns.route('/case/<object_category>/<taxon>')
 #@limiter.limit("1 per minute")
@@ -67,11 +125,21 @@ class MartCaseAssociationsResource(Resource):
         if taxon == "NCBITaxon:9606":
             taxon = None
 
-        assocs = bulk_fetch(subject_category='case',
-                            object_category=object_category,
-                            taxon=taxon,
-                            iterate=True)
-        return assocs
+        return bulk_response('case', object_category, taxon)
+
+    @api.expect(export_parser)
+    def post(self, object_category, taxon):
+        """
+        Start a background bulk export of case associations.
+
+        Returns the job status, including a URL to poll; download links for each part appear as they are written.
+        """
+
+        # TODO temporary workaround
+        if taxon == "NCBITaxon:9606":
+            taxon = None
+
+        return submit_export('case', object_category, taxon)
 
 @ns.route('/disease/<object_category>/<taxon>')
 #@limiter.limit("1 per minute")
@@ -92,8 +160,42 @@ class MartDiseaseAssociationsResource(Resource):
         if taxon == "NCBITaxon:9606":
             taxon = None
 
-        assocs = bulk_fetch(subject_category='disease',
-                            object_category=object_category,
-                            taxon=taxon,
-                            iterate=True)
-        return assocs
+        return bulk_response('disease', object_category, taxon)
+
+    @api.expect(export_parser)
+    def post(self, object_category, taxon):
+        """
+        Start a background bulk export of disease associations.
+
+        Returns the job status, including a URL to poll; download links for each part appear as they are written.
+        """
+
+        # TODO temporary workaround
+        if taxon == "NCBITaxon:9606":
+            taxon = None
+
+        return submit_export('disease', object_category, taxon)
+
+@ns.route('/jobs/<job_id>')
+class MartExportJobResource(Resource):
+
+    def get(self, job_id):
+        """
+        Status of a bulk export job, with download links for the parts written so far
+        """
+        job = exports.status(job_id)
+        if job is None:
+            abort(404, "No such export job: {}".format(job_id))
+        return with_links(job)
+
+@ns.route('/jobs/<job_id>/<part>')
+class MartExportPartResource(Resource):
+
+    def get(self, job_id, part):
+        """
+        Download one gzipped part file of a bulk export job
+        """
+        path = exports.part_path(job_id, part)
+        if path is None:
+            abort(404, "No such part: {}".format(part))
+        return send_file(os.path.abspath(path), mimetype='application/gzip', as_attachment=True, attachment_filename=part)
@@ -4,7 +4,7 @@ from flask import request
 from flask_restplus import Resource
 from biolink.datamodel.serializers import association
 from biolink.api.restplus import api
-from ontobio.sparql.sparql_ontol_utils import batch_fetch_labels
+from biolink.ontology.labels import labels
 import pysolr
 
 log = logging.getLogger(__name__)
@@ -24,7 +24,7 @@ class OntolLabelerResource(Resource):
         """
         args = parser.parse_args()
 
-        return batch_fetch_labels(args.id)
+        return labels.labels(args.id or [])
 
 
     
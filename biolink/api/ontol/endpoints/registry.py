@@ -0,0 +1,19 @@
+import logging
+
+from flask import request
+from flask_restplus import Resource
+from biolink.api.restplus import api
+from biolink.ontology.registry import registry
+
+log = logging.getLogger(__name__)
+
+ns = api.namespace('ontol/registry', description='ontologies loaded in this server')
+
+@ns.route('/')
+class OntologyRegistryResource(Resource):
+
+    def get(self):
+        """
+        Returns load time and size statistics for each loaded ontology
+        """
+        return registry.stats()
@@ -3,9 +3,8 @@ import logging
 from flask import request
 from flask_restplus import Resource
 from biolink.api.restplus import api
-from ontobio.ontol_factory import OntologyFactory
 from ontobio.graph_io import OboJsonGraphRenderer
-import networkx as nx
+from biolink.ontology.registry import registry
 
 import pysolr
 
@@ -34,21 +33,12 @@ class ExtractOntologySubgraphResource(Resource):
         if args.cnode is not None:
             ids += args.cnode
 
-        factory = OntologyFactory()
-        ont = factory.create(ontology)
-        g = ont.get_filtered_graph(relations=args.relation)
-        
-        nodes = set()
+        g = registry.get_filtered_graph(ontology, args.relation)
+        closure = registry.get_closure_index(ontology, args.relation)
 
+        # NOTE: ancestors/descendants are precomputed over the filtered graph
         dirn = 'du'
-        for id in ids:
-            nodes.add(id)
-            # NOTE: we use direct networkx methods as we have already extracted
-            # the subgraph we want
-            if dirn.find("u") > -1:
-                nodes.update(nx.ancestors(g, id))
-            if dirn.find("d") > -1:
-                nodes.update(nx.descendants(g, id))
+        nodes = closure.closure(ids, up=dirn.find("u") > -1, down=dirn.find("d") > -1)
         subg = g.subgraph(nodes)
         ojr = OboJsonGraphRenderer()
         json_obj = ojr.to_json(subg)
@@ -63,8 +53,7 @@ class TestMe(Resource):
         """
         Extract a subgraph from an ontology
         """
-        factory = OntologyFactory()
-        ont = factory.create()
+        ont = registry.factory.create()
         z = get_db()
         return {'z': z,
                 'test': len(ont.nodes())}
@@ -4,6 +4,7 @@ from flask import request
 from flask_restplus import Resource
 from biolink.api.restplus import api
 from ontobio.golr.golr_associations import calculate_information_content
+from biolink.enrichment.ic import ic_tables
 import pysolr
 
 log = logging.getLogger(__name__)
@@ -32,6 +33,9 @@ class InformationContentResource(Resource):
 
         """
         args = parser.parse_args()
+        if args.get('evidence') is None:
+            # the common case is computed once per data release
+            return ic_tables.get(subject_category, object_category, subject_taxon).to_dict()
         return calculate_information_content(subject_category=subject_category,
                                              object_category=object_category,
                                              subject_taxon=subject_taxon,
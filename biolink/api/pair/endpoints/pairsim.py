@@ -1,9 +1,12 @@
 import logging
 
-from flask import request
+from flask import request, abort
 from flask_restplus import Resource
 from ontobio.golr.golr_sim import subject_pair_simj
 from biolink.api.restplus import api
+from biolink.golr.annotations import annotation_pairs
+from biolink.similarity.matrix import AnnotationMatrix, METRICS
+from biolink.enrichment.ic import ic_tables
 import pysolr
 
 log = logging.getLogger(__name__)
@@ -13,6 +16,17 @@ ns = api.namespace('pair/sim', description='pairwise similarity between two enti
 parser = api.parser()
 parser.add_argument('object_category', help='e.g. disease, phenotype, gene. Two subjects will be compared based on overlap between associations to objects in this category')
 
+# largest set for which the full matrix (rather than top-k) is returned
+MAX_MATRIX_SUBJECTS = 2000
+
+matrix_parser = api.parser()
+matrix_parser.add_argument('subject', action='append', required=True, help='Entity ids to be compared, e.g. NCBIGene:10891, NCBIGene:1200, NCBIGene:6469')
+matrix_parser.add_argument('object_category', required=True, help='e.g. disease, phenotype, function. Subjects are compared on their associations to objects in this category, including ancestors of those objects')
+matrix_parser.add_argument('metric', choices=METRICS, default='jaccard', help='jaccard, simgic (information-content weighted jaccard) or cosine')
+matrix_parser.add_argument('taxon', help='For simgic, take information content from all associations of this taxon, e.g. NCBITaxon:9606; by default it is estimated from the subjects themselves')
+matrix_parser.add_argument('subject_category', default='gene', help='Category of the subjects, used with taxon to select the information content dataset')
+matrix_parser.add_argument('top_k', type=int, help='If set, return the k most similar subjects for each subject instead of the full matrix')
+
 @ns.route('/jaccard/<id1>/<id2>/')
 @api.doc(params={'id1': 'id, e.g. NCBIGene:10891; ZFIN:ZDB-GENE-980526-166; UniProtKB:Q15465'})
 @api.doc(params={'id2': 'id, e.g. NCBIGene:1200; ZFIN:ZDB-GENE-980528-2059; UniProtKB:P12644'})
@@ -29,8 +43,32 @@ class PairSimJaccardResource(Resource):
                                     id2,
                                     **args)
         return results
-    
 
-    
-    
+@ns.route('/matrix/')
+class PairSimMatrixResource(Resource):
 
+    @api.expect(matrix_parser)
+    def get(self):
+        """
+        Get similarity between all pairs of a set of entities
+
+        Each subject's annotations are fetched once; returns either the full
+        matrix, with rows and columns in the order of the subjects, or the
+        top_k neighbors of each subject.
+        """
+        args = matrix_parser.parse_args()
+        subjects = list(dict.fromkeys(args.subject))
+        top_k = args.get('top_k')
+        if top_k is None and len(subjects) > MAX_MATRIX_SUBJECTS:
+            abort(400, "Full matrix is limited to {} subjects; use top_k".format(MAX_MATRIX_SUBJECTS))
+        ic = None
+        if args.metric == 'simgic' and args.get('taxon') is not None:
+            ic = ic_tables.get(args.subject_category, args.object_category, args.taxon).lookup
+        am = AnnotationMatrix(subjects, annotation_pairs(subjects, args.object_category), ic=ic)
+        if top_k is not None:
+            neighbors = am.top_k(top_k, metric=args.metric)
+            return {'metric': args.metric,
+                    'neighbors': {s: [{'id': id, 'score': score} for (id, score) in n] for (s, n) in neighbors.items()}}
+        return {'metric': args.metric,
+                'subjects': subjects,
+                'matrix': am.matrix(metric=args.metric).round(6).tolist()}
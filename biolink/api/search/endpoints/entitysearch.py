@@ -1,10 +1,13 @@
 import logging
 
-from flask import request
+from flask import request, abort
 from flask_restplus import Resource
 from biolink.datamodel.serializers import search_result
 from biolink.api.restplus import api
 from ontobio.golr.golr_query import GolrSearchQuery
+from biolink.search.autocomplete import index as autocomplete_index
+from biolink.golr.search import search_entities, batch_search
+from biolink import settings
 import pysolr
 
 log = logging.getLogger(__name__)
@@ -41,6 +44,11 @@ def search(term, args):
 simple_parser = get_simple_parser()
 adv_parser = get_advanced_parser()
 
+batch_parser = api.parser()
+batch_parser.add_argument('term', action='append', required=True, help='search strings; duplicates are searched once')
+batch_parser.add_argument('category', action='append', help='e.g. gene, disease')
+batch_parser.add_argument('rows', type=int, required=False, default=10, help='number of rows per term')
+
 @ns.route('/entity/<term>')
 @api.doc(params={'term': 'search string, e.g. shh, parkinson, femur'})
 class SearchEntities(Resource):
@@ -53,22 +61,52 @@ class SearchEntities(Resource):
         Returns list of matching concepts or entities using lexical search
         """
         args = simple_parser.parse_args()
-        q = GolrSearchQuery(term,
-                            category=args.category)
-        results = q.exec()
-        return results
+        return search_entities(term, category=args.category)
+
+@ns.route('/entity/batch/')
+class BatchSearchEntities(Resource):
+
+    @api.expect(batch_parser)
+    def get(self):
+        """
+        Returns matching concepts or entities for each of a list of search strings
+        """
+        return self.search()
+
+    @api.expect(batch_parser)
+    def post(self):
+        """
+        Returns matching concepts or entities for each of a list of search strings
+
+        Same as GET, for lists too long for a URL.
+        """
+        return self.search()
+
+    def search(self):
+        args = batch_parser.parse_args()
+        if len(args.term) > settings.SEARCH_BATCH_MAX_TERMS:
+            abort(400, "At most {} terms per batch".format(settings.SEARCH_BATCH_MAX_TERMS))
+        (results, errors) = batch_search(args.term, category=args.category, rows=args.rows, hl=False)
+        return {'results': results, 'errors': errors}
 
 @ns.route('/entity/autocomplete/<term>')
+@api.doc(params={'term': 'prefix of a label or synonym word, e.g. parkin'})
 class Autocomplete(Resource):
 
     @api.expect(simple_parser)
-    def get(self, search_term):
-        """
-        Returns list of matching concepts or entities using lexical search
+    def get(self, term):
         """
-        args = parser.parse_args()
+        Returns list of concepts or entities with a label or synonym matching a prefix
 
-        return []
+        Served from an in-memory index of loaded ontologies and mart snapshots.
+        """
+        args = simple_parser.parse_args()
+        if args.rows < 1:
+            abort(400, "rows must be at least 1")
+        return autocomplete_index.search(term,
+                                         k=args.rows,
+                                         categories=args.category,
+                                         taxon=args.taxon)
 
 #@ns.route('/entity/query/')
 #class BooleanQuery(Resource):
@@ -16,6 +16,7 @@ from biolink.api.nlp.endpoints.annotate import ns as nlp_annotate_namespace
 from biolink.api.ontol.endpoints.subgraph import ns as ontol_subgraph_namespace
 from biolink.api.ontol.endpoints.termstats import ns as ontol_termstats_namespace
 from biolink.api.ontol.endpoints.labeler import ns as ontol_labeler
+from biolink.api.ontol.endpoints.registry import ns as ontol_registry_namespace
 #from biolink.api.ontol.endpoints.enrichment import ns as ontol_enrichment_namespace
 from biolink.api.graph.endpoints.node import ns as graph_node_namespace
 
@@ -71,10 +72,21 @@ with app.app_context():
     f.g.foo = 99
     print("FG={}".format(f.g.foo))
 
-# initial setup
-from ontobio.ontol_factory import OntologyFactory
-factory = OntologyFactory()
-ont = factory.create()
+# initial setup: load ontologies marked pre_load in conf/config.yaml
+from biolink.ontology.registry import registry
+from biolink.search.autocomplete import index as autocomplete_index
+registry.add_listener(autocomplete_index.on_ontology)
+registry.preload()
+from biolink.ontology.labels import labels
+labels.warm_loaded()
+
+# index the entities of mart snapshots for autocomplete
+from biolink.golr.snapshot import snapshots
+autocomplete_index.add_snapshots(snapshots, settings.MART_SNAPSHOT_SLICES)
+
+# resume mart export jobs interrupted by a restart
+from biolink.golr.export import exports
+exports.start()
     
 
 @app.route("/")
@@ -208,6 +208,7 @@ gene = api.inherit('Gene', bio_object, {
     'function_associations': fields.List(fields.Nested(association), description='GO assocations for wild type gene'),
     'pathway_associations': fields.List(fields.Nested(association), description='Assocations to pathways in which this gene is involved, including LEGO models'),
     'genotype_associations': fields.List(fields.Nested(association), description='associations to genotypes in which this gene is altered'),
+    'incomplete_associations': fields.List(fields.String, description='association sets that could not be retrieved (e.g. backend timeout); these are returned empty'),
     'interaction_associations': fields.List(fields.Nested(association), description='associations to genes that interact (may be physical or genetic)'),
     'literature_associations': fields.List(fields.Nested(association), description='publications for this gene'),
     #'genotypes': fields.List(fields.Nested(bio_object), desc='List of references to genotype objects')
@@ -221,6 +222,7 @@ genotype = api.inherit('Genotype', bio_object, {
     'disease_associations': fields.List(fields.Nested(association)),
     'gene_associations': fields.List(fields.Nested(association)),
     'variant_associations': fields.List(fields.Nested(association)),
+    'incomplete_associations': fields.List(fields.String, description='association sets that could not be retrieved (e.g. backend timeout); these are returned empty'),
 })
 
 allele = api.inherit('Allele', genotype, {
@@ -0,0 +1,3 @@
+"""
+Term statistics and enrichment over sets of entities
+"""
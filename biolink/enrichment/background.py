@@ -0,0 +1,99 @@
+"""
+Genome-wide background term frequencies
+
+For a (taxon, object_category, subject_category) triple, the number of
+distinct subjects annotated to each term (via the object closure) barely
+changes between data releases, but computing it means reading every
+association of the taxon. BackgroundStore computes each table once, keeps
+it in memory as a TermCounts and persists it under a data release version
+(see biolink.util.tables).
+
+Subjects are counted the same way as the sample of an over-representation
+test (see biolink.golr.annotations.annotation_pairs): an association counts
+for its subject and for every subject in its subject closure, e.g. the
+phenotypes of a genotype count for its genes.
+"""
+
+import logging
+import time
+
+import numpy as np
+
+from ontobio.golr import golr_associations
+from ontobio.golr.golr_query import GolrFields as M
+from biolink.enrichment.ora import TermCounts, term_index
+from biolink.golr.annotations import iter_association_docs, matched_subjects
+from biolink.util.tables import TableStore
+from biolink import settings
+
+# subject-term pairs buffered before duplicates are dropped
+PAIR_BUFFER = 1000000
+
+def fetch_background(taxon, object_category, subject_category='gene'):
+    """
+    Compute a TermCounts for all subjects of a category in a taxon
+
+    The subjects are those of the category with any association in the
+    taxon, found with one faceted query; their annotations are then read
+    page by page, including associations of other subject categories that
+    have them in their subject closure.
+    """
+    t = time.time()
+    results = golr_associations.search_associations(subject_category=subject_category,
+                                                    subject_taxon=taxon,
+                                                    rows=0,
+                                                    facet_fields=[M.SUBJECT],
+                                                    facet_limit=-1)
+    subjects = {s: i for (i, s) in enumerate(sorted(results['facet_counts'].get(M.SUBJECT, {})))}
+    population = set(subjects)
+
+    # each (subject, term) pair as one int64: subject index in the high bits, term id in the low
+    chunks = []
+    buffered = []
+    n = 0
+    for d in iter_association_docs(object_category=object_category, subject_taxon=taxon):
+        matched = matched_subjects(d, population)
+        if len(matched) == 0:
+            continue
+        ids = term_index.intern(d.get(M.OBJECT_CLOSURE, [])).astype(np.int64)
+        for s in matched:
+            buffered.append((subjects[s] << 32) | ids)
+            n += len(ids)
+        if n >= PAIR_BUFFER:
+            chunks.append(np.unique(np.concatenate(buffered)))
+            buffered = []
+            n = 0
+    chunks.extend(buffered)
+    pairs = np.unique(np.concatenate(chunks)) if len(chunks) > 0 else np.zeros(0, dtype=np.int64)
+    (ids, counts) = np.unique((pairs & 0xffffffff).astype(np.int32), return_counts=True)
+    total = len(np.unique(pairs >> 32))
+    tc = TermCounts.from_ids(ids, counts, total)
+    logging.info("Background for {} {} {}: {} terms, {} of {} subjects in {:.1f}s".format(
+        taxon, object_category, subject_category, len(ids), total, len(subjects), time.time() - t))
+    return tc
+
+class BackgroundStore(TableStore):
+    """
+    Background TermCounts per (taxon, object_category, subject_category), in memory and on disk
+
+    Arguments
+    ---------
+    root
+        directory holding one subdirectory per data release version
+
+    version
+        data release the tables belong to; tables of other versions are ignored
+
+    fetch
+        function with the signature of fetch_background
+    """
+    def __init__(self, root, version, fetch=fetch_background):
+        TableStore.__init__(self, root, version, fetch, TermCounts)
+
+    def get(self, taxon, object_category, subject_category='gene'):
+        """
+        Background TermCounts, loaded from disk or computed on first use
+        """
+        return TableStore.get(self, taxon, object_category, subject_category)
+
+backgrounds = BackgroundStore(settings.ENRICHMENT_BACKGROUND_DIR, settings.ENRICHMENT_BACKGROUND_VERSION)
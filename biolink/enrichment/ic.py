@@ -0,0 +1,77 @@
+"""
+Information content tables
+
+IC = -log2(freq(t) / popSize), computed over the associations of a
+(subject_category, object_category, taxon) dataset as in ontobio's
+calculate_information_content. Tables are computed once per data release
+and shared by the termstats endpoint and by IC-weighted similarity.
+"""
+
+import logging
+import time
+
+import numpy as np
+
+from ontobio.golr import golr_associations
+from biolink.util.tables import TableStore
+from biolink import settings
+
+class ICTable:
+    """
+    IC of each term of a dataset, as a sorted term array and a float64 array
+    """
+    def __init__(self, terms, ic):
+        self.terms = np.asarray(terms, dtype=object)
+        self.ic = np.asarray(ic, dtype=np.float64)
+
+    @classmethod
+    def from_dict(cls, icmap):
+        terms = sorted(icmap)
+        return cls(terms, [icmap[t] for t in terms])
+
+    def to_dict(self):
+        return dict(zip(self.terms, self.ic.tolist()))
+
+    def to_arrays(self):
+        return {'terms': np.array(self.terms, dtype=str), 'ic': self.ic}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['terms'].astype(object), arrays['ic'].astype(np.float64))
+
+    def summary(self):
+        return {'terms': len(self.terms)}
+
+    def lookup(self, terms, default=0.0):
+        """
+        IC of the given terms, default for terms not in the dataset
+        """
+        terms = np.asarray(terms, dtype=object)
+        if len(self.terms) == 0 or len(terms) == 0:
+            return np.full(len(terms), default, dtype=np.float64)
+        pos = np.minimum(np.searchsorted(self.terms, terms), len(self.terms) - 1)
+        return np.where(self.terms[pos] == terms, self.ic[pos], default)
+
+def compute_ic(subject_category, object_category, taxon):
+    t = time.time()
+    icmap = golr_associations.calculate_information_content(subject_category=subject_category,
+                                                            object_category=object_category,
+                                                            subject_taxon=taxon)
+    logging.info("IC for {} {} {}: {} terms in {:.1f}s".format(
+        subject_category, object_category, taxon, len(icmap), time.time() - t))
+    return ICTable.from_dict(icmap)
+
+class ICStore(TableStore):
+    """
+    ICTable per (subject_category, object_category, taxon), in memory and on disk
+    """
+    def __init__(self, root, version, compute=compute_ic):
+        TableStore.__init__(self, root, version, compute, ICTable)
+
+    def get(self, subject_category, object_category, taxon):
+        """
+        ICTable for a dataset, loaded from disk or computed on first use
+        """
+        return TableStore.get(self, subject_category, object_category, taxon)
+
+ic_tables = ICStore(settings.ENRICHMENT_IC_DIR, settings.ENRICHMENT_BACKGROUND_VERSION)
@@ -0,0 +1,235 @@
+"""
+Over-representation analysis
+
+Given the terms annotated to (directly or via the closure) a sample set and
+a background set of entities, test every term at once for over-representation
+in the sample using the hypergeometric distribution (one-sided Fisher's
+exact test).
+"""
+
+import threading
+
+import numpy as np
+from scipy.special import gammaln, logsumexp
+
+CORRECTIONS = ('bh', 'bonferroni', 'none')
+
+# bound on the size of the array used to sum hypergeometric tails
+GRID_CELLS = 1000000
+
+class TermIndex:
+    """
+    Process-wide interning of term IDs as small integers
+
+    Tables hold term ids rather than strings, so lookups compare integers
+    and each term string is held once however many tables contain it.
+    """
+    def __init__(self):
+        self._ids = {}
+        self._terms = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._terms)
+
+    def intern(self, terms):
+        """
+        Int array of the ids of terms, assigning ids to new terms
+        """
+        ids = np.empty(len(terms), dtype=np.int32)
+        with self._lock:
+            for (i, t) in enumerate(terms):
+                id = self._ids.get(t)
+                if id is None:
+                    id = len(self._terms)
+                    self._ids[t] = id
+                    self._terms.append(t)
+                ids[i] = id
+        return ids
+
+    def find(self, terms):
+        """
+        Int array of the ids of terms, -1 for terms never interned
+        """
+        return np.fromiter((self._ids.get(t, -1) for t in terms), dtype=np.int32, count=len(terms))
+
+    def terms(self, ids):
+        return np.array([self._terms[i] for i in ids], dtype=object)
+
+term_index = TermIndex()
+
+class TermCounts:
+    """
+    Number of distinct subjects annotated to each term
+
+    Arguments
+    ---------
+    terms
+        array of term IDs, interned in term_index
+
+    counts
+        int array, counts[i] is the number of subjects annotated to terms[i]
+
+    total
+        number of subjects with at least one annotation
+    """
+    def __init__(self, terms, counts, total):
+        self._set(term_index.intern(list(terms)), counts, total)
+
+    @classmethod
+    def from_ids(cls, ids, counts, total):
+        tc = cls.__new__(cls)
+        tc._set(np.asarray(ids, dtype=np.int32), counts, total)
+        return tc
+
+    def _set(self, ids, counts, total):
+        # sorted by term id for lookups
+        order = np.argsort(ids, kind='stable')
+        self.ids = ids[order]
+        self.counts = np.asarray(counts, dtype=np.int64)[order]
+        self.total = total
+
+    @property
+    def terms(self):
+        return term_index.terms(self.ids)
+
+    def to_arrays(self):
+        # ids are only meaningful within a process, so tables are saved with their terms
+        return {'terms': np.array(self.terms, dtype=str),
+                'counts': self.counts.astype(np.int32),
+                'total': np.array(self.total)}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['terms'].tolist(), arrays['counts'].astype(np.int64), int(arrays['total']))
+
+    def summary(self):
+        return {'terms': len(self.ids), 'subjects': self.total}
+
+    def lookup(self, terms):
+        """
+        Counts for the given terms, 0 for terms not in this table
+        """
+        return self.lookup_ids(term_index.find(list(terms)))
+
+    def lookup_ids(self, ids):
+        """
+        Counts for the given term ids, 0 for terms not in this table
+        """
+        ids = np.asarray(ids, dtype=np.int32)
+        if len(self.ids) == 0 or len(ids) == 0:
+            return np.zeros(len(ids), dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        return np.where(self.ids[pos] == ids, self.counts[pos], 0)
+
+def count_terms(pairs, subjects=None):
+    """
+    TermCounts from (subject, term) pairs, optionally restricted to a subject set
+    """
+    if subjects is not None:
+        subjects = set(subjects)
+        pairs = [(s, t) for (s, t) in pairs if s in subjects]
+    pairs = list(pairs)
+    ids = term_index.intern([t for (_, t) in pairs])
+    (ids, counts) = np.unique(ids, return_counts=True)
+    total = len(set(s for (s, _) in pairs))
+    return TermCounts.from_ids(ids, counts, total)
+
+def hypergeometric_p_values(k, K, n, N):
+    """
+    P(X >= k) for each term, where X ~ Hypergeometric(N, K, n)
+
+    k and K are arrays of sample and background counts per term; n and N are
+    the sample and background sizes.
+
+    The tail is summed in log space over a (terms x tail length) grid, a block
+    of terms at a time. This is exact, and far faster than scipy.stats.hypergeom.sf,
+    which evaluates each term separately.
+    """
+    k = np.asarray(k, dtype=np.int64)
+    K = np.asarray(K, dtype=np.int64)
+    p = np.zeros(len(k))
+    lower = np.maximum(k, np.maximum(0, n - (N - K)))
+    upper = np.minimum(K, n)
+    # the whole support is in the tail
+    p[k <= np.maximum(0, n - (N - K))] = 1.0
+    todo = np.where((p < 1.0) & (lower <= upper))[0]
+    todo = todo[np.argsort(upper[todo] - lower[todo])]
+    start = 0
+    while start < len(todo):
+        # grow the block while it stays within GRID_CELLS
+        end = start + 1
+        while end < len(todo) and (end + 1 - start) * (upper[todo[end]] - lower[todo[end]] + 1) <= GRID_CELLS:
+            end += 1
+        idx = todo[start:end]
+        width = int(upper[idx[-1]] - lower[idx[-1]] + 1)
+        x = lower[idx, None] + np.arange(width)[None, :]
+        valid = x <= upper[idx, None]
+        x = np.where(valid, x, lower[idx, None])
+        Ki = K[idx, None]
+        logpmf = _lchoose(Ki, x) + _lchoose(N - Ki, n - x) - _lchoose(N, n)
+        p[idx] = np.exp(logsumexp(np.where(valid, logpmf, -np.inf), axis=1))
+        start = end
+    return np.clip(p, 0.0, 1.0)
+
+def _lchoose(a, b):
+    return gammaln(a + 1) - gammaln(b + 1) - gammaln(a - b + 1)
+
+def adjust_p_values(p, correction='bh'):
+    """
+    Multiple-testing correction over an array of p-values
+
+    bh is Benjamini-Hochberg (false discovery rate), bonferroni controls the
+    family-wise error rate.
+    """
+    p = np.asarray(p, dtype=float)
+    m = len(p)
+    if m == 0 or correction == 'none':
+        return p
+    if correction == 'bonferroni':
+        return np.minimum(p * m, 1.0)
+    if correction == 'bh':
+        order = np.argsort(p)
+        ranked = p[order] * m / np.arange(1, m + 1)
+        ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+        adjusted = np.empty(m)
+        adjusted[order] = np.minimum(ranked, 1.0)
+        return adjusted
+    raise ValueError("Unknown correction: {}".format(correction))
+
+def over_representation(sample, background, correction='bh', max_p_value=None):
+    """
+    Rank the terms of a sample by over-representation against a background
+
+    sample and background are TermCounts counted the same way, with the
+    sample part of the background; every term with at least one sample
+    annotation is tested. Returns a list of dicts, most significant first.
+
+    Raises ValueError if the sample has more subjects, in total or for some
+    term, than the background.
+    """
+    n = sample.total
+    N = background.total
+    k = sample.counts
+    K = background.lookup_ids(sample.ids)
+    terms = sample.terms
+    if N < n:
+        raise ValueError("Sample of {} subjects is larger than background of {}".format(n, N))
+    over = np.flatnonzero(K < k)
+    if len(over) > 0:
+        i = over[0]
+        raise ValueError("Term {} has {} sample subjects but only {} in the background".format(
+            terms[i], k[i], K[i]))
+    p = hypergeometric_p_values(k, K, n, N)
+    adjusted = adjust_p_values(p, correction)
+    order = np.lexsort((-k, p))
+    if max_p_value is not None:
+        order = order[adjusted[order] <= max_p_value]
+    return [{'id': terms[i],
+             'sample_count': int(k[i]),
+             'sample_total': n,
+             'background_count': int(K[i]),
+             'background_total': N,
+             'p_value': float(p[i]),
+             'p_value_adjusted': float(adjusted[i])}
+            for i in order]
@@ -0,0 +1,66 @@
+import os
+from biolink.enrichment.ora import TermCounts
+from biolink.enrichment.background import BackgroundStore
+
+def test_store(tmpdir):
+    calls = []
+    def fetch(taxon, object_category, subject_category):
+        calls.append((taxon, object_category, subject_category))
+        return TermCounts(['HP:1', 'HP:2'], [10, 3], 20)
+    store = BackgroundStore(str(tmpdir), 'v1', fetch=fetch)
+    tc = store.get('NCBITaxon:9606', 'phenotype')
+    assert list(tc.lookup(['HP:2', 'HP:3'])) == [3, 0]
+    assert store.get('NCBITaxon:9606', 'phenotype') is tc
+    assert len(calls) == 1
+    assert os.path.isfile(os.path.join(str(tmpdir), 'v1', 'NCBITaxon_9606-phenotype-gene.npz'))
+    assert store.stats()['tables']['NCBITaxon:9606 phenotype gene'] == {'terms': 2, 'subjects': 20}
+    store.get('NCBITaxon:9606', 'phenotype', 'disease')
+    assert calls[-1] == ('NCBITaxon:9606', 'phenotype', 'disease')
+    del calls[-1]
+
+    # a new process reads the persisted table instead of querying Solr
+    store2 = BackgroundStore(str(tmpdir), 'v1', fetch=fetch)
+    tc2 = store2.get('NCBITaxon:9606', 'phenotype')
+    assert len(calls) == 1
+    assert dict(zip(tc2.terms, tc2.counts)) == {'HP:1': 10, 'HP:2': 3}
+    assert tc2.total == 20
+
+    # a new data release recomputes
+    BackgroundStore(str(tmpdir), 'v2', fetch=fetch).get('NCBITaxon:9606', 'phenotype')
+    assert len(calls) == 2
+
+def test_fetch_background(monkeypatch):
+    from ontobio.golr import golr_associations
+    from biolink.enrichment import background
+    from biolink.golr.annotations import annotation_pairs
+    from biolink.golr import annotations
+    from biolink.enrichment.ora import count_terms, over_representation
+    docs = [
+        {'subject': 'G1', 'subject_closure': ['G1'], 'object_closure': ['T1', 'T0']},
+        # a genotype of G1 and G2: counts for both genes, as in annotation_pairs
+        {'subject': 'GT1', 'subject_closure': ['GT1', 'G1', 'G2'], 'object_closure': ['T2', 'T0']},
+        {'subject': 'G3', 'subject_closure': ['G3'], 'object_closure': ['T0']},
+        {'subject': 'G1', 'subject_closure': ['G1'], 'object_closure': ['T0']},
+    ]
+    facets = []
+    def fake_search_associations(**kwargs):
+        facets.append(kwargs)
+        return {'facet_counts': {'subject': {'G1': 2, 'G2': 0, 'G3': 1}}}
+    monkeypatch.setattr(golr_associations, 'search_associations', fake_search_associations)
+    monkeypatch.setattr(background, 'iter_association_docs', lambda **kwargs: iter(docs))
+    monkeypatch.setattr(background, 'PAIR_BUFFER', 3)
+    tc = background.fetch_background('NCBITaxon:9606', 'phenotype', 'gene')
+    assert facets[0]['subject_category'] == 'gene'
+    assert dict(zip(tc.terms, tc.counts)) == {'T0': 3, 'T1': 1, 'T2': 2}
+    assert tc.total == 3
+
+    # a sample counted by annotation_pairs fits within it
+    class Raw:
+        def __init__(self, docs):
+            self.docs = docs
+    monkeypatch.setattr(annotations, 'search_associations',
+                        lambda subjects=None, **kwargs: {'raw': Raw([d for d in docs if set(subjects) & set(d['subject_closure'])])})
+    sample = count_terms(annotation_pairs(['G1', 'G2'], 'phenotype'))
+    results = over_representation(sample, tc)
+    assert {r['id']: (r['sample_count'], r['background_count']) for r in results} == \
+        {'T0': (2, 3), 'T1': (1, 1), 'T2': (2, 2)}
@@ -0,0 +1,17 @@
+from biolink.enrichment.ic import ICStore, ICTable
+
+def test_ic_store(tmpdir):
+    calls = []
+    def compute(subject_category, object_category, taxon):
+        calls.append(taxon)
+        return ICTable.from_dict({'HP:2': 3.5, 'HP:1': 0.0, 'HP:3': 1 / 3})
+    store = ICStore(str(tmpdir), 'v1', compute=compute)
+    t = store.get('gene', 'phenotype', 'NCBITaxon:9606')
+    assert t.to_dict() == {'HP:1': 0.0, 'HP:2': 3.5, 'HP:3': 1 / 3}
+    assert list(t.lookup(['HP:2', 'HP:9'], default=-1.0)) == [3.5, -1.0]
+    assert store.get('gene', 'phenotype', 'NCBITaxon:9606') is t
+    t2 = ICStore(str(tmpdir), 'v1', compute=compute).get('gene', 'phenotype', 'NCBITaxon:9606')
+    # stored at full precision, so values match those computed with an evidence filter
+    assert t2.to_dict() == {'HP:1': 0.0, 'HP:2': 3.5, 'HP:3': 1 / 3}
+    assert calls == ['NCBITaxon:9606']
+    assert store.stats()['tables'] == {'gene phenotype NCBITaxon:9606': {'terms': 3}}
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from scipy.stats import hypergeom, fisher_exact
+from biolink.enrichment.ora import TermCounts, count_terms, hypergeometric_p_values, adjust_p_values, over_representation
+
+def test_p_values_match_fisher():
+    (k, K, n, N) = (np.array([3, 1, 5]), np.array([10, 40, 5]), 8, 100)
+    p = hypergeometric_p_values(k, K, n, N)
+    for i in range(3):
+        table = [[k[i], n - k[i]], [K[i] - k[i], N - n - K[i] + k[i]]]
+        assert p[i] == pytest.approx(fisher_exact(table, alternative='greater')[1])
+        assert p[i] == pytest.approx(hypergeom.sf(k[i] - 1, N, K[i], n))
+
+def test_adjust():
+    p = np.array([0.01, 0.04, 0.03, 0.2])
+    # Benjamini-Hochberg by hand: sorted p * m / rank, then running minimum from the top
+    assert adjust_p_values(p, 'bh') == pytest.approx([0.04, 0.04 * 4 / 3, 0.04 * 4 / 3, 0.2])
+    assert adjust_p_values(p, 'bonferroni') == pytest.approx([0.04, 0.16, 0.12, 0.8])
+    assert adjust_p_values(p, 'none') is not None
+    with pytest.raises(ValueError):
+        adjust_p_values(p, 'xyz')
+
+def test_count_terms():
+    pairs = {('g1', 'T1'), ('g1', 'T2'), ('g2', 'T1'), ('g3', 'T3')}
+    tc = count_terms(pairs)
+    assert dict(zip(tc.terms, tc.counts)) == {'T1': 2, 'T2': 1, 'T3': 1}
+    assert tc.total == 3
+    assert list(tc.lookup(['T3', 'T0', 'T9', 'T1'])) == [1, 0, 0, 2]
+    assert count_terms(pairs, ['g9']).total == 0
+
+def test_over_representation():
+    pairs = set()
+    for i in range(100):
+        pairs.add(('g{}'.format(i), 'ROOT'))
+    for i in range(10):
+        pairs.add(('g{}'.format(i), 'ENRICHED'))
+    pairs.add(('g50', 'OTHER'))
+    sample = ['g{}'.format(i) for i in range(10)]
+    results = over_representation(count_terms(pairs, sample), count_terms(pairs))
+    assert [r['id'] for r in results] == ['ENRICHED', 'ROOT']
+    assert results[0]['sample_count'] == 10
+    assert results[0]['background_count'] == 10
+    assert results[0]['p_value'] < 1e-10
+    assert results[1]['p_value'] == pytest.approx(1.0)
+    assert len(over_representation(count_terms(pairs, sample), count_terms(pairs), max_p_value=0.05)) == 1
+
+def test_p_values_edge_cases():
+    rng = np.random.RandomState(0)
+    N = 500
+    n = 40
+    K = rng.randint(0, N + 1, 300)
+    k = np.minimum(rng.randint(0, n + 1, 300), K)
+    k = np.maximum(k, np.maximum(0, n - (N - K)))
+    assert hypergeometric_p_values(k, K, n, N) == pytest.approx(hypergeom.sf(k - 1, N, K, n), rel=1e-9, abs=1e-300)
+    # an impossible count has probability 0, the minimum possible count probability 1
+    assert list(hypergeometric_p_values([5, 0], [3, 3], 10, 100)) == [0.0, 1.0]
+
+def test_sample_outside_background():
+    pairs = {('g1', 'T1'), ('g2', 'T1'), ('g3', 'T2')}
+    with pytest.raises(ValueError):
+        over_representation(count_terms(pairs), count_terms(pairs, ['g1', 'g2']))
+    with pytest.raises(ValueError):
+        over_representation(count_terms(pairs, ['g3']), count_terms(pairs, ['g1', 'g2']))
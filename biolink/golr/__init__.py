@@ -0,0 +1,3 @@
+"""
+Wrappers around the ontobio golr API
+"""
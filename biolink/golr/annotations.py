@@ -0,0 +1,104 @@
+"""
+Closure-expanded annotations of sets of subjects
+
+Shared by the set-based analyses (over-representation, similarity), which
+need, for each subject, the set of terms it is annotated to directly or via
+the ontology closure.
+"""
+
+import logging
+
+from ontobio.golr.golr_associations import GolrFields
+from ontobio.golr.golr_query import GolrAssociationQuery, map_field
+from biolink.golr.associations import search_associations
+from backendutil.fanout import FanOut
+
+M = GolrFields()
+
+# maximum rows fetched per Solr page when collecting annotations
+PAGE_ROWS = 10000
+
+# subjects per query, and number of such queries run concurrently
+CHUNK_SIZE = 500
+CHUNK_WORKERS = 4
+
+def annotation_pairs(subjects, object_category, **kwargs):
+    """
+    Distinct (subject, term) pairs over the object closure of the associations of subjects
+
+    As with search_associations(subject=...), an association counts for a
+    queried subject if the subject is in its subject closure (e.g. the
+    phenotypes of a genotype count for its genes); pairs are reported against
+    the queried IDs.
+    """
+    subjects = list(subjects)
+    fo = FanOut(max_workers=CHUNK_WORKERS)
+    for i in range(0, len(subjects), CHUNK_SIZE):
+        fo.add(i, _chunk_pairs, subjects[i:i+CHUNK_SIZE], object_category, **kwargs)
+    r = fo.run()
+    r.raise_for_errors()
+    pairs = set()
+    for chunk_pairs in r.results.values():
+        pairs |= chunk_pairs
+    return pairs
+
+def _chunk_pairs(subjects, object_category, **kwargs):
+    results = search_associations(subjects=subjects,
+                                  object_category=object_category,
+                                  select_fields=[M.SUBJECT, M.SUBJECT_CLOSURE, M.OBJECT_CLOSURE],
+                                  rows=PAGE_ROWS,
+                                  iterate=True,
+                                  facet_fields=[],
+                                  include_raw=True,
+                                  **kwargs)
+    queried = set(subjects)
+    pairs = set()
+    for d in results['raw'].docs:
+        matched = matched_subjects(d, queried)
+        if len(matched) == 0:
+            # e.g. an identifier rewritten for the GO schema
+            matched = [d.get(M.SUBJECT)]
+        for t in d.get(M.OBJECT_CLOSURE, []):
+            for s in matched:
+                pairs.add((s, t))
+    return pairs
+
+def matched_subjects(doc, subjects):
+    """
+    Members of a set of subjects an association document counts for
+
+    The document counts for its subject and for each entity in its subject
+    closure, e.g. the genes of a genotype.
+    """
+    closure = doc.get(M.SUBJECT_CLOSURE, [])
+    if not isinstance(closure, list):
+        closure = [closure]
+    return subjects.intersection(closure + [doc.get(M.SUBJECT)])
+
+def iter_association_docs(rows=PAGE_ROWS, **kwargs):
+    """
+    Yield the subject, subject closure and object closure of each matching association document
+
+    Pages with Solr cursor marks, so memory is bounded by the page size
+    however many documents match. Any argument for search_associations
+    can be passed.
+    """
+    q = GolrAssociationQuery(select_fields=[M.SUBJECT, M.SUBJECT_CLOSURE, M.OBJECT_CLOSURE],
+                             facet_fields=[],
+                             rows=rows,
+                             **kwargs)
+    params = q.solr_params()
+    params['facet'] = 'off'
+    params['sort'] = '{} asc'.format(map_field(M.ID, q.field_mapping))
+    cursor = '*'
+    n = 0
+    while True:
+        results = q.solr.search(cursorMark=cursor, **params)
+        for d in results.docs:
+            yield d
+        n += len(results.docs)
+        next_cursor = results.nextCursorMark
+        if next_cursor is None or next_cursor == cursor or len(results.docs) == 0:
+            logging.info("Paged through {} association documents".format(n))
+            return
+        cursor = next_cursor
@@ -0,0 +1,125 @@
+"""
+Cached front-end to the ontobio golr association helpers
+
+search_associations is a drop-in replacement for
+ontobio.golr.golr_associations.search_associations. Results are cached on
+the normalized keyword arguments, so identical queries (popular entities
+with default paging) are not re-sent to Solr.
+
+Identical calls that are in flight at the same time, including those for
+get_association and select_distinct_subjects, share a single Solr query.
+
+Values are passed around pickled: each caller, and each cache hit, gets a
+fresh copy, and callers are free to modify the results they get back.
+"""
+
+import logging
+import pickle
+
+from ontobio.golr import golr_associations
+from backendutil.cache import LRUCache, SQLiteCache, TieredCache, make_key
+from backendutil.singleflight import SingleFlight
+from biolink import settings
+
+KEY_PREFIX = 'search_associations'
+
+def _new_cache():
+    memory = LRUCache(maxsize=settings.ASSOCIATION_CACHE_MAX_ENTRIES,
+                      maxbytes=settings.ASSOCIATION_CACHE_MAX_BYTES)
+    shared = None
+    if settings.ASSOCIATION_CACHE_PATH is not None:
+        shared = SQLiteCache(settings.ASSOCIATION_CACHE_PATH)
+    return TieredCache(memory, shared)
+
+cache = _new_cache()
+flight = SingleFlight()
+
+def category_ttl(kwargs):
+    """
+    Time-to-live for a query, taken from the most volatile of its categories
+    """
+    ttls = [settings.ASSOCIATION_CACHE_CATEGORY_TTLS[c]
+            for c in (kwargs.get('subject_category'), kwargs.get('object_category'))
+            if c in settings.ASSOCIATION_CACHE_CATEGORY_TTLS]
+    if len(ttls) == 0:
+        return settings.ASSOCIATION_CACHE_TTL
+    return min(ttls)
+
+class Unpicklable(Exception):
+    """
+    Raised in place of results that cannot be pickled, carrying the results
+    """
+    def __init__(self, result, error):
+        super().__init__(str(error))
+        self.result = result
+
+def _pickled(fn, *args, **kwargs):
+    result = fn(*args, **kwargs)
+    try:
+        return pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        raise Unpicklable(result, e)
+
+def _coalesced(key, fn, *args, **kwargs):
+    """
+    Call fn through the single-flight group, returning pickled results
+    """
+    if key is None:
+        return None
+    return flight.do(key, _pickled, fn, *args, **kwargs)
+
+def search_associations(**kwargs):
+    """
+    Same as ontobio search_associations, served from the cache where possible
+
+    Queries asking for raw solr results are neither cached nor coalesced.
+    """
+    if kwargs.get('include_raw'):
+        return golr_associations.search_associations(**kwargs)
+    key = make_key(KEY_PREFIX, kwargs)
+    if key is None:
+        return golr_associations.search_associations(**kwargs)
+    value = cache.get(key, None)
+    if value is not None:
+        return pickle.loads(value)
+    try:
+        value = flight.do(key, _fetch, key, kwargs)
+    except Unpicklable as e:
+        # not copied, so shared with any concurrent identical calls
+        logging.warning("Not caching unpicklable results: {}".format(e))
+        return e.result
+    return pickle.loads(value)
+
+def _fetch(key, kwargs):
+    value = _pickled(golr_associations.search_associations, **kwargs)
+    cache.put(key, value, ttl=category_ttl(kwargs))
+    return value
+
+def get_association(id, **kwargs):
+    """
+    Same as ontobio get_association; concurrent identical calls share one query
+    """
+    key = make_key('get_association', dict(kwargs, id=id))
+    try:
+        value = _coalesced(key, golr_associations.get_association, id, **kwargs)
+    except Unpicklable as e:
+        return e.result
+    if value is None:
+        return golr_associations.get_association(id, **kwargs)
+    return pickle.loads(value)
+
+def select_distinct_subjects(**kwargs):
+    """
+    Same as ontobio select_distinct_subjects; concurrent identical calls share one query
+    """
+    key = make_key('select_distinct_subjects', kwargs)
+    try:
+        value = _coalesced(key, golr_associations.select_distinct_subjects, **kwargs)
+    except Unpicklable as e:
+        return e.result
+    if value is None:
+        return golr_associations.select_distinct_subjects(**kwargs)
+    return pickle.loads(value)
+
+def stats():
+    return dict(cache.stats(), flight=flight.stats())
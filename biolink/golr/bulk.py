@@ -0,0 +1,149 @@
+"""
+Page through bulk association queries
+
+ontobio bulk_fetch collects every page before returning. The functions here
+yield results page by page instead, using Solr cursor marks so that deep
+pages cost no more than the first, and so that an interrupted export can
+carry on from the last cursor it saw.
+"""
+
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ontobio.golr.golr_query import GolrAssociationQuery, GolrFields as M, map_field
+
+# documents fetched per Solr request
+PAGE_ROWS = 5000
+
+# cursor mark for the first page
+START = '*'
+
+# subjects per query when fetching associations for a large subject set,
+# and number of such queries run concurrently
+CHUNK_SIZE = 500
+CHUNK_WORKERS = 4
+
+# fields of a compact association, in tabular output order
+COMPACT_COLUMNS = ['subject', 'subject_label', 'relation', 'objects']
+
+def iter_pages(subject_category=None, object_category=None, taxon=None, rows=PAGE_ROWS, cursor=START, **kwargs):
+    """
+    Yield (cursor, next_cursor, compact_associations) for each page of a bulk query
+
+    Documents are sorted by subject, so all associations for a subject are
+    contiguous, though they may straddle two pages; see iter_compact_associations.
+    Additionally, any argument for search_associations can be passed.
+    """
+    q = GolrAssociationQuery(subject_category=subject_category,
+                             object_category=object_category,
+                             subject_taxon=taxon,
+                             use_compact_associations=True,
+                             facet_fields=[],
+                             rows=rows,
+                             **kwargs)
+    params = q.solr_params()
+    params['facet'] = 'off'
+    # for inverted pairs, e.g. disease to gene, compact subjects are the Solr objects
+    subject = M.OBJECT if q.invert_subject_object else M.SUBJECT
+    params['sort'] = '{} asc,{} asc'.format(map_field(subject, q.field_mapping),
+                                            map_field(M.ID, q.field_mapping))
+    while True:
+        results = q.solr.search(cursorMark=cursor, **params)
+        next_cursor = results.nextCursorMark
+        assocs = q.translate_docs_compact(results.docs,
+                                          field_mapping=q.field_mapping,
+                                          slim=q.slim,
+                                          invert_subject_object=q.invert_subject_object,
+                                          map_identifiers=q.map_identifiers)
+        logging.info("Bulk page at {}: {} docs, {} compact associations".format(cursor, len(results.docs), len(assocs)))
+        yield (cursor, next_cursor, assocs)
+        if next_cursor is None or next_cursor == cursor:
+            return
+        cursor = next_cursor
+
+def merge_pages(pages, pending=None):
+    """
+    Merge the compact associations of consecutive pages
+
+    Rows for the last subject of a page are held back until the next page
+    shows whether that subject continues. Yields (next_cursor, rows, pending),
+    where pending is the list of rows held back after this page, so memory is
+    bounded by the page size.
+    """
+    if pending is None:
+        pending = []
+    held = {(a['subject'], a['relation']): a for a in pending}
+    for (cursor, next_cursor, assocs) in pages:
+        for a in assocs:
+            k = (a['subject'], a['relation'])
+            if k in held:
+                held[k] = dict(held[k], objects=sorted(set(held[k]['objects']) | set(a['objects'])))
+            else:
+                held[k] = a
+        if len(assocs) > 0:
+            last = assocs[-1]['subject']
+            rows = [a for (k, a) in held.items() if k[0] != last]
+            held = {k: a for (k, a) in held.items() if k[0] == last}
+        else:
+            rows = list(held.values())
+            held = {}
+        yield (next_cursor, rows, list(held.values()))
+    if len(held) > 0:
+        yield (None, list(held.values()), [])
+
+def iter_compact_associations(subject_category=None, object_category=None, taxon=None, **kwargs):
+    """
+    Yield compact associations one at a time, as for bulk_fetch
+    """
+    for (_, rows, _) in merge_pages(iter_pages(subject_category, object_category, taxon, **kwargs)):
+        for row in rows:
+            yield row
+
+def iter_subject_set(subjects, chunk_size=CHUNK_SIZE, max_workers=CHUNK_WORKERS, **kwargs):
+    """
+    Yield compact associations for every subject in a (possibly large) set
+
+    The set is split into chunks of chunk_size subjects, each paged through
+    separately, with up to max_workers chunks in flight. Rows are yielded
+    chunk by chunk in input order, so at most max_workers chunks of results
+    are held at once. Additionally, any argument for search_associations
+    can be passed.
+
+    A subject matched through the subject closure of more than one chunk
+    (e.g. a genotype of two genes in the set) yields one row per chunk.
+    """
+    subjects = list(subjects)
+    chunks = [subjects[i:i+chunk_size] for i in range(0, len(subjects), chunk_size)]
+    if len(chunks) == 0:
+        return
+
+    def fetch(chunk):
+        return list(iter_compact_associations(subjects=chunk, **kwargs))
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(chunks)))
+    todo = deque(chunks)
+    pending = deque()
+    try:
+        while len(pending) > 0 or len(todo) > 0:
+            while len(todo) > 0 and len(pending) < max_workers:
+                pending.append(executor.submit(fetch, todo.popleft()))
+            for row in pending.popleft().result():
+                yield row
+    finally:
+        for f in pending:
+            f.cancel()
+        executor.shutdown(wait=False)
+
+def merge_compact(rows):
+    """
+    Merge compact associations sharing a (subject, relation) pair, keeping first-seen order
+    """
+    merged = {}
+    for a in rows:
+        k = (a['subject'], a['relation'])
+        if k in merged:
+            merged[k] = dict(merged[k], objects=sorted(set(merged[k]['objects']) | set(a['objects'])))
+        else:
+            merged[k] = a
+    return list(merged.values())
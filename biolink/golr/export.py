@@ -0,0 +1,221 @@
+"""
+Background bulk export jobs
+
+A job pages through a bulk association query (see biolink.golr.bulk) and
+writes each page as a gzipped part file in its own directory:
+
+    <root>/<job_id>/job.json
+    <root>/<job_id>/part-00000.ndjson.gz
+    ...
+
+job.json is rewritten after each part, recording the Solr cursor and any
+rows held back for the next page. A job interrupted by a crash or restart
+resumes from that checkpoint the next time the worker starts.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from biolink.golr.bulk import iter_pages, merge_pages, START, COMPACT_COLUMNS
+from biolink.util.stream import ndjson_lines, tsv_lines, encoded_chunks, gzip_chunks
+from biolink import settings
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+FORMATS = ('ndjson', 'tsv')
+
+class ExportJobs:
+    """
+    Directory of export jobs, plus the worker thread that runs them
+
+    Arguments
+    ---------
+    root
+        directory holding one subdirectory per job
+
+    fetch_pages
+        function with the signature of biolink.golr.bulk.iter_pages
+    """
+    def __init__(self, root, fetch_pages=iter_pages):
+        self.root = root
+        self.fetch_pages = fetch_pages
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._locks = {}
+
+    def submit(self, subject_category, object_category, taxon=None, format='ndjson'):
+        """
+        Create a job and queue it, returning its status
+        """
+        if format not in FORMATS:
+            raise ValueError("Unknown export format: {}".format(format))
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'status': QUEUED,
+            'query': {'subject_category': subject_category,
+                      'object_category': object_category,
+                      'taxon': taxon},
+            'format': format,
+            'cursor': START,
+            'pending': [],
+            'parts': [],
+            'rows': 0,
+            'error': None,
+            'created': time.time(),
+            'updated': time.time(),
+        }
+        os.makedirs(self._job_dir(job_id))
+        self._save(job)
+        self._queue.put(job_id)
+        self.start()
+        return self.status(job_id)
+
+    def status(self, job_id):
+        """
+        Public view of a job (no checkpoint state), or None if there is no such job
+        """
+        job = self._load(job_id)
+        if job is None:
+            return None
+        return {k: v for (k, v) in job.items() if k not in ('cursor', 'pending')}
+
+    def part_path(self, job_id, part):
+        """
+        Path of a finished part file of a job, or None
+        """
+        job = self._load(job_id)
+        if job is None or part not in job['parts']:
+            return None
+        return os.path.join(self._job_dir(job_id), part)
+
+    def start(self):
+        """
+        Start the worker thread if needed, re-queueing unfinished jobs
+        """
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            if os.path.isdir(self.root):
+                queued = set(self._queue.queue)
+                for job_id in sorted(os.listdir(self.root)):
+                    job = self._load(job_id)
+                    if job is not None and job['status'] in (QUEUED, RUNNING) and job_id not in queued:
+                        logging.info("Resuming export job {} at cursor {}".format(job_id, job['cursor']))
+                        self._queue.put(job_id)
+            self._worker = threading.Thread(target=self._work, name='export-worker', daemon=True)
+            self._worker.start()
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self.run(job_id)
+            except Exception as e:
+                logging.error("Export job {} failed: {}".format(job_id, e))
+
+    def run(self, job_id):
+        """
+        Run (or resume) a job to completion in the calling thread
+        """
+        job = self._load(job_id)
+        if job is None or job['status'] in (DONE, FAILED):
+            return
+        if not self._claim(job_id):
+            logging.info("Export job {} is being run by another process".format(job_id))
+            return
+        # another process may have finished the job before we took the lock
+        job = self._load(job_id)
+        if job is None or job['status'] in (DONE, FAILED):
+            self._release(job_id)
+            return
+        try:
+            job['status'] = RUNNING
+            self._save(job)
+            q = job['query']
+            pages = self.fetch_pages(q['subject_category'], q['object_category'], q['taxon'],
+                                     cursor=job['cursor'])
+            for (next_cursor, rows, pending) in merge_pages(pages, pending=job['pending']):
+                if len(rows) > 0:
+                    job['parts'].append(self._write_part(job, len(job['parts']), rows))
+                    job['rows'] += len(rows)
+                job['cursor'] = next_cursor
+                job['pending'] = pending
+                self._save(job)
+            job['status'] = DONE
+        except Exception as e:
+            job['status'] = FAILED
+            job['error'] = str(e)
+            raise
+        finally:
+            self._save(job)
+            self._release(job_id)
+
+    def _write_part(self, job, n, rows):
+        name = 'part-{:05d}.{}.gz'.format(n, job['format'])
+        path = os.path.join(self._job_dir(job['id']), name)
+        if job['format'] == 'tsv':
+            lines = tsv_lines(rows, COMPACT_COLUMNS, header=(n == 0))
+        else:
+            lines = ndjson_lines(rows)
+        # write then rename, so a part listed in job.json is always complete
+        with open(path + '.tmp', 'wb') as f:
+            for chunk in gzip_chunks(encoded_chunks(lines)):
+                f.write(chunk)
+        os.replace(path + '.tmp', path)
+        return name
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def _load(self, job_id):
+        if os.path.sep in job_id or job_id.startswith('.'):
+            return None
+        try:
+            with open(os.path.join(self._job_dir(job_id), 'job.json')) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def _save(self, job):
+        job['updated'] = time.time()
+        path = os.path.join(self._job_dir(job['id']), 'job.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(job, f)
+        os.replace(path + '.tmp', path)
+
+    def _claim(self, job_id):
+        """
+        Take an exclusive lock on the job's lock file, unless another run holds it
+
+        The lock is held for as long as the file stays open, and the kernel
+        drops it when a process dies, so a crash never leaves a stale lock.
+        """
+        f = open(os.path.join(self._job_dir(job_id), 'lock'), 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        with self._lock:
+            self._locks[job_id] = f
+        return True
+
+    def _release(self, job_id):
+        with self._lock:
+            f = self._locks.pop(job_id, None)
+        if f is not None:
+            # closing the file releases the lock; the file itself stays
+            f.close()
+
+exports = ExportJobs(settings.MART_EXPORT_DIR)
@@ -0,0 +1,69 @@
+"""
+Cached, concurrent entity search
+
+search_entities runs a GolrSearchQuery and caches its payload per term and
+options, like biolink.golr.associations does for association queries.
+batch_search resolves many terms at once over a bounded pool.
+"""
+
+import logging
+import pickle
+
+from ontobio.golr.golr_query import GolrSearchQuery
+from backendutil.cache import LRUCache, SQLiteCache, TieredCache, make_key
+from backendutil.fanout import FanOut
+from backendutil.singleflight import SingleFlight
+from biolink import settings
+
+KEY_PREFIX = 'search_entities'
+
+def _new_cache():
+    memory = LRUCache(maxsize=settings.SEARCH_CACHE_MAX_ENTRIES,
+                      maxbytes=settings.SEARCH_CACHE_MAX_BYTES)
+    shared = None
+    if settings.SEARCH_CACHE_PATH is not None:
+        shared = SQLiteCache(settings.SEARCH_CACHE_PATH)
+    return TieredCache(memory, shared)
+
+cache = _new_cache()
+flight = SingleFlight()
+
+def search_entities(term, category=None, rows=100, hl=True):
+    """
+    Results of GolrSearchQuery(term, ...).exec(), served from the cache where possible
+    """
+    kwargs = {'term': term, 'category': category, 'rows': rows, 'hl': hl}
+    key = make_key(KEY_PREFIX, kwargs)
+    value = cache.get(key, None)
+    if value is None:
+        value = flight.do(key, _fetch, key, kwargs)
+    return pickle.loads(value)
+
+def _fetch(key, kwargs):
+    results = GolrSearchQuery(**kwargs).exec()
+    value = pickle.dumps(results, pickle.HIGHEST_PROTOCOL)
+    cache.put(key, value, ttl=settings.SEARCH_CACHE_TTL)
+    return value
+
+def batch_search(terms, max_workers=None, timeout=None, **kwargs):
+    """
+    Search each distinct term concurrently
+
+    Returns (results, errors): results maps each term to its search payload,
+    errors maps terms whose query failed to the error message.
+    """
+    if max_workers is None:
+        max_workers = settings.SEARCH_BATCH_WORKERS
+    if timeout is None:
+        timeout = settings.SEARCH_BATCH_TIMEOUT
+    fo = FanOut(max_workers=max_workers, timeout=timeout)
+    for term in dict.fromkeys(terms):
+        fo.add(term, search_entities, term, **kwargs)
+    r = fo.run()
+    errors = {term: str(e) for (term, e) in r.errors.items()}
+    if len(errors) > 0:
+        logging.warning("Batch search: {} of {} terms failed".format(len(errors), len(fo.branches)))
+    return (r.results, errors)
+
+def stats():
+    return dict(cache.stats(), flight=flight.stats())
@@ -0,0 +1,239 @@
+"""
+Precomputed bulk association snapshots
+
+A snapshot materializes one (subject_category, object_category, taxon) bulk
+query into a directory of numpy arrays, which are memory-mapped when served:
+
+    <root>/<version>/<slice>/meta.json
+        query, row count, relation list, build time
+    strings.bin, string_offsets.npy
+        interned identifiers and labels, utf-8, concatenated
+    subject.npy, subject_label.npy, relation.npy
+        one entry per compact association
+    object_offsets.npy, objects.npy
+        objects of row i are objects[object_offsets[i]:object_offsets[i+1]]
+
+Build snapshots with:
+
+    python -m biolink.golr.snapshot --version 2018-03 [SUBJECT OBJECT TAXON]
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from biolink.golr.bulk import iter_compact_associations
+from biolink import settings
+
+# bump when the on-disk layout changes
+FORMAT_VERSION = 1
+
+def slice_name(subject_category, object_category, taxon):
+    return "{}-{}-{}".format(subject_category, object_category, taxon or 'all').replace(':', '_')
+
+def build_snapshot(root, version, subject_category, object_category, taxon, rows=None):
+    """
+    Write a snapshot of a bulk query, returning its directory
+
+    rows defaults to the live query results; any iterable of compact
+    associations can be passed instead. The snapshot is written to a temporary
+    directory and renamed into place, so readers never see a partial snapshot.
+    """
+    if rows is None:
+        rows = iter_compact_associations(subject_category, object_category, taxon)
+    t = time.time()
+    strings = {}
+    relations = {}
+    subject = []
+    subject_label = []
+    relation = []
+    object_offsets = [0]
+    objects = []
+
+    def intern(s):
+        if s is None:
+            s = ''
+        i = strings.get(s)
+        if i is None:
+            i = len(strings)
+            strings[s] = i
+        return i
+
+    for row in rows:
+        subject.append(intern(row['subject']))
+        subject_label.append(intern(row.get('subject_label')))
+        rel = row.get('relation') or ''
+        if rel not in relations:
+            relations[rel] = len(relations)
+        relation.append(relations[rel])
+        objects.extend(intern(o) for o in row['objects'])
+        object_offsets.append(len(objects))
+
+    path = os.path.join(root, version, slice_name(subject_category, object_category, taxon))
+    tmp = "{}.tmp-{}".format(path, os.getpid())
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    encoded = [s.encode('utf-8') for s in strings]
+    with open(os.path.join(tmp, 'strings.bin'), 'wb') as f:
+        for b in encoded:
+            f.write(b)
+    string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=string_offsets[1:])
+    np.save(os.path.join(tmp, 'string_offsets.npy'), string_offsets)
+    np.save(os.path.join(tmp, 'subject.npy'), np.array(subject, dtype=np.int32))
+    np.save(os.path.join(tmp, 'subject_label.npy'), np.array(subject_label, dtype=np.int32))
+    np.save(os.path.join(tmp, 'relation.npy'), np.array(relation, dtype=np.int16))
+    np.save(os.path.join(tmp, 'object_offsets.npy'), np.array(object_offsets, dtype=np.int64))
+    np.save(os.path.join(tmp, 'objects.npy'), np.array(objects, dtype=np.int32))
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'version': version,
+        'query': {'subject_category': subject_category,
+                  'object_category': object_category,
+                  'taxon': taxon},
+        'rows': len(subject),
+        'strings': len(encoded),
+        'relations': sorted(relations, key=relations.get),
+        'built': time.time(),
+    }
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.rename(tmp, path)
+    logging.info("Snapshot {} built: {} rows in {:.1f}s".format(path, len(subject), time.time() - t))
+    return path
+
+def file_stamp(st):
+    # a rebuilt snapshot is a new directory, so its meta.json is a new file
+    return (st.st_dev, st.st_ino, st.st_mtime_ns)
+
+class Snapshot:
+    """
+    Memory-mapped, read-only view of a snapshot directory
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.stamp = file_stamp(os.fstat(f.fileno()))
+            self.meta = json.load(f)
+        if self.meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError("Snapshot {} has format {}, expected {}".format(
+                path, self.meta.get('format_version'), FORMAT_VERSION))
+        self.relations = self.meta['relations']
+        self.string_offsets = self._load('string_offsets')
+        self.subject = self._load('subject')
+        self.subject_label = self._load('subject_label')
+        self.relation = self._load('relation')
+        self.object_offsets = self._load('object_offsets')
+        self.objects = self._load('objects')
+        with open(os.path.join(path, 'strings.bin'), 'rb') as f:
+            if os.fstat(f.fileno()).st_size > 0:
+                self.strings = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.strings = b''
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, name + '.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def string(self, i):
+        return self.strings[self.string_offsets[i]:self.string_offsets[i+1]].decode('utf-8')
+
+    def rows(self, start=0, end=None):
+        """
+        Yield compact associations, in the same form as bulk_fetch
+        """
+        if end is None:
+            end = len(self)
+        for i in range(start, end):
+            o = self.object_offsets
+            yield {'subject': self.string(self.subject[i]),
+                   'subject_label': self.string(self.subject_label[i]),
+                   'relation': self.relations[self.relation[i]] or None,
+                   'objects': [self.string(j) for j in self.objects[o[i]:o[i+1]]]}
+
+class SnapshotStore:
+    """
+    Snapshots of one version under a root directory, opened on first use
+
+    An open snapshot is reused until its directory is rebuilt, which is
+    checked on each get() by a stat of its meta.json.
+
+    Arguments
+    ---------
+    root
+        directory holding one subdirectory per version
+
+    version
+        data version to serve; None disables snapshots
+    """
+    def __init__(self, root, version=None):
+        self.root = root
+        self.version = version
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def get(self, subject_category, object_category, taxon):
+        """
+        Snapshot for a bulk query, or None if there is none for the current version
+        """
+        if self.version is None:
+            return None
+        path = os.path.join(self.root, self.version, slice_name(subject_category, object_category, taxon))
+        try:
+            stamp = file_stamp(os.stat(os.path.join(path, 'meta.json')))
+        except OSError:
+            stamp = None
+        with self._lock:
+            snapshot = self._open.get(path)
+            if snapshot is not None and snapshot.stamp != stamp:
+                # rebuilt or removed; readers still holding the old one keep their mappings
+                logging.info("Snapshot {} changed on disk, reopening".format(path))
+                del self._open[path]
+                snapshot = None
+            if snapshot is None and stamp is not None:
+                try:
+                    snapshot = Snapshot(path)
+                except (IOError, ValueError) as e:
+                    logging.error("Cannot open snapshot {}: {}".format(path, e))
+                    return None
+                if snapshot.meta['version'] != self.version:
+                    logging.error("Snapshot {} is version {}".format(path, snapshot.meta['version']))
+                    return None
+                self._open[path] = snapshot
+            return snapshot
+
+    def stats(self):
+        return {'version': self.version,
+                'open': {s.path: len(s) for s in self._open.values()}}
+
+snapshots = SnapshotStore(settings.MART_SNAPSHOT_DIR, settings.MART_SNAPSHOT_VERSION)
+
+def main():
+    parser = argparse.ArgumentParser(description='Build mart snapshots for bulk association queries')
+    parser.add_argument('--root', default=settings.MART_SNAPSHOT_DIR, help='snapshot directory')
+    parser.add_argument('--version', default=settings.MART_SNAPSHOT_VERSION, required=settings.MART_SNAPSHOT_VERSION is None,
+                        help='data version to label the snapshots with')
+    parser.add_argument('query', nargs='*', help='SUBJECT_CATEGORY OBJECT_CATEGORY TAXON; defaults to MART_SNAPSHOT_SLICES')
+    args = parser.parse_args()
+    slices = settings.MART_SNAPSHOT_SLICES
+    if len(args.query) > 0:
+        if len(args.query) != 3:
+            parser.error('expected SUBJECT_CATEGORY OBJECT_CATEGORY TAXON')
+        slices = [tuple(args.query)]
+    logging.basicConfig(level=logging.INFO)
+    for (subject_category, object_category, taxon) in slices:
+        build_snapshot(args.root, args.version, subject_category, object_category, taxon)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+from biolink.golr import annotations
+from biolink.golr.annotations import annotation_pairs
+
+class Raw:
+    def __init__(self, docs):
+        self.docs = docs
+
+DOCS = [
+    {'subject': 'G1', 'subject_closure': ['G1'], 'object_closure': ['T1', 'T0']},
+    # a genotype of G1 and G2
+    {'subject': 'GT1', 'subject_closure': ['GT1', 'G1', 'G2'], 'object_closure': ['T2']},
+    {'subject': 'G3', 'subject_closure': ['G3'], 'object_closure': ['T3']},
+]
+
+def test_annotation_pairs(monkeypatch):
+    queries = []
+    def fake_search_associations(subjects=None, **kwargs):
+        queries.append(subjects)
+        docs = [dict(d) for d in DOCS if set(subjects) & set(d['subject_closure'])]
+        return {'raw': Raw(docs)}
+    monkeypatch.setattr(annotations, 'search_associations', fake_search_associations)
+    monkeypatch.setattr(annotations, 'CHUNK_SIZE', 2)
+    pairs = annotation_pairs(['G1', 'G2', 'G3'], 'phenotype')
+    assert pairs == {('G1', 'T1'), ('G1', 'T0'), ('G1', 'T2'), ('G2', 'T2'), ('G3', 'T3')}
+    assert sorted(len(q) for q in queries) == [1, 2]
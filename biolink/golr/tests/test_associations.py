@@ -0,0 +1,68 @@
+from ontobio.golr import golr_associations
+from biolink.golr import associations
+from biolink.golr.associations import search_associations, category_ttl
+
+calls = []
+
+def fake_search_associations(**kwargs):
+    calls.append(kwargs)
+    return {'associations': [{'subject': kwargs.get('subject')}]}
+
+def test_cached_search(monkeypatch):
+    monkeypatch.setattr(golr_associations, 'search_associations', fake_search_associations)
+    associations.cache.clear()
+    del calls[:]
+    r1 = search_associations(subject='NCBIGene:1', object_category='phenotype', rows=20, fq=None)
+    r1['associations'].append('modified')
+    r2 = search_associations(rows=20, object_category='phenotype', subject='NCBIGene:1')
+    assert len(calls) == 1
+    assert r2 == {'associations': [{'subject': 'NCBIGene:1'}]}
+    search_associations(subject='NCBIGene:2', object_category='phenotype', rows=20)
+    search_associations(subject='NCBIGene:1', include_raw=True)
+    search_associations(subject='NCBIGene:1', include_raw=True)
+    assert len(calls) == 4
+
+def test_category_ttl():
+    assert category_ttl({'object_category': 'phenotype', 'subject_category': 'function'}) == \
+        min(associations.settings.ASSOCIATION_CACHE_CATEGORY_TTLS['phenotype'],
+            associations.settings.ASSOCIATION_CACHE_CATEGORY_TTLS['function'])
+    assert category_ttl({'object_category': 'xyz'}) == associations.settings.ASSOCIATION_CACHE_TTL
+
+def test_coalesced_get_association(monkeypatch):
+    import threading, time
+    n = []
+    def slow_get_association(id, **kwargs):
+        n.append(id)
+        time.sleep(0.2)
+        return {'id': id}
+    monkeypatch.setattr(golr_associations, 'get_association', slow_get_association)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(associations.get_association('a1'))) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [{'id': 'a1'}] * 5
+    assert len(n) == 1
+    assert len(set(id(r) for r in results)) == 5
+
+def test_unpicklable_and_errors(monkeypatch):
+    import threading
+    import pytest
+    n = []
+    def unpicklable(**kwargs):
+        n.append(kwargs)
+        return {'associations': [], 'lock': threading.Lock()}
+    monkeypatch.setattr(golr_associations, 'search_associations', unpicklable)
+    associations.cache.clear()
+    r = search_associations(subject='NCBIGene:3')
+    assert r['associations'] == []
+    # returned as is, not queried again
+    assert len(n) == 1
+    def broken(**kwargs):
+        n.append(kwargs)
+        raise TypeError('bad argument')
+    monkeypatch.setattr(golr_associations, 'search_associations', broken)
+    with pytest.raises(TypeError):
+        search_associations(subject='NCBIGene:4')
+    assert len(n) == 2
@@ -0,0 +1,64 @@
+from biolink.golr.bulk import merge_pages
+
+def assoc(subject, objects, relation='rel'):
+    return {'subject': subject, 'subject_label': subject, 'relation': relation, 'objects': objects}
+
+def test_merge_pages():
+    pages = [
+        ('*', 'c1', [assoc('A', ['X']), assoc('B', ['X'])]),
+        ('c1', 'c2', [assoc('B', ['Y']), assoc('C', ['Z'])]),
+        ('c2', 'c2', []),
+    ]
+    out = list(merge_pages(iter(pages)))
+    assert [r['subject'] for r in out[0][1]] == ['A']
+    assert out[0][0] == 'c1'
+    assert out[0][2] == [assoc('B', ['X'])]
+    assert out[1][1] == [assoc('B', ['X', 'Y'])]
+    assert out[2][1] == [assoc('C', ['Z'])]
+    rows = [r for (_, rs, _) in out for r in rs]
+    assert [r['subject'] for r in rows] == ['A', 'B', 'C']
+
+def test_merge_pages_resume():
+    pending = [assoc('B', ['X'])]
+    out = list(merge_pages(iter([('c1', 'c2', [assoc('B', ['Y'], 'r2'), assoc('C', ['Z'])])]), pending=pending))
+    rows = [r for (_, rs, _) in out for r in rs]
+    assert rows == [assoc('B', ['X']), assoc('B', ['Y'], 'r2'), assoc('C', ['Z'])]
+
+def test_iter_subject_set(monkeypatch):
+    import threading, time
+    from biolink.golr import bulk
+    calls = []
+    lock = threading.Lock()
+    def fake(subject_category=None, object_category=None, taxon=None, subjects=None, **kwargs):
+        with lock:
+            calls.append(list(subjects))
+        # later chunks finish first; output order must not depend on it
+        time.sleep(0.05 * (10 - len(calls)))
+        return iter([assoc(s, ['X']) for s in subjects])
+    monkeypatch.setattr(bulk, 'iter_compact_associations', fake)
+    subjects = ['S{:02d}'.format(i) for i in range(23)]
+    rows = list(bulk.iter_subject_set(subjects, chunk_size=5, max_workers=3))
+    assert [r['subject'] for r in rows] == subjects
+    assert sorted(len(c) for c in calls) == [3, 5, 5, 5, 5]
+    assert list(bulk.iter_subject_set([])) == []
+
+def test_merge_compact():
+    from biolink.golr.bulk import merge_compact
+    rows = [assoc('A', ['X']), assoc('B', ['X']), assoc('A', ['Y', 'X'])]
+    assert merge_compact(rows) == [assoc('A', ['X', 'Y']), assoc('B', ['X'])]
+
+def test_iter_pages_sort(monkeypatch):
+    import pysolr
+    from biolink.golr.bulk import iter_pages
+    sorts = []
+    class Results:
+        docs = []
+        nextCursorMark = '*'
+    def search(self, q=None, **params):
+        sorts.append(params['sort'])
+        return Results()
+    monkeypatch.setattr(pysolr.Solr, 'search', search)
+    list(iter_pages('gene', 'disease'))
+    # disease to gene is inverted: compact subjects are the diseases in the object field
+    list(iter_pages('disease', 'gene'))
+    assert sorts == ['subject asc,id asc', 'object asc,id asc']
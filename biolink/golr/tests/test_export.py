@@ -0,0 +1,76 @@
+import gzip
+import json
+import os
+import time
+import pytest
+from biolink.golr.export import ExportJobs, DONE, FAILED
+
+def assoc(subject, objects):
+    return {'subject': subject, 'subject_label': subject, 'relation': 'rel', 'objects': objects}
+
+PAGES = [
+    ('*', 'c1', [assoc('A', ['X']), assoc('B', ['X'])]),
+    ('c1', 'c2', [assoc('B', ['Y']), assoc('C', ['Z'])]),
+    ('c2', 'c2', []),
+]
+
+def fake_pages(fail_at=None):
+    def fetch_pages(subject_category, object_category, taxon, cursor='*'):
+        i = [p[0] for p in PAGES].index(cursor)
+        for page in PAGES[i:]:
+            if page[0] == fail_at:
+                raise IOError('solr went away')
+            yield page
+    return fetch_pages
+
+def read_rows(jobs, job_id):
+    rows = []
+    for part in jobs.status(job_id)['parts']:
+        with gzip.open(jobs.part_path(job_id, part), 'rt') as f:
+            rows += [json.loads(line) for line in f]
+    return rows
+
+def test_export(tmpdir):
+    jobs = ExportJobs(str(tmpdir), fetch_pages=fake_pages())
+    job = jobs.submit('gene', 'phenotype', 'NCBITaxon:9606')
+    for i in range(50):
+        if jobs.status(job['id'])['status'] == DONE:
+            break
+        time.sleep(0.1)
+    status = jobs.status(job['id'])
+    assert status['status'] == DONE
+    assert status['rows'] == 3
+    assert 'cursor' not in status
+    assert read_rows(jobs, job['id']) == [assoc('A', ['X']), assoc('B', ['X', 'Y']), assoc('C', ['Z'])]
+    assert jobs.part_path(job['id'], '../job.json') is None
+    assert jobs.status('nosuchjob') is None
+
+def test_resume(tmpdir):
+    # crash while fetching the second page, then resume from the checkpoint
+    jobs = ExportJobs(str(tmpdir), fetch_pages=fake_pages(fail_at='c1'))
+    # keep the worker thread out of it, the test runs the job directly
+    jobs._queue.put = lambda job_id: None
+    jobs.start = lambda: None
+    job_id = jobs.submit('gene', 'phenotype', None)['id']
+    with pytest.raises(IOError):
+        jobs.run(job_id)
+    job = jobs._load(job_id)
+    assert job['status'] == FAILED
+    assert job['cursor'] == 'c1'
+    assert job['pending'] == [assoc('B', ['X'])]
+    # a crashed process leaves the job running and its lock file behind
+    job['status'] = 'running'
+    jobs._save(job)
+    with open(os.path.join(str(tmpdir), job_id, 'lock'), 'w') as f:
+        f.write('999999999')
+    jobs.fetch_pages = fake_pages()
+    # while another run holds the lock, the job is left alone
+    other = ExportJobs(str(tmpdir))
+    assert other._claim(job_id)
+    jobs.run(job_id)
+    assert jobs.status(job_id)['status'] == 'running'
+    assert not jobs._claim(job_id)
+    other._release(job_id)
+    jobs.run(job_id)
+    assert jobs.status(job_id)['status'] == DONE
+    assert read_rows(jobs, job_id) == [assoc('A', ['X']), assoc('B', ['X', 'Y']), assoc('C', ['Z'])]
@@ -0,0 +1,26 @@
+from biolink.golr import search
+from biolink.golr.search import batch_search
+
+calls = []
+
+class FakeSearchQuery:
+    def __init__(self, term=None, **kwargs):
+        calls.append(term)
+        self.term = term
+
+    def exec(self):
+        if self.term == 'bad':
+            raise IOError('unavailable')
+        return {'docs': [{'id': self.term}]}
+
+def test_batch_search(monkeypatch):
+    monkeypatch.setattr(search, 'GolrSearchQuery', FakeSearchQuery)
+    search.cache.clear()
+    del calls[:]
+    (results, errors) = batch_search(['shh', 'fgf8', 'shh', 'bad'], max_workers=2, rows=5)
+    assert results == {'shh': {'docs': [{'id': 'shh'}]}, 'fgf8': {'docs': [{'id': 'fgf8'}]}}
+    assert errors == {'bad': 'unavailable'}
+    assert sorted(calls) == ['bad', 'fgf8', 'shh']
+    (results, errors) = batch_search(['shh', 'pax6'], rows=5)
+    assert sorted(results) == ['pax6', 'shh']
+    assert sorted(calls) == ['bad', 'fgf8', 'pax6', 'shh']
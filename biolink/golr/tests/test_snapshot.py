@@ -0,0 +1,51 @@
+import os
+import shutil
+from biolink.golr.snapshot import build_snapshot, Snapshot, SnapshotStore
+
+ROWS = [
+    {'subject': 'NCBIGene:1', 'subject_label': 'A1BG', 'relation': None, 'objects': ['HP:1', 'HP:2']},
+    {'subject': 'NCBIGene:2', 'subject_label': 'A2M', 'relation': 'RO:1', 'objects': []},
+    {'subject': 'NCBIGene:3', 'subject_label': 'β-gene', 'relation': None, 'objects': ['HP:2']},
+]
+
+def test_roundtrip(tmpdir):
+    root = str(tmpdir)
+    path = build_snapshot(root, 'v1', 'gene', 'phenotype', 'NCBITaxon:9606', rows=iter(ROWS))
+    s = Snapshot(path)
+    assert len(s) == 3
+    assert list(s.rows()) == ROWS
+    assert list(s.rows(1, 2)) == ROWS[1:2]
+    assert s.meta['strings'] == 8
+
+def test_store(tmpdir):
+    root = str(tmpdir)
+    build_snapshot(root, 'v1', 'gene', 'phenotype', 'NCBITaxon:9606', rows=iter(ROWS))
+    assert SnapshotStore(root, None).get('gene', 'phenotype', 'NCBITaxon:9606') is None
+    assert SnapshotStore(root, 'v2').get('gene', 'phenotype', 'NCBITaxon:9606') is None
+    store = SnapshotStore(root, 'v1')
+    s = store.get('gene', 'phenotype', 'NCBITaxon:9606')
+    assert s is store.get('gene', 'phenotype', 'NCBITaxon:9606')
+    assert store.get('gene', 'disease', 'NCBITaxon:9606') is None
+    # rebuilding replaces the snapshot in place
+    build_snapshot(root, 'v1', 'gene', 'phenotype', 'NCBITaxon:9606', rows=iter(ROWS[:1]))
+    assert len(Snapshot(s.path)) == 1
+    assert not any('.tmp' in p for p in os.listdir(os.path.join(root, 'v1')))
+
+def test_empty(tmpdir):
+    path = build_snapshot(str(tmpdir), 'v1', 'gene', 'phenotype', None, rows=iter([]))
+    assert list(Snapshot(path).rows()) == []
+
+def test_store_reopens_rebuilt(tmpdir):
+    root = str(tmpdir)
+    build_snapshot(root, 'v1', 'gene', 'phenotype', 'NCBITaxon:9606', rows=iter(ROWS))
+    store = SnapshotStore(root, 'v1')
+    old = store.get('gene', 'phenotype', 'NCBITaxon:9606')
+    build_snapshot(root, 'v1', 'gene', 'phenotype', 'NCBITaxon:9606', rows=iter(ROWS[:1]))
+    new = store.get('gene', 'phenotype', 'NCBITaxon:9606')
+    assert new is not old
+    assert list(new.rows()) == ROWS[:1]
+    # the old mapping stays readable for requests already using it
+    assert list(old.rows()) == ROWS
+    assert store.get('gene', 'phenotype', 'NCBITaxon:9606') is new
+    shutil.rmtree(new.path)
+    assert store.get('gene', 'phenotype', 'NCBITaxon:9606') is None
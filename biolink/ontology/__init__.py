@@ -0,0 +1,3 @@
+"""
+Process-wide, pre-computed ontology structures shared across requests
+"""
@@ -0,0 +1,173 @@
+"""
+Label resolution for CURIEs, shared by all requests in a worker
+
+Labels are looked up in a large in-process map, warmed from the ontologies
+in the registry. Misses are looked up in loaded ontologies, then fetched
+from the ontology SPARQL endpoint in chunks that run concurrently. IDs
+with no label are remembered for a while, so they cost one query, not one
+per request.
+"""
+
+import logging
+import time
+
+from prefixcommons.curie_util import expand_uri
+from backendutil.cache import LRUCache
+from backendutil.fanout import FanOut
+from biolink.util.sparql import iri, prefix_header, sparql_client
+from biolink.ontology.registry import registry
+from biolink import settings
+
+CHUNK_SIZE = 200
+CHUNK_WORKERS = 4
+
+HEADER = prefix_header({'rdfs': 'http://www.w3.org/2000/01/rdf-schema#'})
+
+def fetch_labels(ids, url=None):
+    """
+    Fetch rdfs:label of each ID with a single SPARQL query
+
+    Returns a dict from ID to label; IDs with no label, and IDs that are
+    neither a known CURIE nor a URI, are absent.
+    """
+    if url is None:
+        url = settings.LABEL_SPARQL_URL
+    iris = {}
+    for id in ids:
+        uri = expand_uri(id, strict=False)
+        if uri == id and '://' not in id:
+            continue
+        try:
+            iris[iri(uri)] = id
+        except ValueError:
+            continue
+    if len(iris) == 0:
+        return {}
+    query = HEADER + """
+    SELECT ?c ?label WHERE {{
+    VALUES ?c {{ {values} }}
+    ?c rdfs:label ?label
+    }}
+    """.format(values=' '.join(iris))
+    bindings = sparql_client(url).query(query)['results']['bindings']
+    m = {}
+    for r in bindings:
+        id = iris.get('<' + r['c']['value'] + '>')
+        if id is not None and id not in m:
+            m[id] = r['label']['value']
+    return m
+
+class LabelService:
+    """
+    Cached map from IDs to labels
+
+    Arguments
+    ---------
+    fetch
+        function with the signature of fetch_labels
+
+    ontologies
+        OntologyRegistry whose loaded ontologies are consulted before fetch
+
+    maxsize
+        maximum number of IDs held, labelled or not
+
+    negative_ttl
+        seconds an ID with no label is remembered as such
+    """
+    def __init__(self, fetch=fetch_labels, ontologies=registry, maxsize=1000000, negative_ttl=3600,
+                 chunk_size=CHUNK_SIZE, max_workers=CHUNK_WORKERS):
+        self.fetch = fetch
+        self.ontologies = ontologies
+        self.negative_ttl = negative_ttl
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.cache = LRUCache(maxsize=maxsize)
+        self.fetched = 0
+
+    def labels(self, ids):
+        """
+        Dict from each ID with a known label to its label
+        """
+        m = {}
+        misses = []
+        for id in ids:
+            entry = self.cache.get_entry(id)
+            if entry is None:
+                misses.append(id)
+            elif entry[0] is not None:
+                m[id] = entry[0]
+        if len(misses) > 0:
+            m.update(self._resolve(list(dict.fromkeys(misses))))
+        return m
+
+    def label(self, id):
+        return self.labels([id]).get(id)
+
+    def warm(self, ont):
+        """
+        Add the labels of all nodes of an ontology, returning how many were added
+        """
+        t = time.time()
+        n = 0
+        g = ont.get_graph()
+        for (id, d) in g.nodes(data=True):
+            label = d.get('label')
+            if label is not None:
+                self.cache.put(id, label)
+                n += 1
+        logging.info("Warmed {} labels from {} in {:.2f}s".format(n, ont.handle, time.time() - t))
+        return n
+
+    def warm_loaded(self):
+        """
+        Add the labels of all ontologies loaded in the registry
+        """
+        for handle in self.ontologies.handles():
+            self.warm(self.ontologies.get(handle))
+
+    def _resolve(self, ids):
+        found = {}
+        remaining = []
+        onts = [self.ontologies.get(h) for h in self.ontologies.handles()]
+        for id in ids:
+            label = None
+            for ont in onts:
+                label = ont.label(id)
+                if label is not None:
+                    break
+            if label is None:
+                remaining.append(id)
+            else:
+                found[id] = label
+                self.cache.put(id, label)
+        if len(remaining) == 0:
+            return found
+
+        fo = FanOut(max_workers=self.max_workers)
+        for i in range(0, len(remaining), self.chunk_size):
+            fo.add(i, self.fetch, remaining[i:i+self.chunk_size])
+        r = fo.run()
+        for (i, chunk_labels) in r.results.items():
+            chunk = remaining[i:i+self.chunk_size]
+            for id in chunk:
+                label = chunk_labels.get(id)
+                if label is None:
+                    self.cache.put(id, None, ttl=self.negative_ttl)
+                else:
+                    found[id] = label
+                    self.cache.put(id, label)
+            self.fetched += len(chunk)
+        # failed chunks are not cached, so they are retried on the next request
+        for i in r.failed():
+            logging.error("Label fetch for {} ids failed: {}".format(
+                len(remaining[i:i+self.chunk_size]), r.errors[i]))
+        return found
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats['fetched'] = self.fetched
+        return stats
+
+labels = LabelService(maxsize=settings.LABEL_CACHE_MAX_ENTRIES,
+                      negative_ttl=settings.LABEL_CACHE_NEGATIVE_TTL)
@@ -0,0 +1,161 @@
+"""
+Registry of loaded ontologies, shared by all requests in a worker
+
+Ontologies are loaded at most once per process, on first use or at startup
+for those marked pre_load in conf/config.yaml. Filtered graphs are cached
+per relation set, so repeated requests only pay for the traversal.
+"""
+
+import logging
+import resource
+import threading
+import time
+
+from ontobio.config import get_config
+from ontobio.ontol_factory import OntologyFactory
+from biolink.ontology.closure import ClosureIndex
+
+class OntologyRegistry:
+    """
+    Maps ontology handles (e.g. go, uberon, pato) to loaded Ontology objects
+    """
+    def __init__(self, factory=None):
+        if factory is None:
+            factory = OntologyFactory()
+        self.factory = factory
+        self._ontologies = {}
+        self._filtered_graphs = {}
+        self._closures = {}
+        self._stats = {}
+        self._locks = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def get(self, handle):
+        """
+        Return the Ontology for handle, loading it if necessary
+        """
+        return self._once(self._ontologies, handle, lambda: self._load(handle))
+
+    def get_filtered_graph(self, handle, relations=None):
+        """
+        Return the networkx graph of handle restricted to relations (all if None)
+
+        The returned graph is shared and must not be modified.
+        """
+        key = (handle, relation_key(relations))
+        return self._once(self._filtered_graphs, key,
+                          lambda: self.get(handle).get_filtered_graph(relations=relations))
+
+    def get_closure_index(self, handle, relations=None):
+        """
+        Return the ClosureIndex over the filtered graph of handle for relations
+        """
+        key = (handle, relation_key(relations))
+        return self._once(self._closures, key,
+                          lambda: ClosureIndex(self.get_filtered_graph(handle, relations)))
+
+    def add_listener(self, fn):
+        """
+        Call fn(handle, ontology) after each load, and fn(handle, None) after each evict
+        """
+        self._listeners.append(fn)
+
+    def is_loaded(self, handle):
+        return handle in self._ontologies
+
+    def handles(self):
+        return list(self._ontologies.keys())
+
+    def preload(self, config=None):
+        """
+        Load all ontologies marked pre_load in the config
+
+        Failures are logged rather than raised, so that a missing ontology
+        does not stop the server from starting.
+        """
+        if config is None:
+            config = get_config()
+        for oc in getattr(config, 'ontologies', []):
+            if oc.pre_load:
+                try:
+                    self.get(oc.handle)
+                except Exception as e:
+                    logging.error("Could not pre-load {}: {}".format(oc.handle, e))
+
+    def evict(self, handle):
+        """
+        Drop an ontology and its filtered graphs; the next get() reloads it
+        """
+        with self._lock:
+            self._ontologies.pop(handle, None)
+            self._stats.pop(handle, None)
+            for store in [self._filtered_graphs, self._closures]:
+                for k in [k for k in store if k[0] == handle]:
+                    del store[k]
+        self._notify(handle, None)
+
+    def stats(self):
+        """
+        Load time and size of each loaded ontology
+        """
+        stats = {}
+        for (handle, s) in list(self._stats.items()):
+            s = dict(s)
+            s['filtered_graphs'] = [list(rels) if rels is not None else None
+                                    for (h, rels) in list(self._filtered_graphs.keys()) if h == handle]
+            s['closure_entries'] = sum(ci.size() for ((h, rels), ci) in list(self._closures.items()) if h == handle)
+            stats[handle] = s
+        return stats
+
+    def _load(self, handle):
+        logging.info("Loading ontology: {}".format(handle))
+        rss_before = _maxrss_kb()
+        t = time.time()
+        ont = self.factory.create(handle)
+        load_time = time.time() - t
+        g = ont.get_graph()
+        self._stats[handle] = {
+            'load_seconds': load_time,
+            'loaded_at': time.time(),
+            'nodes': g.number_of_nodes() if g is not None else None,
+            'edges': g.number_of_edges() if g is not None else None,
+            # approximate; peak RSS only grows
+            'maxrss_growth_kb': _maxrss_kb() - rss_before,
+        }
+        logging.info("Loaded {} in {:.2f}s".format(handle, load_time))
+        self._notify(handle, ont)
+        return ont
+
+    def _notify(self, handle, ont):
+        for fn in self._listeners:
+            try:
+                fn(handle, ont)
+            except Exception as e:
+                logging.error("Listener {} failed for {}: {}".format(fn, handle, e))
+
+    def _once(self, store, key, fn):
+        v = store.get(key)
+        if v is not None:
+            return v
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            v = store.get(key)
+            if v is None:
+                v = fn()
+                store[key] = v
+        return v
+
+def relation_key(relations):
+    """
+    Order-independent key for a list of relations (None means all)
+    """
+    if relations is None:
+        return None
+    return tuple(sorted(set(relations)))
+
+def _maxrss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+registry = OntologyRegistry()
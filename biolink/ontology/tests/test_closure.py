@@ -0,0 +1,31 @@
+import random
+import networkx as nx
+from biolink.ontology.closure import ClosureIndex
+
+def random_graph(n=60, m=120, seed=1):
+    rnd = random.Random(seed)
+    g = nx.MultiDiGraph()
+    for i in range(n):
+        g.add_node('X:{}'.format(i))
+    for _ in range(m):
+        (a, b) = rnd.sample(range(n), 2)
+        g.add_edge('X:{}'.format(a), 'X:{}'.format(b), pred='subClassOf')
+    return g
+
+def test_matches_networkx():
+    for seed in range(5):
+        g = random_graph(seed=seed)
+        ci = ClosureIndex(g)
+        for n in g.nodes():
+            assert ci.ancestors(n) == nx.ancestors(g, n)
+            assert ci.descendants(n) == nx.descendants(g, n)
+
+def test_multi_seed_closure():
+    g = nx.MultiDiGraph()
+    g.add_edge('A', 'B', pred='subClassOf')
+    g.add_edge('B', 'C', pred='subClassOf')
+    g.add_edge('A', 'D', pred='subClassOf')
+    ci = ClosureIndex(g)
+    assert ci.closure(['B'], up=True, down=True) == {'A', 'B', 'C'}
+    assert ci.closure(['C', 'D'], up=True) == {'A', 'B', 'C', 'D'}
+    assert ci.closure(['Z:1']) == {'Z:1'}
@@ -0,0 +1,58 @@
+import networkx as nx
+from ontobio.ontol import Ontology
+from biolink.ontology.labels import LabelService
+from biolink.ontology.registry import OntologyRegistry
+
+class FakeFactory:
+    def create(self, handle):
+        g = nx.MultiDiGraph()
+        g.add_node('X:1', label='one')
+        g.add_node('X:2', label='two')
+        return Ontology(handle=handle, graph=g)
+
+def test_labels():
+    fetched = []
+    def fetch(ids):
+        fetched.append(list(ids))
+        return {id: id.lower() for id in ids if id.startswith('Y')}
+    r = OntologyRegistry(factory=FakeFactory())
+    s = LabelService(fetch=fetch, ontologies=r, chunk_size=2)
+    r.get('x')
+    assert s.labels(['X:1', 'Y:1', 'Y:2', 'Z:1', 'Y:1']) == {'X:1': 'one', 'Y:1': 'y:1', 'Y:2': 'y:2'}
+    assert sorted(sum(fetched, [])) == ['Y:1', 'Y:2', 'Z:1']
+    assert max(len(c) for c in fetched) == 2
+    # hits and negative hits do not fetch again
+    fetched.clear()
+    assert s.labels(['Y:2', 'Z:1', 'X:2']) == {'Y:2': 'y:2', 'X:2': 'two'}
+    assert fetched == []
+
+def test_warm_and_failure():
+    def fetch(ids):
+        raise IOError('down')
+    r = OntologyRegistry(factory=FakeFactory())
+    r.get('x')
+    s = LabelService(fetch=fetch, ontologies=r)
+    s.warm_loaded()
+    assert s.stats()['size'] == 2
+    assert s.labels(['X:1', 'Q:1']) == {'X:1': 'one'}
+    # failed lookups are not negatively cached
+    assert s.cache.get_entry('Q:1') is None
+
+def test_fetch_labels(monkeypatch):
+    from biolink.ontology import labels
+    queries = []
+    class FakeClient:
+        def query(self, q):
+            queries.append(q)
+            return {'results': {'bindings': [
+                {'c': {'value': 'http://purl.obolibrary.org/obo/GO_0008150'}, 'label': {'value': 'biological_process'}}]}}
+    monkeypatch.setattr(labels, 'sparql_client', lambda url: FakeClient())
+    m = labels.fetch_labels(['GO:0008150', 'FOO:1', 'GO:1> } ?c ?p ?o {', 'http://example.org/x'], url='http://example.org/sparql')
+    assert m == {'GO:0008150': 'biological_process'}
+    assert len(queries) == 1
+    assert '<http://purl.obolibrary.org/obo/GO_0008150> <http://example.org/x> }' in queries[0]
+    assert 'FOO' not in queries[0] and '?p' not in queries[0]
+    assert queries[0].startswith('prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#>\n')
+    # nothing to ask about
+    assert labels.fetch_labels(['FOO:1'], url='http://example.org/sparql') == {}
+    assert len(queries) == 1
@@ -0,0 +1,40 @@
+import networkx as nx
+from ontobio.ontol import Ontology
+from biolink.ontology.registry import OntologyRegistry
+
+class FakeFactory:
+    def __init__(self):
+        self.created = []
+
+    def create(self, handle):
+        self.created.append(handle)
+        g = nx.MultiDiGraph()
+        g.add_edge('X:2', 'X:1', pred='subClassOf')
+        g.add_edge('X:3', 'X:2', pred='BFO:0000050')
+        return Ontology(handle=handle, graph=g)
+
+class FakeConfig:
+    class OC:
+        def __init__(self, handle, pre_load):
+            self.handle = handle
+            self.pre_load = pre_load
+    ontologies = [OC('x', True), OC('y', False)]
+
+def test_load_once():
+    f = FakeFactory()
+    r = OntologyRegistry(factory=f)
+    r.preload(config=FakeConfig())
+    assert r.handles() == ['x']
+    assert r.get('x') is r.get('x')
+    assert f.created == ['x']
+    assert r.stats()['x']['nodes'] == 3
+
+def test_filtered_graph_cache():
+    r = OntologyRegistry(factory=FakeFactory())
+    g1 = r.get_filtered_graph('x', ['subClassOf', 'BFO:0000050'])
+    g2 = r.get_filtered_graph('x', ['BFO:0000050', 'subClassOf'])
+    assert g1 is g2
+    assert g1.number_of_edges() == 2
+    assert r.get_filtered_graph('x', ['subClassOf']).number_of_edges() == 1
+    r.evict('x')
+    assert not r.is_loaded('x')
@@ -0,0 +1,265 @@
+"""
+In-process autocomplete over labels and synonyms
+
+The index is made of segments, one per source: a loaded ontology, or the
+entities (subjects) of a mart snapshot. Each segment holds a sorted list
+of lowercased keys, one per label or synonym and per word start within
+them, so "park" matches "Parkinson disease" and "juvenile parkinsonism".
+Prefix lookups are a pair of bisections, followed by ranking the matching
+range. Segments are rebuilt independently when their ontology is reloaded;
+queries never touch a backend.
+"""
+
+import bisect
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+
+from backendutil.cache import LRUCache
+from biolink import settings
+
+WORD = re.compile(r'[^\W_]+')
+
+# rank tiers; lower is better
+LABEL_START = 0
+SYNONYM_START = 1
+LABEL_WORD = 2
+SYNONYM_WORD = 3
+
+MAX_WORDS = 8
+
+def normalize(s):
+    return ' '.join(s.lower().split())
+
+class Segment:
+    """
+    Sorted prefix keys over the entries of one source
+
+    Arguments
+    ---------
+    entries
+        iterable of (id, label, synonyms, category, taxon)
+    """
+    def __init__(self, entries):
+        self.ids = []
+        self.labels = []
+        categories = {}
+        taxa = {None: 0}
+        category = []
+        taxon = []
+        keyed = []
+        for (id, label, synonyms, cat, tax) in entries:
+            if label is None:
+                continue
+            doc = len(self.ids)
+            self.ids.append(id)
+            self.labels.append(label)
+            category.append(categories.setdefault(cat, len(categories)))
+            taxon.append(taxa.setdefault(tax, len(taxa)))
+            _add_keys(keyed, doc, normalize(label), LABEL_START, LABEL_WORD)
+            for syn in synonyms:
+                if syn:
+                    _add_keys(keyed, doc, normalize(syn), SYNONYM_START, SYNONYM_WORD)
+        keyed.sort()
+        self.keys = [k for (k, r, d) in keyed]
+        self.rank = np.array([r for (k, r, d) in keyed], dtype=np.int32)
+        self.doc = np.array([d for (k, r, d) in keyed], dtype=np.int32)
+        self.categories = categories
+        self.taxa = taxa
+        self.category = np.array(category, dtype=np.int16)
+        self.taxon = np.array(taxon, dtype=np.int32)
+        self.category_names = sorted(categories, key=categories.get)
+        self.taxon_names = sorted(taxa, key=taxa.get)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, prefix, k, categories=None, taxon=None):
+        """
+        Up to k (rank, doc) pairs with a key starting with prefix, best first
+
+        Entries without a taxon match any taxon.
+        """
+        if k <= 0:
+            return []
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+        if lo == hi:
+            return []
+        rank = self.rank[lo:hi]
+        doc = self.doc[lo:hi]
+        mask = None
+        if categories is not None:
+            allowed = [self.categories[c] for c in categories if c in self.categories]
+            mask = np.isin(self.category[doc], allowed)
+        if taxon is not None:
+            t = self.taxa.get(taxon, -1)
+            tmask = (self.taxon[doc] == t) | (self.taxon[doc] == 0)
+            mask = tmask if mask is None else mask & tmask
+        if mask is not None:
+            rank = rank[mask]
+            doc = doc[mask]
+        # a doc can match through several keys; oversample before dropping duplicates
+        m = min(len(rank), k * 8)
+        while True:
+            if m < len(rank):
+                top = np.argpartition(rank, m - 1)[:m]
+            else:
+                top = np.arange(len(rank))
+            top = top[np.argsort(rank[top], kind='stable')]
+            seen = set()
+            hits = []
+            for i in top:
+                d = int(doc[i])
+                if d not in seen:
+                    seen.add(d)
+                    hits.append((int(rank[i]), d))
+                    if len(hits) == k:
+                        return hits
+            if m >= len(rank):
+                return hits
+            m = len(rank)
+
+    def entry(self, doc):
+        return {'id': self.ids[doc],
+                'label': self.labels[doc],
+                'category': self.category_names[self.category[doc]],
+                'taxon': self.taxon_names[self.taxon[doc]]}
+
+def _add_keys(keyed, doc, s, start_tier, word_tier):
+    # the rank also prefers shorter strings
+    length = min(len(s), 9999)
+    keyed.append((s, start_tier * 10000 + length, doc))
+    for (n, m) in enumerate(WORD.finditer(s)):
+        if n == 0:
+            continue
+        if n >= MAX_WORDS:
+            break
+        keyed.append((s[m.start():], word_tier * 10000 + length, doc))
+
+class AutocompleteIndex:
+    """
+    Named segments, replaced atomically as sources change
+    """
+    def __init__(self, cache_size=10000):
+        self._segments = {}
+        self._generation = 0
+        self._stats = {}
+        self._lock = threading.Lock()
+        # short prefixes match large ranges and are also the most frequent
+        self.results = LRUCache(maxsize=cache_size)
+
+    def set_segment(self, name, entries):
+        """
+        Build a segment from entries and swap it in, replacing any of the same name
+        """
+        t = time.time()
+        segment = Segment(entries)
+        with self._lock:
+            segments = dict(self._segments)
+            segments[name] = segment
+            self._segments = segments
+            self._generation += 1
+            self.results.clear()
+            self._stats[name] = {'entries': len(segment),
+                                 'keys': len(segment.keys),
+                                 'build_seconds': time.time() - t}
+        logging.info("Autocomplete segment {}: {} entries, {} keys in {:.2f}s".format(
+            name, len(segment), len(segment.keys), time.time() - t))
+
+    def drop_segment(self, name):
+        with self._lock:
+            segments = dict(self._segments)
+            segments.pop(name, None)
+            self._segments = segments
+            self._generation += 1
+            self.results.clear()
+            self._stats.pop(name, None)
+
+    def search(self, term, k=20, categories=None, taxon=None):
+        """
+        Top k entries with a label or synonym word starting with term
+        """
+        prefix = normalize(term)
+        if prefix == '' or k <= 0:
+            return []
+        # results computed against replaced segments are never served
+        key = (self._generation, prefix, k, tuple(categories) if categories is not None else None, taxon)
+        results = self.results.get(key, None)
+        if results is None:
+            results = self._search(prefix, k, categories, taxon)
+            self.results.put(key, results)
+        return [dict(e) for e in results]
+
+    def _search(self, prefix, k, categories, taxon):
+        hits = []
+        segments = self._segments
+        for (name, segment) in segments.items():
+            for (rank, doc) in segment.search(prefix, k, categories, taxon):
+                hits.append((rank, segment.ids[doc], name, doc))
+        hits.sort()
+        results = []
+        seen = set()
+        for (rank, id, name, doc) in hits:
+            if id not in seen:
+                seen.add(id)
+                results.append(segments[name].entry(doc))
+                if len(results) == k:
+                    break
+        return results
+
+    def stats(self):
+        return {'segments': dict(self._stats), 'results': self.results.stats()}
+
+    def on_ontology(self, handle, ont):
+        """
+        Registry listener: index an ontology when it is loaded, drop it when evicted
+        """
+        name = 'ontology:' + handle
+        if ont is None:
+            self.drop_segment(name)
+        else:
+            category = settings.AUTOCOMPLETE_ONTOLOGY_CATEGORIES.get(handle, 'ontology_class')
+            self.set_segment(name, ontology_entries(ont, category))
+
+    def add_snapshot(self, snapshot):
+        """
+        Index the distinct subjects of a mart snapshot
+        """
+        q = snapshot.meta['query']
+        self.set_segment('snapshot:{}:{}:{}'.format(q['subject_category'], q['object_category'], q['taxon']),
+                         snapshot_entries(snapshot, q['subject_category'], q['taxon']))
+
+    def add_snapshots(self, store, slices):
+        """
+        Index the subjects of each slice that has a snapshot in store
+        """
+        for (subject_category, object_category, taxon) in slices:
+            snapshot = store.get(subject_category, object_category, taxon)
+            if snapshot is not None:
+                self.add_snapshot(snapshot)
+
+def ontology_entries(ont, category):
+    """
+    Yield an entry for each labelled, non-obsolete class of an ontology
+    """
+    for (id, d) in ont.get_graph().nodes(data=True):
+        meta = d.get('meta', {})
+        if meta.get('deprecated'):
+            continue
+        synonyms = [s.get('val') for s in meta.get('synonyms', [])]
+        yield (id, d.get('label'), synonyms, category, None)
+
+def snapshot_entries(snapshot, category, taxon):
+    """
+    Yield an entry for each distinct subject of a snapshot
+    """
+    (subjects, first) = np.unique(np.asarray(snapshot.subject), return_index=True)
+    for (s, i) in zip(subjects, first):
+        label = snapshot.string(snapshot.subject_label[i]) or None
+        yield (snapshot.string(s), label, [], category, taxon)
+
+index = AutocompleteIndex()
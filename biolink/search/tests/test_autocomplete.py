@@ -0,0 +1,44 @@
+import networkx as nx
+from ontobio.ontol import Ontology
+from biolink.golr.snapshot import build_snapshot, Snapshot
+from biolink.ontology.registry import OntologyRegistry
+from biolink.search.autocomplete import AutocompleteIndex
+
+class FakeFactory:
+    def create(self, handle):
+        g = nx.MultiDiGraph()
+        g.add_node('MONDO:1', label='Parkinson disease',
+                   meta={'synonyms': [{'val': 'paralysis agitans', 'pred': 'hasExactSynonym'}]})
+        g.add_node('MONDO:2', label='juvenile Parkinson disease')
+        g.add_node('MONDO:3', label='parkinsonism, obsolete', meta={'deprecated': True})
+        g.add_node('MONDO:4')
+        return Ontology(handle=handle, graph=g)
+
+def test_ontology_segment():
+    index = AutocompleteIndex()
+    r = OntologyRegistry(factory=FakeFactory())
+    r.add_listener(index.on_ontology)
+    r.get('mondo')
+    assert [e['id'] for e in index.search('Park')] == ['MONDO:1', 'MONDO:2']
+    assert index.search('agit')[0] == {'id': 'MONDO:1', 'label': 'Parkinson disease',
+                                       'category': 'disease', 'taxon': None}
+    assert [e['id'] for e in index.search('park', k=1)] == ['MONDO:1']
+    assert index.search('park', k=0) == []
+    assert index._segments['ontology:mondo'].search('park', -1) == []
+    assert index.search('park', categories=['gene']) == []
+    assert index.search('obsolete') == []
+    r.evict('mondo')
+    assert index.search('park') == []
+
+def test_snapshot_segment(tmpdir):
+    rows = [{'subject': 'HGNC:1', 'subject_label': 'PARK7', 'relation': None, 'objects': ['HP:1']},
+            {'subject': 'HGNC:1', 'subject_label': 'PARK7', 'relation': 'RO:1', 'objects': ['HP:2']},
+            {'subject': 'MGI:1', 'subject_label': 'Park7', 'relation': None, 'objects': ['MP:1']}]
+    path = build_snapshot(str(tmpdir), 'v1', 'gene', 'phenotype', 'NCBITaxon:9606', rows=rows[:2])
+    index = AutocompleteIndex()
+    index.add_snapshot(Snapshot(path))
+    path = build_snapshot(str(tmpdir), 'v1', 'gene', 'phenotype', 'NCBITaxon:10090', rows=rows[2:])
+    index.add_snapshot(Snapshot(path))
+    assert [e['id'] for e in index.search('park')] == ['HGNC:1', 'MGI:1']
+    assert [e['id'] for e in index.search('park', taxon='NCBITaxon:10090')] == ['MGI:1']
+    assert index.search('park', categories=['gene'])[0]['taxon'] == 'NCBITaxon:9606'
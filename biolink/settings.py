@@ -1,3 +1,5 @@
+import os
+
 # Flask settings
 FLASK_SERVER_NAME = 'localhost:8888'
 FLASK_DEBUG = True  # Do not use debug mode in production
@@ -11,3 +13,78 @@ RESTPLUS_ERROR_404_HELP = False
 # SQLAlchemy settings
 SQLALCHEMY_DATABASE_URI = 'sqlite:///db.sqlite'
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Association query cache settings
+ASSOCIATION_CACHE_MAX_ENTRIES = 10000
+ASSOCIATION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+ASSOCIATION_CACHE_PATH = None  # set to an SQLite file to share hits between workers
+ASSOCIATION_CACHE_TTL = 3600
+ASSOCIATION_CACHE_CATEGORY_TTLS = {
+    'function': 6 * 3600,
+    'phenotype': 24 * 3600,
+    'disease': 24 * 3600,
+}
+
+# Entity search settings; see biolink.golr.search
+SEARCH_CACHE_MAX_ENTRIES = 50000
+SEARCH_CACHE_MAX_BYTES = 128 * 1024 * 1024
+SEARCH_CACHE_PATH = None  # set to an SQLite file to share hits between workers
+SEARCH_CACHE_TTL = 6 * 3600
+SEARCH_BATCH_WORKERS = 16
+SEARCH_BATCH_TIMEOUT = 300  # for a whole batch, in seconds
+SEARCH_BATCH_MAX_TERMS = 10000
+
+# Mart export job settings
+MART_EXPORT_DIR = 'mart-exports'
+
+# Mart snapshot settings; see biolink.golr.snapshot
+MART_SNAPSHOT_DIR = 'mart-snapshots'
+MART_SNAPSHOT_VERSION = None  # version of the snapshots to serve; None disables them
+MART_SNAPSHOT_SLICES = [
+    ('gene', 'phenotype', 'NCBITaxon:9606'),
+    ('gene', 'phenotype', 'NCBITaxon:10090'),
+    ('gene', 'phenotype', 'NCBITaxon:7955'),
+    ('gene', 'disease', 'NCBITaxon:9606'),
+    ('gene', 'disease', 'NCBITaxon:10090'),
+    ('gene', 'disease', 'NCBITaxon:7955'),
+]
+
+# Enrichment background term frequencies and information content;
+# see biolink.enrichment.background and biolink.enrichment.ic
+ENRICHMENT_BACKGROUND_DIR = 'enrichment-backgrounds'
+ENRICHMENT_IC_DIR = 'enrichment-ic'
+ENRICHMENT_BACKGROUND_VERSION = 'current'  # change at each data release to recompute
+
+# SPARQL client settings; see biolink.util.sparql
+# ttl: seconds a cached result is fresh; stale: further seconds it is served while refreshed
+SPARQL_DEFAULTS = {'timeout': 30, 'max_concurrent': 8, 'ttl': 3600, 'stale': 24 * 3600}
+SPARQL_ENDPOINTS = {
+    'http://query.wikidata.org/sparql': {'timeout': 60, 'max_concurrent': 5},
+    'http://sparql.uniprot.org/sparql': {'ttl': 24 * 3600, 'stale': 7 * 24 * 3600},
+    # LEGO models only change when the store is reloaded
+    'http://rdf.geneontology.org/sparql': {'ttl': 24 * 3600, 'stale': 7 * 24 * 3600},
+}
+SPARQL_CACHE_MAX_ENTRIES = 10000
+SPARQL_CACHE_MAX_BYTES = 128 * 1024 * 1024
+# on-disk tier, kept across restarts and shared between workers; created on first query; None disables it
+SPARQL_CACHE_PATH = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                                 'biolink-api', 'sparql-cache.sqlite')
+
+# Offline identifier mappings, checked before SPARQL; see biowikidata.mapping_index
+MAPPING_INDEX_PATH = 'mapping-index.sqlite'  # used if the file exists
+
+# Label resolution settings; see biolink.ontology.labels
+LABEL_SPARQL_URL = 'http://sparql.hegroup.org/sparql'
+LABEL_CACHE_MAX_ENTRIES = 1000000
+LABEL_CACHE_NEGATIVE_TTL = 3600  # how long an ID with no label is remembered as such
+
+# Autocomplete settings; see biolink.search.autocomplete
+# category reported for the classes of each ontology (default: ontology_class)
+AUTOCOMPLETE_ONTOLOGY_CATEGORIES = {
+    'hp': 'phenotype',
+    'mp': 'phenotype',
+    'mondo': 'disease',
+    'doid': 'disease',
+    'go': 'function',
+    'uberon': 'anatomy',
+}
@@ -0,0 +1,3 @@
+"""
+Similarity between entities, based on the terms they are annotated to
+"""
@@ -0,0 +1,129 @@
+"""
+All-pairs similarity over annotation sets
+
+Each subject's closure-expanded term set is a row of a sparse binary matrix
+A (subjects x terms). Set intersections for every pair are then the sparse
+product A.A', optionally weighted by term information content:
+
+    jaccard   |s1 & s2| / |s1 | s2|
+    simgic    IC(s1 & s2) / IC(s1 | s2), IC summed over terms
+    cosine    |s1 & s2| / sqrt(|s1| |s2|)
+
+Scores are computed a block of rows at a time, so top-k neighbors need
+memory proportional to the block, not the full matrix.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+METRICS = ('jaccard', 'simgic', 'cosine')
+
+# rows of the score matrix computed at once
+BLOCK_ROWS = 512
+
+class AnnotationMatrix:
+    """
+    Sparse subject x term incidence matrix
+
+    Arguments
+    ---------
+    subjects
+        list of subject IDs, giving the row order; subjects with no
+        annotations get an empty row
+
+    pairs
+        iterable of (subject, term) pairs
+
+    ic
+        optional function from a list of terms to an array of information
+        content values; by default IC is estimated from the subjects themselves
+    """
+    def __init__(self, subjects, pairs, ic=None):
+        self.subjects = list(subjects)
+        row_index = {s: i for (i, s) in enumerate(self.subjects)}
+        term_index = {}
+        rows = []
+        cols = []
+        for (s, t) in pairs:
+            i = row_index.get(s)
+            if i is None:
+                continue
+            rows.append(i)
+            cols.append(term_index.setdefault(t, len(term_index)))
+        self.terms = sorted(term_index, key=term_index.get)
+        data = np.ones(len(rows), dtype=np.float64)
+        self.A = sp.csr_matrix((data, (rows, cols)), shape=(len(self.subjects), len(self.terms)))
+        # duplicate pairs would be summed; keep the matrix binary
+        self.A.data[:] = 1.0
+        self.sizes = np.asarray(self.A.sum(axis=1)).ravel()
+        if ic is None:
+            self.ic = self._corpus_ic()
+        else:
+            self.ic = np.asarray(ic(self.terms), dtype=np.float64)
+
+    def _corpus_ic(self):
+        n = max(1, np.count_nonzero(self.sizes))
+        freq = np.asarray(self.A.sum(axis=0)).ravel() / n
+        with np.errstate(divide='ignore'):
+            return np.where(freq > 0, -np.log2(freq), 0.0)
+
+    def block_scores(self, start, end, metric='jaccard'):
+        """
+        Dense score matrix for rows start:end against all subjects
+        """
+        block = self.A[start:end]
+        if metric == 'simgic':
+            weighted = block.multiply(self.ic[None, :]).tocsr()
+            inter = np.asarray((weighted @ self.A.T).todense())
+            totals = self.A @ self.ic
+            union = totals[start:end, None] + totals[None, :] - inter
+        else:
+            inter = np.asarray((block @ self.A.T).todense())
+            if metric == 'cosine':
+                union = np.sqrt(self.sizes[start:end, None] * self.sizes[None, :])
+            elif metric == 'jaccard':
+                union = self.sizes[start:end, None] + self.sizes[None, :] - inter
+            else:
+                raise ValueError("Unknown metric: {}".format(metric))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(union > 0, inter / union, 0.0)
+        return scores
+
+    def matrix(self, metric='jaccard'):
+        """
+        Full subjects x subjects score matrix
+        """
+        n = len(self.subjects)
+        out = np.zeros((n, n))
+        for start in range(0, n, BLOCK_ROWS):
+            end = min(n, start + BLOCK_ROWS)
+            out[start:end] = self.block_scores(start, end, metric)
+        return out
+
+    def top_k(self, k, metric='jaccard'):
+        """
+        For each subject, its k most similar other subjects, best first
+
+        Returns a dict of subject to list of (subject, score).
+        """
+        n = len(self.subjects)
+        k = min(k, n - 1)
+        result = {}
+        for start in range(0, n, BLOCK_ROWS):
+            end = min(n, start + BLOCK_ROWS)
+            scores = self.block_scores(start, end, metric)
+            # exclude self-similarity
+            scores[np.arange(end - start), np.arange(start, end)] = -1.0
+            if k <= 0:
+                for i in range(start, end):
+                    result[self.subjects[i]] = []
+                continue
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind='stable')
+            best = np.take_along_axis(best, order, axis=1)
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+            for r in range(end - start):
+                result[self.subjects[start + r]] = [(self.subjects[j], float(s))
+                                                    for (j, s) in zip(best[r], best_scores[r])]
+        return result
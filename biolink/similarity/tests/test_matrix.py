@@ -0,0 +1,50 @@
+import math
+import numpy as np
+import pytest
+from biolink.similarity.matrix import AnnotationMatrix
+from biolink.similarity import matrix
+
+SETS = {
+    'a': {'T1', 'T2', 'T3'},
+    'b': {'T2', 'T3', 'T4'},
+    'c': {'T5'},
+    'd': set(),
+}
+
+def pairs():
+    return {(s, t) for (s, ts) in SETS.items() for t in ts}
+
+def jaccard(s1, s2):
+    u = len(s1 | s2)
+    return len(s1 & s2) / u if u > 0 else 0.0
+
+def test_jaccard_and_cosine():
+    am = AnnotationMatrix(list(SETS), pairs())
+    m = am.matrix('jaccard')
+    c = am.matrix('cosine')
+    for (i, s1) in enumerate(SETS):
+        for (j, s2) in enumerate(SETS):
+            assert m[i, j] == pytest.approx(jaccard(SETS[s1], SETS[s2]))
+            n = math.sqrt(len(SETS[s1]) * len(SETS[s2]))
+            assert c[i, j] == pytest.approx(len(SETS[s1] & SETS[s2]) / n if n > 0 else 0.0)
+
+def test_simgic():
+    ic = {'T1': 1.0, 'T2': 0.0, 'T3': 2.0, 'T4': 4.0, 'T5': 1.0}
+    am = AnnotationMatrix(list(SETS), pairs(), ic=lambda terms: [ic[t] for t in terms])
+    m = am.matrix('simgic')
+    assert m[0, 1] == pytest.approx((0.0 + 2.0) / (1.0 + 0.0 + 2.0 + 4.0))
+    assert m[0, 0] == pytest.approx(1.0)
+    assert m[3, 3] == 0.0
+
+def test_top_k_blocks(monkeypatch):
+    monkeypatch.setattr(matrix, 'BLOCK_ROWS', 3)
+    rng = np.random.RandomState(0)
+    subjects = ['s{}'.format(i) for i in range(20)]
+    sets = {s: {'T{}'.format(t) for t in rng.choice(30, 8, replace=False)} for s in subjects}
+    am = AnnotationMatrix(subjects, {(s, t) for (s, ts) in sets.items() for t in ts})
+    top = am.top_k(3)
+    for s in subjects:
+        expected = sorted((jaccard(sets[s], sets[o]) for o in subjects if o != s), reverse=True)[:3]
+        assert [score for (_, score) in top[s]] == pytest.approx(expected)
+        assert s not in [o for (o, _) in top[s]]
+    assert am.top_k(0)['s0'] == []
@@ -0,0 +1,3 @@
+"""
+Backend-agnostic helpers shared by the API endpoints and the service facades
+"""
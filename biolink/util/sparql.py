@@ -0,0 +1,311 @@
+"""
+Shared SPARQL clients
+
+SPARQLWrapper objects hold the query as mutable state, so a module-level
+instance cannot be used by concurrent requests. A SPARQLClient is safe to
+share: each query is a single POST over a pooled keep-alive session, at most
+max_concurrent queries run against an endpoint at once, and identical
+queries in flight at the same time share one request.
+
+Results can be cached, keyed on the endpoint and the query text with
+whitespace outside string literals collapsed. An entry older than ttl is still served for up to
+stale more seconds, while a background thread fetches a fresh copy.
+
+    client = sparql_client('http://query.wikidata.org/sparql')
+    results = client.query('SELECT ...')
+    bindings = results['results']['bindings']
+
+Queries are built from QueryTemplates, parsed once, with values quoted by
+iri() and literal() so that ids from a request cannot change the query.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import string
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backendutil.cache import LRUCache, SQLiteCache, TieredCache
+from backendutil.singleflight import SingleFlight
+from biolink import settings
+
+# SELECT and ASK queries return results, CONSTRUCT and DESCRIBE return graphs
+ACCEPT = {'SELECT': 'application/sparql-results+json',
+          'ASK': 'application/sparql-results+json',
+          'CONSTRUCT': 'application/ld+json',
+          'DESCRIBE': 'application/ld+json'}
+USER_AGENT = 'biolink-api (https://github.com/biolink/biolink-api)'
+
+# characters not allowed in an IRIREF
+IRI_ILLEGAL = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+LITERAL_ESCAPES = {'\\': '\\\\', '"': '\\"', "'": "\\'", '\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+# parts of a query whose whitespace is significant, or that may contain quotes
+VERBATIM = re.compile(r'"""(?:[^"\\]|\\.|"(?!""))*"""'
+                      r"|'''(?:[^'\\]|\\.|'(?!''))*'''"
+                      r'|"(?:[^"\\\n]|\\.)*"'
+                      r"|'(?:[^'\\\n]|\\.)*'"
+                      r'|<[^\x00-\x20<>"{}|^`\\]*>')
+WHITESPACE = re.compile(r'\s+')
+# the prologue (prefix and base declarations, comments) followed by the query form
+QUERY_FORM = re.compile(r'(?:\s+|#[^\n]*|prefix\s+[^\s:]*:\s*<[^>]*>|base\s*<[^>]*>)*(\w+)', re.IGNORECASE)
+
+def iri(s):
+    """
+    SPARQL IRI reference for s, e.g. <http://www.wikidata.org/entity/Q35869>
+    """
+    if IRI_ILLEGAL.search(s):
+        raise ValueError("Not a valid IRI: {}".format(s))
+    return '<' + s + '>'
+
+def literal(s):
+    """
+    SPARQL string literal for s, with quotes and control characters escaped
+    """
+    return '"' + ''.join(LITERAL_ESCAPES.get(c, c) for c in str(s)) + '"'
+
+def normalize_query(q):
+    """
+    Query text with runs of whitespace collapsed, except inside string literals
+    """
+    out = []
+    pos = 0
+    for m in VERBATIM.finditer(q):
+        out.append(WHITESPACE.sub(' ', q[pos:m.start()]))
+        out.append(m.group())
+        pos = m.end()
+    out.append(WHITESPACE.sub(' ', q[pos:]))
+    return ''.join(out).strip()
+
+def query_form(q):
+    """
+    SELECT, ASK, CONSTRUCT or DESCRIBE, from the first keyword after the prologue
+    """
+    m = QUERY_FORM.match(q)
+    form = m.group(1).upper() if m is not None else None
+    if form not in ACCEPT:
+        raise ValueError("Unknown SPARQL query form: {}".format(form))
+    return form
+
+def result_size(results):
+    """
+    Number of bindings of SPARQL JSON results, or of nodes of a JSON-LD graph
+    """
+    if isinstance(results, list):
+        return len(results)
+    if 'results' in results:
+        return len(results['results'].get('bindings', []))
+    if '@graph' in results:
+        return len(results['@graph'])
+    if 'boolean' in results:
+        return 1
+    return 1 if len(results) > 0 else 0
+
+def prefix_header(prefixes):
+    """
+    SPARQL prologue declaring each prefix -> namespace of a dict
+    """
+    return "\n".join("prefix {}: {}".format(p, iri(ns)) for (p, ns) in sorted(prefixes.items()))
+
+class QueryTemplate:
+    """
+    Query text with {name} placeholders ({{ and }} for braces), parsed once
+
+    render() substitutes values that must already be SPARQL terms, as built
+    by iri() and literal(), and prepends the header.
+    """
+    def __init__(self, text, header=''):
+        self.header = header
+        self.parts = [(lit, field) for (lit, field, _, _) in string.Formatter().parse(text)]
+        self.fields = {field for (_, field) in self.parts if field is not None}
+
+    def render(self, limit=None, **params):
+        missing = self.fields - set(params)
+        if missing:
+            raise KeyError("Missing template parameters: {}".format(', '.join(sorted(missing))))
+        out = [self.header, '\n']
+        for (lit, field) in self.parts:
+            out.append(lit)
+            if field is not None:
+                out.append(params[field])
+        if limit is not None:
+            out.append('\nLIMIT {:d}'.format(limit))
+        return ''.join(out)
+
+class SPARQLClient:
+    """
+    Client for one SPARQL endpoint
+
+    Arguments
+    ---------
+    url
+        endpoint URL
+
+    timeout
+        seconds to wait for a free slot, and then for the response
+
+    max_concurrent
+        maximum number of queries in flight against the endpoint, per process
+
+    cache
+        cache of results (bytes values), e.g. a TieredCache; None disables caching
+
+    ttl
+        seconds a cached result is fresh
+
+    stale
+        seconds after ttl during which a cached result is served while it is refreshed
+    """
+    def __init__(self, url, timeout=30, max_concurrent=8, cache=None, ttl=3600, stale=0):
+        self.url = url
+        self.timeout = timeout
+        self.max_concurrent = max_concurrent
+        self.cache = cache
+        self.ttl = ttl
+        self.stale = stale
+        self.queries = 0
+        self.seconds = 0.0
+        self.stale_hits = 0
+        self.flight = SingleFlight()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._sessions = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def query(self, q):
+        """
+        Run a query, returning the parsed results
+
+        SELECT and ASK queries return SPARQL JSON results, CONSTRUCT and
+        DESCRIBE queries a JSON-LD graph.
+
+        Without a cache, callers share the returned object with concurrent
+        identical queries and must not modify it.
+        """
+        if self.cache is None:
+            return self.flight.do(q, self._query, q)
+        normalized = self.url + ' ' + normalize_query(q)
+        key = 'sparql:' + hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+        value = self.cache.get(key, None)
+        if value is None:
+            value = self.flight.do(key, self._fetch, key, q)
+        entry = json.loads(value.decode('utf-8'))
+        if time.time() - entry['fetched'] > self.ttl:
+            self.stale_hits += 1
+            self._refresh(key, q)
+        return entry['results']
+
+    def _fetch(self, key, q):
+        results = self._query(q)
+        value = json.dumps({'fetched': time.time(), 'results': results}).encode('utf-8')
+        self.cache.put(key, value, ttl=self.ttl + self.stale)
+        return value
+
+    def _refresh(self, key, q):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.flight.do(key, self._fetch, key, q)
+            except Exception as e:
+                logging.warning("Refresh of stale SPARQL result from {} failed: {}".format(self.url, e))
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        threading.Thread(target=refresh, name='sparql-refresh', daemon=True).start()
+
+    def _query(self, q):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("No free connection to {} after {}s".format(self.url, self.timeout))
+        try:
+            t = time.time()
+            form = query_form(q)
+            response = self._session().post(self.url,
+                                            data={'query': q},
+                                            headers={'Accept': ACCEPT[form], 'User-Agent': USER_AGENT},
+                                            timeout=self.timeout)
+            response.raise_for_status()
+            results = response.json()
+            self.queries += 1
+            self.seconds += time.time() - t
+            logging.info("SPARQL {} {}: {} results in {:.2f}s".format(
+                form, self.url, result_size(results), time.time() - t))
+            return results
+        finally:
+            self._slots.release()
+
+    def _session(self):
+        # one connection pool per forked worker
+        pid = os.getpid()
+        session = self._sessions.get(pid)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(pid)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrent)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._sessions = {pid: session}
+        return session
+
+    def stats(self):
+        return dict(self.flight.stats(),
+                    url=self.url,
+                    queries=self.queries,
+                    seconds=self.seconds,
+                    stale_hits=self.stale_hits,
+                    max_concurrent=self.max_concurrent)
+
+_cache = None
+_clients = {}
+_clients_lock = threading.Lock()
+
+def result_cache():
+    """
+    Cache shared by the clients of sparql_client, created on first use
+
+    The on-disk tier at settings.SPARQL_CACHE_PATH is created by the first
+    query that uses it, not at import, and deletes expired entries as it
+    goes; see SQLiteCache.
+    """
+    global _cache
+    if _cache is None:
+        with _clients_lock:
+            if _cache is None:
+                memory = LRUCache(maxsize=settings.SPARQL_CACHE_MAX_ENTRIES,
+                                  maxbytes=settings.SPARQL_CACHE_MAX_BYTES)
+                shared = None
+                if settings.SPARQL_CACHE_PATH is not None:
+                    shared = SQLiteCache(settings.SPARQL_CACHE_PATH)
+                _cache = TieredCache(memory, shared)
+    return _cache
+
+def sparql_client(url):
+    """
+    Shared client for an endpoint, configured from settings.SPARQL_ENDPOINTS
+    """
+    client = _clients.get(url)
+    if client is None:
+        cache = result_cache()
+        with _clients_lock:
+            client = _clients.get(url)
+            if client is None:
+                conf = dict(settings.SPARQL_DEFAULTS)
+                conf.update(settings.SPARQL_ENDPOINTS.get(url, {}))
+                client = SPARQLClient(url, cache=cache, **conf)
+                _clients[url] = client
+    return client
+
+def stats():
+    return {'clients': {url: client.stats() for (url, client) in list(_clients.items())},
+            'cache': _cache.stats() if _cache is not None else None}
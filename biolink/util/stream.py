@@ -0,0 +1,65 @@
+"""
+Serialize rows incrementally for streamed responses and export files
+
+Each function takes an iterable and returns a generator of str (or bytes,
+for gzip_chunks), so nothing is held in memory beyond the current row.
+"""
+
+import json
+import zlib
+
+# bytes of output buffered before a chunk is emitted
+CHUNK_SIZE = 64 * 1024
+
+def ndjson_lines(rows):
+    """
+    One JSON document per line
+    """
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+def tsv_lines(rows, columns, header=True):
+    """
+    Tab-separated values, one row per line
+
+    List values are joined with '|'; tabs and newlines in values are replaced by spaces.
+    """
+    if header:
+        yield "\t".join(columns) + "\n"
+    for row in rows:
+        yield "\t".join(_tsv_value(row.get(c)) for c in columns) + "\n"
+
+def _tsv_value(v):
+    if v is None:
+        return ''
+    if isinstance(v, (list, tuple, set)):
+        v = "|".join(str(x) for x in v)
+    return str(v).replace("\t", " ").replace("\n", " ")
+
+def encoded_chunks(lines, size=CHUNK_SIZE):
+    """
+    Group lines into utf-8 encoded chunks of roughly size bytes
+    """
+    buf = []
+    n = 0
+    for line in lines:
+        b = line.encode('utf-8')
+        buf.append(b)
+        n += len(b)
+        if n >= size:
+            yield b''.join(buf)
+            buf = []
+            n = 0
+    if n > 0:
+        yield b''.join(buf)
+
+def gzip_chunks(chunks):
+    """
+    Compress a stream of bytes chunks into a single gzip stream
+    """
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
@@ -0,0 +1,98 @@
+"""
+Versioned lookup tables, computed once and persisted
+
+Some tables derived from the association store (background term
+frequencies, information content) take a long time to compute but only
+change between data releases. TableStore computes each table on first use,
+keeps it in memory and saves it to disk under the data release version, so
+later processes (and restarts) load it instead:
+
+    <root>/<version>/<key>.npz
+
+A table class provides to_arrays() (dict of numpy arrays) and a
+from_arrays(arrays) class method, plus summary() for stats.
+"""
+
+import logging
+import os
+import threading
+
+import numpy as np
+
+from backendutil.singleflight import SingleFlight
+
+class TableStore:
+    """
+    Tables keyed by a tuple of strings, in memory and on disk
+
+    Arguments
+    ---------
+    root
+        directory holding one subdirectory per data release version
+
+    version
+        data release the tables belong to; tables of other versions are ignored
+
+    compute
+        function taking the key parts as arguments and returning a table
+
+    table_class
+        class of the tables, used to read them back
+    """
+    def __init__(self, root, version, compute, table_class):
+        self.root = root
+        self.version = version
+        self.compute = compute
+        self.table_class = table_class
+        self._tables = {}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def get(self, *key):
+        """
+        Table for key, loaded from disk or computed on first use
+        """
+        table = self._tables.get(key)
+        if table is None:
+            table = self._flight.do(key, self._load_or_compute, key)
+        return table
+
+    def _load_or_compute(self, key):
+        path = self.path(key)
+        table = None
+        if os.path.isfile(path):
+            try:
+                with np.load(path, allow_pickle=False) as arrays:
+                    table = self.table_class.from_arrays(arrays)
+            except (IOError, ValueError, KeyError) as e:
+                logging.error("Cannot read table {}: {}".format(path, e))
+        if table is None:
+            table = self.compute(*key)
+            self._write(path, table)
+        with self._lock:
+            self._tables[key] = table
+        return table
+
+    def _write(self, path, table):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = "{}.tmp-{}.npz".format(path[:-len('.npz')], os.getpid())
+        np.savez_compressed(tmp, **table.to_arrays())
+        os.replace(tmp, path)
+
+    def path(self, key):
+        name = "-".join(str(k) for k in key).replace(':', '_').replace(os.path.sep, '_')
+        return os.path.join(self.root, self.version, name + '.npz')
+
+    def evict(self, *key):
+        """
+        Drop in-memory tables whose key starts with the given parts
+        """
+        with self._lock:
+            for k in list(self._tables):
+                if k[:len(key)] == key:
+                    del self._tables[k]
+
+    def stats(self):
+        return {'version': self.version,
+                'tables': {" ".join(str(k) for k in key): table.summary()
+                           for (key, table) in self._tables.items()}}
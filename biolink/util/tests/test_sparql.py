@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from backendutil.cache import LRUCache
+from backendutil.fanout import FanOut
+import pytest
+from biolink.util.sparql import SPARQLClient, QueryTemplate, iri, literal, normalize_query, query_form
+
+class Handler(BaseHTTPRequestHandler):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8')
+        q = parse_qs(body)['query'][0]
+        with Handler.lock:
+            Handler.active += 1
+            Handler.peak = max(Handler.peak, Handler.active)
+        time.sleep(0.05)
+        with Handler.lock:
+            Handler.active -= 1
+        payload = json.dumps({'results': {'bindings': [{'q': {'type': 'literal', 'value': q}}]}})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/sparql-results+json')
+        self.end_headers()
+        self.wfile.write(payload.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+def test_concurrency_limit():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = SPARQLClient('http://127.0.0.1:{}/sparql'.format(server.server_port), timeout=10, max_concurrent=2)
+        fo = FanOut(max_workers=8)
+        for i in range(8):
+            fo.add(i, client.query, 'SELECT {}'.format(i))
+        r = fo.run()
+        assert r.is_complete()
+        assert r.get(3)['results']['bindings'][0]['q']['value'] == 'SELECT 3'
+        assert Handler.peak == 2
+        assert client.stats()['queries'] == 8
+    finally:
+        server.shutdown()
+
+def test_stale_while_revalidate():
+    fetched = []
+    class Client(SPARQLClient):
+        def _query(self, q):
+            fetched.append(q)
+            return {'results': {'bindings': [{'n': len(fetched)}]}}
+    client = Client('http://example.org/sparql', cache=LRUCache(), ttl=0.1, stale=60)
+    assert client.query('SELECT  *\n{ ?s ?p ?o }')['results']['bindings'] == [{'n': 1}]
+    # same query up to whitespace; callers get their own copy
+    r = client.query('SELECT * { ?s ?p ?o }')
+    r['results']['bindings'].append('modified')
+    assert client.query('SELECT * { ?s ?p ?o }')['results']['bindings'] == [{'n': 1}]
+    assert len(fetched) == 1
+    time.sleep(0.15)
+    # expired: the stale result is served and refreshed in the background
+    assert client.query('SELECT * { ?s ?p ?o }')['results']['bindings'] == [{'n': 1}]
+    for i in range(50):
+        if len(fetched) == 2 and len(client._refreshing) == 0:
+            break
+        time.sleep(0.01)
+    assert client.query('SELECT * { ?s ?p ?o }')['results']['bindings'] == [{'n': 2}]
+    assert client.stats()['stale_hits'] == 1
+
+def test_template():
+    t = QueryTemplate("SELECT ?c WHERE {{ ?c {p} {v} }}", header="prefix wd: <http://www.wikidata.org/entity/>")
+    q = t.render(limit=10, p=iri('http://www.wikidata.org/prop/direct/P699'), v=literal('DOID:2841" } DROP ALL {'))
+    assert q == ('prefix wd: <http://www.wikidata.org/entity/>\n'
+                 'SELECT ?c WHERE { ?c <http://www.wikidata.org/prop/direct/P699> "DOID:2841\\" } DROP ALL {" }\n'
+                 'LIMIT 10')
+    with pytest.raises(ValueError):
+        iri('http://example.org/> } DROP ALL { <x')
+    with pytest.raises(KeyError):
+        t.render(p=iri('http://example.org/p'))
+
+def test_normalize_query():
+    assert normalize_query(' SELECT  *\n{ ?s  ?p ?o }\n') == 'SELECT * { ?s ?p ?o }'
+    # whitespace inside literals is part of the query
+    assert normalize_query('FILTER(regex(?t,  "a  b"))') == 'FILTER(regex(?t, "a  b"))'
+    assert normalize_query('FILTER(?t = "a  b")') != normalize_query('FILTER(?t = "a b")')
+    assert normalize_query("?s ?p '''x\n  y''' .  ?s ?q 'it\\'s  ok'") == "?s ?p '''x\n  y''' . ?s ?q 'it\\'s  ok'"
+    assert normalize_query("?s ?p <http://example.org/O'Brien> .  ?s ?q 'a  b'") == \
+        "?s ?p <http://example.org/O'Brien> . ?s ?q 'a  b'"
+
+def test_query_form():
+    assert query_form('prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#>\n# all\nSELECT * { ?s ?p ?o }') == 'SELECT'
+    assert query_form('PREFIX : <http://example.org/>\n  construct { ?s ?p ?o } WHERE { ?s ?p ?o }') == 'CONSTRUCT'
+    assert query_form('BASE <http://example.org/> ASK { ?s ?p ?o }') == 'ASK'
+    with pytest.raises(ValueError):
+        query_form('DROP ALL')
+
+class GraphHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers['Accept'] == 'application/ld+json':
+            payload = {'@graph': [{'@id': 'http://example.org/a'}, {'@id': 'http://example.org/b'}]}
+        else:
+            payload = {'head': {}, 'results': {'bindings': []}}
+        self.send_response(200)
+        self.send_header('Content-Type', self.headers['Accept'])
+        self.end_headers()
+        self.wfile.write(json.dumps(payload).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+def test_construct():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GraphHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = SPARQLClient('http://127.0.0.1:{}/sparql'.format(server.server_port), cache=LRUCache())
+        graph = client.query('CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }')
+        assert len(graph['@graph']) == 2
+        # served from the cache as the same graph
+        assert client.query('CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }') == graph
+        assert client.query('SELECT * { ?s ?p ?o }')['results']['bindings'] == []
+    finally:
+        server.shutdown()
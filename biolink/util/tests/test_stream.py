@@ -0,0 +1,19 @@
+import gzip
+import json
+from biolink.util.stream import ndjson_lines, tsv_lines, encoded_chunks, gzip_chunks
+
+rows = [{'subject': 'A', 'objects': ['X', 'Y']}, {'subject': 'B\tb', 'objects': []}]
+
+def test_ndjson():
+    lines = list(ndjson_lines(iter(rows)))
+    assert [json.loads(l) for l in lines] == rows
+
+def test_tsv():
+    lines = list(tsv_lines(rows, ['subject', 'objects', 'missing']))
+    assert lines == ["subject\tobjects\tmissing\n", "A\tX|Y\t\n", "B b\t\t\n"]
+
+def test_gzip_chunks():
+    lines = ["line {}\n".format(i) for i in range(10000)]
+    chunks = list(encoded_chunks(iter(lines), size=1000))
+    assert len(chunks) > 1
+    assert gzip.decompress(b''.join(gzip_chunks(iter(chunks)))).decode('utf-8') == ''.join(lines)
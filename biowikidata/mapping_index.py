@@ -0,0 +1,202 @@
+"""
+Offline index of identifier mappings, e.g. DOID/UniProtKB/InterPro CURIEs to Wikidata URIs
+
+The index is an SQLite file built from tab-separated dumps of
+CURIE, URI pairs. A CURIE found in the index is resolved locally; one that
+is not found is looked up on the SPARQL endpoint as before, since the dump
+may predate it. Only prefixes declared complete when the index is built
+(--complete) are trusted for misses: a CURIE of such a prefix that is not
+in the index has no mapping, and is not looked up.
+
+Dump the mappings for a prefix from Wikidata, then build the index:
+
+    python -m biowikidata.mapping_index fetch DOID UniProtKB InterPro > mappings.tsv
+    python -m biowikidata.mapping_index build --complete DOID mapping-index.sqlite mappings.tsv
+
+fetch pages through the query endpoint, which is slow for large prefixes
+such as UniProtKB; the same CURIE<TAB>URI dump can instead be extracted
+from a Wikidata JSON dump.
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from biolink import settings
+
+# maximum number of host parameters in one SELECT ... IN (...)
+LOOKUP_CHUNK = 500
+
+# rows per query when dumping mappings from the Wikidata endpoint
+FETCH_PAGE_SIZE = 50000
+
+def read_dump(f):
+    """
+    Yield (curie, uri) pairs from a tab-separated dump; blank lines and # comments are skipped
+    """
+    for line in f:
+        line = line.rstrip('\n')
+        if line == '' or line.startswith('#'):
+            continue
+        (curie, uri) = line.split('\t')[:2]
+        yield (curie, uri)
+
+def namespace(uri):
+    """
+    Namespace of a URI, up to and including its last / or #
+    """
+    return uri[:max(uri.rfind('/'), uri.rfind('#')) + 1]
+
+def build_index(path, pairs, complete=()):
+    """
+    Write an index of (curie, uri) pairs to path, replacing any existing index
+
+    The index is taken to be complete for the prefixes in complete, for each
+    namespace their CURIEs map into; it is never taken to be complete for
+    other prefixes.
+    """
+    complete = set(complete)
+    t = time.time()
+    tmp = "{}.tmp-{}".format(path, os.getpid())
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    conn.execute('CREATE TABLE mapping (curie TEXT, uri TEXT, PRIMARY KEY (curie, uri)) WITHOUT ROWID')
+    conn.execute('CREATE TABLE coverage (prefix TEXT, namespace TEXT, PRIMARY KEY (prefix, namespace))')
+    coverage = set()
+    n = 0
+    with conn:
+        for (curie, uri) in pairs:
+            prefix = curie.split(':')[0]
+            if prefix in complete:
+                coverage.add((prefix, namespace(uri)))
+            conn.execute('INSERT OR IGNORE INTO mapping VALUES (?,?)', (curie, uri))
+            n += 1
+        conn.executemany('INSERT INTO coverage VALUES (?,?)', sorted(coverage))
+    conn.close()
+    os.replace(tmp, path)
+    logging.info("Mapping index {}: {} pairs covering {} in {:.1f}s".format(path, n, sorted(coverage), time.time() - t))
+    return path
+
+class MappingIndex:
+    """
+    Read-only view of an index built by build_index
+    """
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.coverage = set(self._connection().execute('SELECT prefix, namespace FROM coverage'))
+
+    def _connection(self):
+        # sqlite connections may not be shared between threads or forked processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect('file:{}?mode=ro'.format(self.path), uri=True)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def covers(self, curie, namespace):
+        return (curie.split(':')[0], namespace) in self.coverage
+
+    def lookup(self, curies, namespace):
+        """
+        Dict mapping CURIEs to their list of URIs in namespace
+
+        CURIEs with a mapping into namespace are present, as are CURIEs the
+        index covers for namespace, with an empty list if they have none.
+        Other CURIEs are absent from the result.
+        """
+        curies = list(dict.fromkeys(curies))
+        m = {c: [] for c in curies if self.covers(c, namespace)}
+        conn = self._connection()
+        for i in range(0, len(curies), LOOKUP_CHUNK):
+            chunk = curies[i:i+LOOKUP_CHUNK]
+            q = 'SELECT curie, uri FROM mapping WHERE curie IN ({})'.format(','.join('?' * len(chunk)))
+            for (curie, uri) in conn.execute(q, chunk):
+                if uri.startswith(namespace):
+                    m.setdefault(curie, []).append(uri)
+        return m
+
+_index = None
+_index_lock = threading.Lock()
+
+def mapping_index():
+    """
+    The index at settings.MAPPING_INDEX_PATH, or None if there is none
+    """
+    global _index
+    path = settings.MAPPING_INDEX_PATH
+    if path is None:
+        return None
+    if _index is None or _index.path != path:
+        with _index_lock:
+            if _index is None or _index.path != path:
+                if not os.path.isfile(path):
+                    return None
+                _index = MappingIndex(path)
+    return _index
+
+def fetch_mappings(prefix, page_size=FETCH_PAGE_SIZE, client=None):
+    """
+    Yield (curie, uri) pairs for all Wikidata items with an identifier of the given prefix
+
+    The query is paged, page_size rows at a time, to stay within the
+    endpoint's time limit.
+    """
+    from biowikidata.wd_sparql import DBPREFIX2PROP, HEADER, sparql
+    from biolink.util.sparql import SPARQLClient, QueryTemplate, iri
+    (_, is_curie, p) = DBPREFIX2PROP[prefix]
+    if client is None:
+        # a dedicated client: the dump is too large for the result cache
+        client = SPARQLClient(sparql.url, timeout=120, max_concurrent=1)
+    page = QueryTemplate('SELECT ?c ?id WHERE {{ ?c {p} ?id }} ORDER BY ?c ?id\nOFFSET {offset}', HEADER)
+    offset = 0
+    while True:
+        q = page.render(limit=page_size, p=iri(p), offset='{:d}'.format(offset))
+        bindings = client.query(q)['results']['bindings']
+        for b in bindings:
+            id = b['id']['value']
+            if not is_curie:
+                id = prefix + ':' + id
+            yield (id, b['c']['value'])
+        logging.info("Fetched {} {} mappings at offset {}".format(len(bindings), prefix, offset))
+        if len(bindings) < page_size:
+            return
+        offset += page_size
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the offline identifier mapping index')
+    sub = parser.add_subparsers(dest='command')
+    p = sub.add_parser('fetch', help='write a tab-separated dump of Wikidata mappings to stdout')
+    p.add_argument('prefix', nargs='+', help='e.g. DOID UniProtKB InterPro')
+    p = sub.add_parser('build', help='build an index from tab-separated dumps')
+    p.add_argument('--complete', action='append', default=[], metavar='PREFIX',
+                   help='a prefix whose dump is complete: its CURIEs missing from the index are not looked up; repeatable')
+    p.add_argument('index', help='path of the SQLite file to write')
+    p.add_argument('dump', nargs='+', help='CURIE<TAB>URI files; - for stdin')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'fetch':
+        for prefix in args.prefix:
+            sys.stdout.write('# {}\n'.format(prefix))
+            for (curie, uri) in fetch_mappings(prefix):
+                sys.stdout.write('{}\t{}\n'.format(curie, uri))
+    elif args.command == 'build':
+        def pairs():
+            for dump in args.dump:
+                if dump == '-':
+                    yield from read_dump(sys.stdin)
+                else:
+                    with open(dump) as f:
+                        yield from read_dump(f)
+        build_index(args.index, pairs(), complete=args.complete)
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import re
+from biowikidata import wd_sparql
+from biowikidata.wd_sparql import condition_to_drug_batch, resolve_to_wikidata_batch
+
+WD = 'http://www.wikidata.org/entity/'
+
+class FakeClient:
+    def query(self, q):
+        return fake_query(q)
+
+def fake_query(q):
+    queries.append(q)
+    values = re.search(r'VALUES \?\w+ \{ (.*) \}', q).group(1).split(' ')
+    bindings = []
+    for v in values:
+        v = v.strip('"<>')
+        if 'treated_by_drug: ?d' in q:
+            bindings.append({'c': {'value': v}, 'dc': {'value': v[len(WD)+1:]}})
+        elif v != 'DOID:0':
+            bindings.append({'c': {'value': WD + 'Q' + v.split(':')[1]}, 'id': {'value': v}})
+    return {'results': {'bindings': bindings}}
+
+queries = []
+
+def test_condition_to_drug_batch(monkeypatch):
+    monkeypatch.setattr(wd_sparql, 'sparql', FakeClient())
+    monkeypatch.setattr(wd_sparql, 'BATCH_SIZE', 100)
+    del queries[:]
+    ids = ['DOID:{}'.format(i) for i in range(500)]
+    drugs = condition_to_drug_batch(ids + ids[:10])
+    assert len(queries) == 10
+    assert drugs['DOID:7'] == ['CHEBI:7']
+    assert drugs['DOID:0'] == []
+    assert len(drugs) == 500
+
+def test_resolve_reflexive(monkeypatch):
+    monkeypatch.setattr(wd_sparql, 'sparql', FakeClient())
+    del queries[:]
+    assert resolve_to_wikidata_batch([WD + 'Q1']) == {WD + 'Q1': [WD + 'Q1']}
+    assert queries == []
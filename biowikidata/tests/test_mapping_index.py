@@ -0,0 +1,68 @@
+import io
+from biowikidata import mapping_index, wd_sparql
+from biowikidata.mapping_index import build_index, read_dump, MappingIndex
+from biowikidata.wd_sparql import resolve_to_wikidata_batch
+
+WD = 'http://www.wikidata.org/entity/'
+
+DUMP = """# DOID
+DOID:2841\thttp://www.wikidata.org/entity/Q35869
+DOID:1\thttp://www.wikidata.org/entity/Q1
+DOID:1\thttp://www.wikidata.org/entity/Q2
+"""
+
+class FakeClient:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, q):
+        self.queries.append(q)
+        return {'results': {'bindings': [{'c': {'value': WD + 'Q100'}, 'id': {'value': 'P78509'}}]}}
+
+def test_index(tmpdir):
+    path = build_index(str(tmpdir.join('index.sqlite')), read_dump(io.StringIO(DUMP)), complete=['DOID'])
+    index = MappingIndex(path)
+    assert index.lookup(['DOID:1', 'DOID:2', 'UniProtKB:P1'], WD) == \
+        {'DOID:1': [WD + 'Q1', WD + 'Q2'], 'DOID:2': []}
+    assert index.lookup(['DOID:1'], 'http://purl.uniprot.org/uniprot/') == {}
+    # without --complete, only hits are answered
+    index = MappingIndex(build_index(str(tmpdir.join('partial.sqlite')), read_dump(io.StringIO(DUMP))))
+    assert index.lookup(['DOID:1', 'DOID:2'], WD) == {'DOID:1': [WD + 'Q1', WD + 'Q2']}
+
+def test_resolve_offline_first(tmpdir, monkeypatch):
+    path = build_index(str(tmpdir.join('index.sqlite')), read_dump(io.StringIO(DUMP)), complete=['DOID'])
+    monkeypatch.setattr(mapping_index.settings, 'MAPPING_INDEX_PATH', path)
+    client = FakeClient()
+    monkeypatch.setattr(wd_sparql, 'sparql', client)
+    m = resolve_to_wikidata_batch(['DOID:2841', 'DOID:5', 'UniProtKB:P78509'])
+    assert m == {'DOID:2841': [WD + 'Q35869'], 'DOID:5': [], 'UniProtKB:P78509': [WD + 'Q100']}
+    # only the prefix the index does not cover goes to SPARQL
+    assert len(client.queries) == 1
+    assert '"P78509"' in client.queries[0]
+
+def test_resolve_partial_index(tmpdir, monkeypatch):
+    path = build_index(str(tmpdir.join('index.sqlite')), read_dump(io.StringIO(DUMP)))
+    monkeypatch.setattr(mapping_index.settings, 'MAPPING_INDEX_PATH', path)
+    client = FakeClient()
+    monkeypatch.setattr(wd_sparql, 'sparql', client)
+    m = resolve_to_wikidata_batch(['DOID:2841', 'DOID:5'])
+    assert m['DOID:2841'] == [WD + 'Q35869']
+    # a DOID missing from a partial dump is looked up
+    assert len(client.queries) == 1
+    assert '"DOID:5"' in client.queries[0] and 'DOID:2841' not in client.queries[0]
+
+def test_fetch_pages():
+    class PagedClient:
+        def __init__(self):
+            self.queries = []
+
+        def query(self, q):
+            self.queries.append(q)
+            start = 2 * (len(self.queries) - 1)
+            ids = ['DOID:{}'.format(i) for i in range(start, min(start + 2, 5))]
+            return {'results': {'bindings': [{'c': {'value': WD + 'Q' + id[5:]}, 'id': {'value': id}} for id in ids]}}
+    client = PagedClient()
+    pairs = list(mapping_index.fetch_mappings('DOID', page_size=2, client=client))
+    assert [c for (c, _) in pairs] == ['DOID:0', 'DOID:1', 'DOID:2', 'DOID:3', 'DOID:4']
+    assert len(client.queries) == 3
+    assert 'OFFSET 4' in client.queries[2] and 'LIMIT 2' in client.queries[2]
@@ -1,7 +1,8 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
+from biolink.util.sparql import sparql_client, prefix_header, QueryTemplate, iri
+from biowikidata.mapping_index import mapping_index, namespace
 import logging
 
-sparql = SPARQLWrapper("http://sparql.uniprot.org/sparql")
+sparql = sparql_client("http://sparql.uniprot.org/sparql")
 
 class PrefixMap:
     """
@@ -11,8 +12,10 @@ class PrefixMap:
         return [attr for attr in dir(self) if not callable(getattr(self,attr)) and not attr.startswith("__")]
     def get_uri(self, pfx):
         return vars(PrefixMap).get(pfx)
+    def namespaces(self):
+        return {attr: self.get_uri(attr) for attr in self.prefixes()}
     def gen_header(self):
-        return "\n".join(["prefix {}: <{}>".format(attr,self.get_uri(attr)) for attr in self.prefixes()])
+        return prefix_header(self.namespaces())
 
     up = 'http://purl.uniprot.org/core/'
     db = 'http://purl.uniprot.org/database/'
@@ -25,15 +28,25 @@ class PrefixMap:
 
 prefix_map = PrefixMap()
 
+# computed once; the prefix map does not change at runtime
+HEADER = prefix_map.gen_header()
+
+EXISTS = QueryTemplate("""
+    SELECT DISTINCT ?c WHERE {{VALUES ?c {{ {c} }} ?c ?p ?o }}
+    """, header=HEADER)
+SEE_ALSO = QueryTemplate("""
+    SELECT ?o WHERE {{{s} rdfs:seeAlso ?o . ?o up:database {db} }}
+    """, header=HEADER)
+SEE_ALSO_ANY = QueryTemplate("""
+    SELECT ?o WHERE {{{s} rdfs:seeAlso ?o }}
+    """, header=HEADER)
+
 
 
 def run_sparql_query(q,limit=10):
-    full_sparql = "{}\n{}\nLIMIT {}".format(prefix_map.gen_header(),q,limit)
+    full_sparql = "{}\n{}\nLIMIT {}".format(HEADER,q,limit)
     logging.info("FULL:"+full_sparql)
-    sparql.setQuery(full_sparql)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    return results
+    return sparql.query(full_sparql)
 
 class UnknownPrefixException(Exception):
     pass
@@ -46,27 +59,27 @@ def resolve_to_uniprot(id):
     Given a CURIE id such as UniProtKB:P12345, return the corresponding UniProt URI(s).
     Lists are returned since some mappings may not be 1:1
 
-    This method is reflexive - it accepts wikidata URIs, and returns input as singleton
+    This method is reflexive - it accepts UniProt URIs, and returns input as singleton
 
-    TODO - accept full PURLs
+    The offline mapping index is consulted first; otherwise the URI is
+    formed from the CURIE and checked against the UniProt endpoint.
     """
-    if id.startswith('http://www.wikidata.org'):
+    if id.startswith('http://purl.uniprot.org/'):
         return [id]
     s = id.split(':')
     if len(s) != 2:
         raise InvalidIdentifierException(id)
     [prefix, localid] = s
+    if prefix not in prefix_map.pmap().values():
+        raise UnknownPrefixException(prefix)
+    uri = id_to_uri(id)
 
-    # in WD, some IDs are stored as localids only (e.g. P34995 in UniProt)
-    # other IDs are stored as full CURIEs (e.g. DOID)
-    (_,is_curie,p) = prefix_map.dbprefix2prop()[prefix]
-    q = id
-    if not is_curie:
-        q = localid
-    results = run_sparql_query("""
-    SELECT ?c WHERE {{?c <{p}> ?id .
-    FILTER (?id="{q}") }}
-    """.format(p=p, q=q))
+    index = mapping_index()
+    if index is not None:
+        found = index.lookup([id], namespace(uri))
+        if id in found:
+            return found[id]
+    results = sparql.query(EXISTS.render(limit=1, c=iri(uri)))
     return [b['c']['value'] for b in results['results']['bindings']]
     
 
@@ -87,11 +100,16 @@ def id_to_uri(id):
     return "http://purl.uniprot.org/{}/{}".format(db,localid)
 
 def seeAlso(id,db=None):
+    """
+    Cross-references of a UniProt entry, restricted to database db (e.g. InterPro) if given
+    """
     uri = id_to_uri(id)
     rs = []
-    results = run_sparql_query("""
-    SELECT ?o WHERE {{<{s}> rdfs:seeAlso ?o . ?o up:database db:{db} }}
-    """.format(s=uri,db=db), limit=1000)
+    if db is None:
+        q = SEE_ALSO_ANY.render(limit=1000, s=iri(uri))
+    else:
+        q = SEE_ALSO.render(limit=1000, s=iri(uri), db=iri(prefix_map.db + db))
+    results = sparql.query(q)
     for b in results['results']['bindings']:
         rs.append(uri_to_id(b['o']['value']))
     return rs
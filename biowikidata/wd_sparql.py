@@ -11,10 +11,14 @@ TODO:
 Return objects following the biolink/OBAN association model
 
 """
-from SPARQLWrapper import SPARQLWrapper, JSON
+from biolink.util.sparql import sparql_client, prefix_header, QueryTemplate, iri, literal
+from biowikidata.mapping_index import mapping_index
 import logging
 
-sparql = SPARQLWrapper("http://query.wikidata.org/sparql")
+sparql = sparql_client("http://query.wikidata.org/sparql")
+
+# maximum number of ids bound in a single VALUES clause
+BATCH_SIZE = 200
 
 class PrefixMap:
     """
@@ -26,8 +30,10 @@ class PrefixMap:
         return [attr for attr in dir(self) if not callable(getattr(self,attr)) and not attr.startswith("__")]
     def get_uri(self, pfx):
         return vars(PrefixMap).get(pfx)
+    def namespaces(self):
+        return {attr: self.get_uri(attr) for attr in self.prefixes()}
     def gen_header(self):
-        return "\n".join(["prefix {}: <{}>".format(attr,self.get_uri(attr)) for attr in self.prefixes()])
+        return prefix_header(self.namespaces())
 
     wd = 'http://www.wikidata.org/entity/'
     wdt = 'http://www.wikidata.org/prop/direct/'
@@ -57,16 +63,50 @@ class PrefixMap:
 
 prefix_map = PrefixMap()
 
+# computed once; the prefix map does not change at runtime
+HEADER = prefix_map.gen_header()
+DBPREFIX2PROP = prefix_map.dbprefix2prop()
+RELMAP = prefix_map.relmap()
+
+def template(q):
+    return QueryTemplate(q, header=HEADER)
+
+RESOLVE = template("""
+    SELECT ?c ?id WHERE {{VALUES ?id {{ {values} }}
+    ?c {p} ?id }}
+    """)
+DOID_LOOKUP = template("""
+    SELECT ?c WHERE {{?c DiseaseOntologyID: ?id .
+    FILTER (?id={doid}) }}
+    """)
+CONDITION_TO_DRUG = template("""
+    SELECT ?c ?dc WHERE {{VALUES ?c {{ {values} }}
+    ?c treated_by_drug: ?d . ?d ChebiID: ?dc }}
+    """)
+PROTEIN_TO_DOMAIN = template("""
+    SELECT ?p ?dc WHERE {{VALUES ?p {{ {values} }}
+    ?p has_part: ?d . ?d InterProID: ?dc }}
+    """)
+NEIGHBORS = template("""
+    SELECT ?s ?o WHERE {{VALUES ?s {{ {values} }}
+    ?s {p} ?z . ?z {idp} ?o }}
+    """)
+
 def run_sparql_query(q,limit=10):
     """
     Run a given SPARQL query over the Wikidata SPARQL endpoint
     """
-    full_sparql = "{}\n{}\nLIMIT {}".format(prefix_map.gen_header(),q,limit)
+    full_sparql = "{}\n{}\nLIMIT {}".format(HEADER,q,limit)
     logging.info("FULL:"+full_sparql)
-    sparql.setQuery(full_sparql)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    return results
+    return sparql.query(full_sparql)
+
+def run_template(t, limit=10, **params):
+    """
+    Run a QueryTemplate over the Wikidata SPARQL endpoint; params must be SPARQL terms
+    """
+    full_sparql = t.render(limit=limit, **params)
+    logging.info("FULL:"+full_sparql)
+    return sparql.query(full_sparql)
 
 class UnknownPrefixException(Exception):
     pass
@@ -82,31 +122,72 @@ def resolve_to_wikidata(id):
 
     TODO - accept full PURLs
     """
-    if id.startswith('http://www.wikidata.org'):
-        return [id]
-    s = id.split(':')
-    if len(s) != 2:
-        raise InvalidIdentifierException(id)
-    [prefix, localid] = s
-
-    # in WD, some IDs are stored as localids only (e.g. P34995 in UniProt)
-    # other IDs are stored as full CURIEs (e.g. DOID)
-    (_,is_curie,p) = prefix_map.dbprefix2prop()[prefix]
-    q = id
-    if not is_curie:
-        q = localid
-    results = run_sparql_query("""
-    SELECT ?c WHERE {{?c <{p}> ?id .
-    FILTER (?id="{q}") }}
-    """.format(p=p, q=q))
-    return [b['c']['value'] for b in results['results']['bindings']]
-    
+    return resolve_to_wikidata_batch([id])[id]
+
+def resolve_to_wikidata_batch(ids):
+    """
+    Given a list of CURIEs, return a dict mapping each to its wikidata URI(s).
+
+    Ids the offline mapping index answers for are resolved locally; the rest
+    use one VALUES query per prefix (per BATCH_SIZE ids) rather than one query per id.
+    """
+    m = {}
+    by_prefix = {}
+    for id in ids:
+        m[id] = []
+        if id.startswith('http://www.wikidata.org'):
+            m[id] = [id]
+            continue
+        s = id.split(':')
+        if len(s) != 2:
+            raise InvalidIdentifierException(id)
+        [prefix, localid] = s
+        if prefix not in DBPREFIX2PROP:
+            raise UnknownPrefixException(prefix)
+        by_prefix.setdefault(prefix, {})[localid] = id
+
+    index = mapping_index()
+    if index is not None:
+        found = index.lookup([id for localids in by_prefix.values() for id in localids.values()],
+                             prefix_map.wd)
+        m.update(found)
+        by_prefix = {prefix: {localid: id for (localid, id) in localids.items() if id not in found}
+                     for (prefix, localids) in by_prefix.items()}
+
+    for (prefix, localids) in by_prefix.items():
+        if len(localids) == 0:
+            continue
+        # in WD, some IDs are stored as localids only (e.g. P34995 in UniProt)
+        # other IDs are stored as full CURIEs (e.g. DOID)
+        (_,is_curie,p) = DBPREFIX2PROP[prefix]
+        if is_curie:
+            values = {id: id for id in localids.values()}
+        else:
+            values = {localid: id for (localid, id) in localids.items()}
+        bindings = run_values_query(RESOLVE, [literal(v) for v in values], p=iri(p))
+        for b in bindings:
+            id = values.get(b['id']['value'])
+            if id is not None and b['c']['value'] not in m[id]:
+                m[id].append(b['c']['value'])
+    return m
+
+def run_values_query(t, values, limit_per_value=1000, **params):
+    """
+    Run template t once per BATCH_SIZE values, substituting them for {values}, and return all bindings
+
+    values and params must already be SPARQL terms, see iri() and literal()
+    """
+    values = list(dict.fromkeys(values))
+    bindings = []
+    for i in range(0, len(values), BATCH_SIZE):
+        chunk = values[i:i+BATCH_SIZE]
+        results = run_template(t, limit=limit_per_value * len(chunk), values=' '.join(chunk), **params)
+        bindings.extend(results['results']['bindings'])
+    return bindings
+
 # @Deprecated
 def doid_to_wikidata(id):
-    results = run_sparql_query("""
-    SELECT ?c WHERE {{?c DiseaseOntologyID: ?id .
-    FILTER (?id="{doid}") }}
-    """.format(doid=id))
+    results = run_template(DOID_LOOKUP, doid=literal(id))
     return [b['c']['value'] for b in results['results']['bindings']]
 
 def flatten(l):
@@ -118,8 +199,13 @@ def condition_to_drug(condition_id):
 
     Accepts CURIEs, eg. DOID:nnnn
     """
-    wdids = resolve_to_wikidata(condition_id)
-    return flatten([wd_condition_to_drug(x) for x in wdids])
+    return condition_to_drug_batch([condition_id])[condition_id]
+
+def condition_to_drug_batch(condition_ids):
+    """
+    Given a list of conditions, return a dict mapping each to the drugs used to treat it.
+    """
+    return _map_resolved(condition_ids, wd_condition_to_drug_batch)
 
 def wd_condition_to_drug(condition_id):
     """
@@ -127,45 +213,70 @@ def wd_condition_to_drug(condition_id):
 
     TODO: capture everything in http://tinyurl.com/knuzgt7
     """
-    results = run_sparql_query("""
-    SELECT ?dc WHERE {{<{c}> treated_by_drug: ?d . ?d ChebiID: ?dc }}
-    """.format(c=condition_id), limit=1000)
+    return wd_condition_to_drug_batch([condition_id])[condition_id]
+
+def wd_condition_to_drug_batch(condition_ids):
+    """
+    Accepts a list of WD URIs, returns a dict mapping each to CHEBI ids
+    """
+    bindings = run_values_query(CONDITION_TO_DRUG, [iri(c) for c in condition_ids])
     # prefix IDs with CHEBI prefix. TODO: consider more generic/metadata-driven way of doing this
-    return ['CHEBI:'+b['dc']['value'] for b in results['results']['bindings']]
+    return _group(condition_ids, bindings, 'c', lambda b: 'CHEBI:'+b['dc']['value'])
 
 def protein_to_domain(protein_id):
-    wdids = resolve_to_wikidata(protein_id)
-    return flatten([wd_protein_to_domain(x) for x in wdids])
+    return protein_to_domain_batch([protein_id])[protein_id]
+
+def protein_to_domain_batch(protein_ids):
+    return _map_resolved(protein_ids, wd_protein_to_domain_batch)
 
 def wd_protein_to_domain(protein_id):
-    results = run_sparql_query("""
-    SELECT ?dc WHERE {{<{p}> has_part: ?d . ?d InterProID: ?dc }}
-    """.format(p=protein_id), limit=1000)
+    return wd_protein_to_domain_batch([protein_id])[protein_id]
+
+def wd_protein_to_domain_batch(protein_ids):
+    bindings = run_values_query(PROTEIN_TO_DOMAIN, [iri(p) for p in protein_ids])
     # prefix IDs. TODO: consider more generic/metadata-driven way of doing this
-    return ['InterPro:'+b['dc']['value'] for b in results['results']['bindings']]
+    return _group(protein_ids, bindings, 'p', lambda b: 'InterPro:'+b['dc']['value'])
 
 def neighbors(id,**args):
-    wdids = resolve_to_wikidata(id)
-    return flatten([wd_neighbors(x,**args) for x in wdids])
+    return neighbors_batch([id],**args)[id]
+
+def neighbors_batch(ids,**args):
+    return _map_resolved(ids, lambda wdids: wd_neighbors_batch(wdids,**args))
+
 def wd_neighbors(id,subject_category=None,object_category=None):
-    logging.info("Q: {} {} -> {}".format(id, subject_category, object_category))
-    assocs = []
-    for (scat,ocat,pred) in prefix_map.relmap():        
+    return wd_neighbors_batch([id],subject_category,object_category)[id]
+
+def wd_neighbors_batch(ids,subject_category=None,object_category=None):
+    logging.info("Q: {} ids {} -> {}".format(len(ids), subject_category, object_category))
+    assocs = {id: [] for id in ids}
+    for (scat,ocat,pred) in RELMAP:
         if subject_category == scat and object_category == ocat:
-            for (prefix,(cat,is_curie,idp)) in prefix_map.dbprefix2prop().items():
-                logging.info("YO: {} tcat:{} {} -> {}".format(pred, cat, subject_category, object_category))            
+            for (prefix,(cat,is_curie,idp)) in DBPREFIX2PROP.items():
                 if cat == object_category:
-                    results = run_sparql_query("""
-                    SELECT ?o WHERE {{<{s}> <{p}> ?z . ?z <{idp}> ?o }}
-                    """.format(s=id,p=pred,idp=idp), limit=1000)
-                    for b in results['results']['bindings']:
+                    bindings = run_values_query(NEIGHBORS, [iri(id) for id in ids], p=iri(pred), idp=iri(idp))
+                    for b in bindings:
                         obj = b['o']['value']
                         if not is_curie:
                             obj = prefix + ':' + obj
-                        assocs.append({'object':obj})
+                        if b['s']['value'] in assocs:
+                            assocs[b['s']['value']].append({'object':obj})
     return assocs
-                
 
+def _map_resolved(ids, wd_batch_fn):
+    """
+    Resolve ids to WD URIs, apply wd_batch_fn to all URIs at once, and collect results per input id
+    """
+    wdids = resolve_to_wikidata_batch(ids)
+    results = wd_batch_fn(list(dict.fromkeys(flatten(wdids.values()))))
+    return {id: flatten([results[x] for x in xs]) for (id, xs) in wdids.items()}
+
+def _group(keys, bindings, var, fn):
+    m = {k: [] for k in keys}
+    for b in bindings:
+        k = b[var]['value']
+        if k in m:
+            m[k].append(fn(b))
+    return m
 
 # isn't there a standard python function for this?
 def flatten(l):
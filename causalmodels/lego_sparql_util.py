@@ -1,6 +1,6 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
+from biolink.util.sparql import sparql_client, prefix_header, QueryTemplate, iri, literal
 
-sparql = SPARQLWrapper("http://rdf.geneontology.org/sparql")
+sparql = sparql_client("http://rdf.geneontology.org/sparql")
 
 class PrefixMap:
     """
@@ -10,8 +10,10 @@ class PrefixMap:
         return [attr for attr in dir(self) if not callable(getattr(self,attr)) and not attr.startswith("__")]
     def get_uri(self, pfx):
         return vars(PrefixMap).get(pfx)
+    def namespaces(self):
+        return {attr: self.get_uri(attr) for attr in self.prefixes()}
     def gen_header(self):
-        return "\n".join(["prefix {}: <{}>".format(attr,self.get_uri(attr)) for attr in self.prefixes()])
+        return prefix_header(self.namespaces())
     
     directly_activates = 'http://purl.obolibrary.org/obo/RO_0002406'
     directly_positively_regulates = 'http://purl.obolibrary.org/obo/RO_0002629'
@@ -24,13 +26,25 @@ class PrefixMap:
 
 prefix_map = PrefixMap()
 
+# computed once; the prefix map does not change at runtime
+HEADER = prefix_map.gen_header()
+
+MODEL = QueryTemplate("""
+        CONSTRUCT {{ ?i ?p ?v }} WHERE
+        {{?i rdfs:isDefinedBy {model};
+           ?p ?v
+        }}""", header=HEADER)
+
 def lego_query(q,limit=10):
-    full_sparql = "{}\n{}\nLIMIT {}".format(prefix_map.gen_header(),q,limit)
+    full_sparql = "{}\n{}\nLIMIT {}".format(HEADER,q,limit)
     print("FULL:"+full_sparql)
-    sparql.setQuery(full_sparql)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    return results
+    return sparql.query(full_sparql)
+
+def model_query(id, limit=1000):
+    """
+    All triples of the instances of a model
+    """
+    return sparql.query(MODEL.render(limit=limit, model=iri('http://model.geneontology.org/' + id)))
 
 class ModelQuery():
     """
@@ -48,11 +62,10 @@ class ModelQuery():
         filters = []
         #filters.append("FILTER ?p != json_model:")  # die, json_model!
 
-        # TODO: escape quote nastiness
         if self.title is not None:
-            filters.append("FILTER regex(str(?title),'{}','i')".format(self.title))
+            filters.append("FILTER regex(str(?title),{},'i')".format(literal(self.title)))
         if self.contributor is not None:
-            filters.append("FILTER regex(str(?contributor),'{}','i')".format(self.contributor))
+            filters.append("FILTER regex(str(?contributor),{},'i')".format(literal(self.contributor)))
         sparql_filter= "\n".join(filters)
 
         # remember, double curl braces required for interpolation
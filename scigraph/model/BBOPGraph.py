@@ -8,31 +8,44 @@ import requests
 class BBOPGraph:
 
     """
-    foo
-    """
+    In-memory bbop-graph (nodes plus sub-pred-obj edges)
 
-    nodemap = {}
+    Edges are indexed by subject and by object, each further keyed by
+    predicate, so neighbor lookup is proportional to node degree.
+    Nodes and edges are de-duplicated on insertion.
+    """
 
     def __init__(self, obj={}):
         self.nodes = []
         self.edges = []
+        self.nodemap = {}
+        self.edge_keys = set()
+        # node id -> predicate -> [Edge]
+        self.outgoing = {}
+        self.incoming = {}
         self.add_json_graph(obj)
         return
 
     def add_json_graph(self, obj={}):
-        #print(obj)
-        for n in obj['nodes']:
+        for n in obj.get('nodes', []):
             self.add_node(Node(**n))
-        for e in obj['edges']:
+        for e in obj.get('edges', []):
             self.add_edge(Edge(e))
-        #print("EDGES="+str(self.edges))
 
     def add_node(self, n) :
+        if n.id in self.nodemap:
+            return
         self.nodemap[n.id] = n
         self.nodes.append(n)
 
     def add_edge(self, e) :
+        k = e.key()
+        if k in self.edge_keys:
+            return
+        self.edge_keys.add(k)
         self.edges.append(e)
+        self.outgoing.setdefault(e.sub, {}).setdefault(e.pred, []).append(e)
+        self.incoming.setdefault(e.obj, {}).setdefault(e.pred, []).append(e)
 
     def merge(self,g):
         for n in g.nodes:
@@ -40,41 +53,44 @@ class BBOPGraph:
         for e in g.edges:
             self.add_edge(e)
 
+    def has_node(self, id) :
+        return id in self.nodemap
+
     def get_node(self, id) :
         return self.nodemap[id]
 
     def get_lbl(self, id) :
-        return self.nodemap[id].lbl
+        """
+        Label of node, or None if the node is not in this graph
+        """
+        n = self.nodemap.get(id)
+        if n is None:
+            return None
+        return n.lbl
 
     def get_root_nodes(self, relations=[]):
-        roots = []
-        for n in self.nodes:
-            if (len(self.get_outgoing_edges(n.id, relations)) == 0):
-                roots.append(n)
-        return roots
+        return [n for n in self.nodes if not self._has_edges(self.outgoing, n.id, relations)]
 
     def get_leaf_nodes(self, relations=[]):
-        roots = []
-        for n in self.nodes:
-            if (len(self.get_incoming_edges(n.id, relations)) == 0):
-                roots.append(n)
-        return roots
+        return [n for n in self.nodes if not self._has_edges(self.incoming, n.id, relations)]
 
     def get_outgoing_edges(self, nid, relations=[]):
-        el = []
-        for e in self.edges:
-            if (e.sub == nid):
-                if (len(relations) == 0 or e.pred in relations):
-                    el.append(e)
-        return el
+        return self._get_edges(self.outgoing, nid, relations)
 
     def get_incoming_edges(self, nid, relations=[]):
-        el = []
-        for e in self.edges:
-            if (e.obj == nid):
-                if (len(relations) == 0 or e.pred in relations):
-                    el.append(e)
-        return el
+        return self._get_edges(self.incoming, nid, relations)
+
+    def _get_edges(self, index, nid, relations):
+        pmap = index.get(nid, {})
+        if len(relations) == 0:
+            return [e for el in pmap.values() for e in el]
+        return [e for r in relations for e in pmap.get(r, [])]
+
+    def _has_edges(self, index, nid, relations):
+        pmap = index.get(nid, {})
+        if len(relations) == 0:
+            return len(pmap) > 0
+        return any(r in pmap for r in relations)
 
 class Node:
     def __init__(self, id, lbl=None, meta=None):    
@@ -90,6 +106,9 @@ class Edge:
         self.pred = obj['pred']
         self.obj = obj['obj']
     
+    def key(self):
+        return (self.sub, self.pred, self.obj)
+
     def __str__(self):
         return self.sub +"-["+self.pred+"]->"+self.obj
 
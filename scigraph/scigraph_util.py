@@ -4,14 +4,23 @@ __author__ = 'cjm'
 Utility classes for wrapping a SciGraph service
 """
 
+import json
 import logging
+import os
+import threading
 import requests
 import importlib
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+from ontobio.config import get_config
 
 from scigraph.model.BBOPGraph import *
 from scigraph.model.Concept import *
 from scigraph.model.EntityAnnotationResults import *
 from biomodel.core import NamedObject, BioObject, SynonymPropertyValue
+from backendutil.fanout import FanOut
+from backendutil.cache import LRUCache
+from backendutil.singleflight import SingleFlight
 
 # TODO: modularize into vocab/graph/etc?
 
@@ -21,6 +30,96 @@ HAS_ROLE = 'http://purl.obolibrary.org/obo/RO_0000087'
 ENCODES = 'RO:0002205'
 HAS_DBXREF = 'OIO:hasDbXref'
 
+# Transport defaults; see configure_session
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 50
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+RETRY_STATUSES = (500, 502, 503, 504)
+DEFAULT_TIMEOUT = 10
+
+# maximum concurrent neighbor calls per level in traverse
+TRAVERSAL_WORKERS = 16
+
+# (node, relation, direction) lookups made by traverse_chain, shared across requests
+CHAIN_CACHE_SIZE = 10000
+CHAIN_CACHE_TTL = 6 * 3600
+chain_cache = LRUCache(maxsize=CHAIN_CACHE_SIZE, ttl=CHAIN_CACHE_TTL)
+# concurrent chains waiting on the same lookup share one call
+chain_flight = SingleFlight()
+
+_transport = {
+    'pool_connections': POOL_CONNECTIONS,
+    'pool_maxsize': POOL_MAXSIZE,
+    'max_retries': MAX_RETRIES,
+    'backoff_factor': BACKOFF_FACTOR,
+}
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# identical GETs in flight at the same time share one request
+flight = SingleFlight()
+
+def configure_session(**kwargs):
+    """
+    Set transport options for the shared SciGraph session
+
+    Accepts any of pool_connections, pool_maxsize (per host),
+    max_retries and backoff_factor. The current session is discarded,
+    the next request will create a new one with the updated options.
+    """
+    for k in kwargs:
+        if k not in _transport:
+            raise ValueError("Unknown transport option: {}".format(k))
+    with _sessions_lock:
+        _transport.update(kwargs)
+        _sessions.clear()
+
+def get_session():
+    """
+    Return the keep-alive session shared by all SciGraph instances in this process
+
+    Sessions are keyed by pid, so that each forked gunicorn worker opens its
+    own connection pool rather than inheriting sockets from the master.
+    """
+    pid = os.getpid()
+    session = _sessions.get(pid)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(pid)
+            if session is None:
+                session = _new_session(**_transport)
+                _sessions.clear()
+                _sessions[pid] = session
+    return session
+
+def _new_session(pool_connections, pool_maxsize, max_retries, backoff_factor):
+    retry = Retry(total=max_retries,
+                  backoff_factor=backoff_factor,
+                  status_forcelist=RETRY_STATUSES,
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def endpoint_timeout(endpoint):
+    """
+    Look up the timeout (in seconds) for a named endpoint in conf/config.yaml,
+    e.g. scigraph_data or scigraph_ontology
+    """
+    try:
+        ep = getattr(get_config(), endpoint, None)
+    except Exception as e:
+        logging.warning("Could not load config, using default timeout: {}".format(e))
+        ep = None
+    if ep is None or ep.timeout is None:
+        return DEFAULT_TIMEOUT
+    return ep.timeout
+
 class SciGraph:
     """
     Facade object for accessing a SciGraph instance.
@@ -28,13 +127,28 @@ class SciGraph:
     This provides access to both generic methods following a graph-oriented model, and
     domain-specific convenience methods that build in knowledge of different relationship types.
 
+    All instances in a process share a single pooled keep-alive session (see get_session).
+
+    Arguments
+    ---------
+    url
+        base URL of the SciGraph instance
+
+    endpoint
+        name of the endpoint in conf/config.yaml from which the request timeout is taken
+
+    timeout
+        request timeout in seconds; overrides the configured value
     """
 
-    def __init__(self, url=None):
+    def __init__(self, url=None, endpoint='scigraph_ontology', timeout=None):
         if url is not None:
             self.url_prefix = url
         else:
             self.url_prefix = "http://scigraph-ontology.monarchinitiative.org/scigraph/"
+        if timeout is None:
+            timeout = endpoint_timeout(endpoint)
+        self.timeout = timeout
         return
 
     def neighbors(self, id=None, **params):
@@ -94,88 +208,170 @@ class SciGraph:
 
         Returns a BBOPGraph
         """
-        g1 = self.neighbors(id, {'relationshipType':'subClassOf', 'blankNodes':'false', 'direction':'OUTGOING','depth':20})
-        g2 = self.neighbors(id, {'relationshipType':'subClassOf', 'direction':'INCOMING','depth':1})
-        g3 = self.neighbors(id, {'relationshipType':'equivalentClass', 'depth':1})
+        g1 = self.neighbors(id, relationshipType='subClassOf', blankNodes='false', direction='OUTGOING', depth=20)
+        g2 = self.neighbors(id, relationshipType='subClassOf', direction='INCOMING', depth=1)
+        g3 = self.neighbors(id, relationshipType='equivalentClass', depth=1)
         g1.merge(g2)
         g1.merge(g3)
         return g1
 
+    def traverse(self, ids, next_ids=None, max_depth=None, max_nodes=None, **params):
+        """
+        Breadth-first traversal from a set of seed nodes
+
+        Each level of the frontier is expanded with one depth=1 neighbors call
+        per node, all calls for a level issued concurrently. The results are
+        merged into a single de-duplicated BBOPGraph.
+
+        Arguments
+        ---------
+        ids
+            seed node IDs
+
+        next_ids
+            function (id, BBOPGraph) -> list of IDs, called with each node and
+            its neighborhood to select the nodes to visit next (by default,
+            the objects of all edges)
+
+        max_depth
+            maximum number of levels to expand (unlimited if None)
+
+        max_nodes
+            maximum number of nodes to visit (unlimited if None)
+
+        params
+            passed through to neighbors, e.g. relationshipType, direction
+        """
+        if next_ids is None:
+            next_ids = lambda _, nextg: [e.obj for e in nextg.edges]
+        g = BBOPGraph()
+        visited = set()
+        frontier = []
+        for id in ids:
+            if id not in visited:
+                visited.add(id)
+                frontier.append(id)
+        depth = 0
+        while len(frontier) > 0:
+            if max_depth is not None and depth >= max_depth:
+                break
+            fo = FanOut(max_workers=TRAVERSAL_WORKERS)
+            for id in frontier:
+                fo.add(id, self.neighbors, id, depth=1, **params)
+            r = fo.run()
+            r.raise_for_errors()
+            next_frontier = []
+            for id in frontier:
+                nextg = r.get(id)
+                g.merge(nextg)
+                for next_id in next_ids(id, nextg):
+                    if next_id in visited:
+                        continue
+                    if max_nodes is not None and len(visited) >= max_nodes:
+                        logging.warning("Node budget of {} reached; truncating traversal".format(max_nodes))
+                        return g
+                    visited.add(next_id)
+                    next_frontier.append(next_id)
+            frontier = next_frontier
+            depth += 1
+        return g
+
     # TODO: replace with https://github.com/SciGraph/SciGraph/issues/200
-    def cbd(self, id=None):
+    def cbd(self, id=None, max_depth=None, max_nodes=None):
         """
         Returns the Concise Bounded Description of a node
 
         See https://www.w3.org/Submission/CBD/
         """
-        nodes = [id]
-        g=BBOPGraph()
-        while len(nodes)>0:
-            n = nodes.pop()
-            nextg = self.neighbors(n, {'blankNodes':True, 'direction':'OUTGOING','depth':1})
-            for nn in nextg.nodes:
-                if nn.id.startswith("_:"):
-                    n.append(nn.id)
-            g.merge(nextg)
-        return g
-
-    def extract_subgraph(self, ids=[], relationshipType='subClassOf'):
+        return self.traverse([id],
+                             next_ids=lambda _, g: [n.id for n in g.nodes if n.id.startswith("_:")],
+                             max_depth=max_depth,
+                             max_nodes=max_nodes,
+                             blankNodes=True,
+                             direction='OUTGOING')
+
+    def extract_subgraph(self, ids=[], relationshipType='subClassOf', max_depth=None, max_nodes=None):
         """
         Returns subgraph module extracted using list of node IDs as seed
         """
-        g=BBOPGraph()
-        visited=[]
-        while len(ids)>0:
-            id = ids.pop()
-            nextg = self.neighbors(id, {'blankNodes':False, relationshipType: relationshipType, 'direction':'OUTGOING','depth':1})
-            for edge in nextg.edges:
-                next_id = edge.obj
-                if next_id not in visited:
-                    ids.append(next_id)
-                    visited.append(next_id)
-            g.merge(nextg)
-        return g
+        return self.traverse(ids,
+                             next_ids=lambda _, g: [e.obj for e in g.edges],
+                             max_depth=max_depth,
+                             max_nodes=max_nodes,
+                             blankNodes=False,
+                             relationshipType=relationshipType,
+                             direction='OUTGOING')
     
     # TODO - direct SciGraph method?
-    def traverse_chain(self, id=None, rels=[], type=None, blank=True):
+    def traverse_chain(self, id=None, rels=[], type=None, blank=True, memo=None):
         """
         Finds all nodes reachable via a specified chain of relationship types
-        """
-
-        relsr = rels.copy()
-        relsr.reverse()
-        
-        # list of tuples
-        stack = [ (id, relsr) ]
 
+        The chain is followed one relationship at a time, expanding all nodes
+        reached so far concurrently. Each (node, relation, direction) lookup is
+        made at most once per memo; pass the same memo dict to several calls to
+        share lookups between them. Lookups are also kept in the process-wide
+        chain_cache.
+        """
+        if memo is None:
+            memo = {}
         nmap = {}
-        sinks = []
-        while len(stack)>0:
-            (nextid, nextrels) = stack.pop()
-            if len(nextrels) == 0:
-                sinks.append(nextid)
-            else:
-                nextrel = nextrels.pop()
-                nextg = self.neighbors(nextid,
-                                       blankNodes=blank,
-                                       relationshipType=nextrel,
-                                       # works?
-                                       # See https://github.com/SciGraph/SciGraph/issues/135#issuecomment-305097228
-                                       entail=True,   
-                                       direction='OUTGOING',
-                                       depth=1)
+        frontier = [id]
+        for rel in rels:
+            fo = FanOut(max_workers=TRAVERSAL_WORKERS)
+            for nid in frontier:
+                fo.add(nid, self._chain_step, nid, rel, blank, memo)
+            r = fo.run()
+            r.raise_for_errors()
+            next_frontier = []
+            seen = set()
+            for nid in frontier:
+                nextg = r.get(nid)
                 for n in nextg.nodes:
                     nmap[n.id] = n
                 for e in nextg.edges:
-                    if not blank and e.obj.startswith(":"):
+                    if not blank and e.obj.startswith("_:"):
                         continue
-                    stack.append( (e.obj, nextrels.copy()) )
-                
-        sinknodes = [nmap[x] for x in sinks]
+                    if e.obj not in seen:
+                        seen.add(e.obj)
+                        next_frontier.append(e.obj)
+            frontier = next_frontier
+
+        sinknodes = [nmap[x] for x in frontier if x in nmap]
         if type is not None:
             sinknodes = [x for x in sinknodes if type in x.meta.pmap['types']]
         return sinknodes
-            
+
+    def _chain_step(self, id, rel, blank, memo):
+        """
+        Outgoing neighbors of id over rel, memoized
+
+        Returned graphs are shared between callers and must not be modified
+        """
+        key = (self.url_prefix, id, rel, 'OUTGOING', blank)
+        g = memo.get(key)
+        if g is None:
+            g = chain_flight.do(key, self._chain_lookup, key, id, rel, blank, memo)
+            memo[key] = g
+        return g
+
+    def _chain_lookup(self, key, id, rel, blank, memo):
+        # checked again under the flight: a call that just finished has stored its result
+        g = memo.get(key)
+        if g is None:
+            g = chain_cache.get(key, None)
+        if g is None:
+            g = self.neighbors(id,
+                               blankNodes=blank,
+                               relationshipType=rel,
+                               # works?
+                               # See https://github.com/SciGraph/SciGraph/issues/135#issuecomment-305097228
+                               entail=True,
+                               direction='OUTGOING',
+                               depth=1)
+            chain_cache.put(key, g)
+        memo[key] = g
+        return g
     
     def autocomplete(self, term=None):
         """
@@ -209,7 +405,8 @@ class SciGraph:
             url += "/" +q;
         if format is not None:
             url = url  + "." + format;
-        r = requests.get(url, params=params)
+        key = (url, json.dumps(params, sort_keys=True, default=str))
+        r = flight.do(key, get_session().get, url, params=params, timeout=self.timeout)
         return r
 
     # Simple mapping from bbop graphs to domain-specific objects
@@ -241,11 +438,17 @@ class SciGraph:
 
         This method may be retired in future. See https://github.com/monarch-initiative/dipper/issues/461
         """
-        objs = self.traverse_chain(id, [ENCODES, HAS_DBXREF], blank=False)
+        # both chains run concurrently, sharing lookups
+        memo = {}
+        fo = FanOut()
+        fo.add('direct', self.traverse_chain, id, [ENCODES, HAS_DBXREF], blank=False, memo=memo)
 
         # This second step is expensive and will no longer be required when https://github.com/SciGraph/SciGraph/issues/135
         # is implemented
-        objs += self.traverse_chain(id, ['equivalentClass', ENCODES, HAS_DBXREF], blank=False)
+        fo.add('equivalent', self.traverse_chain, id, ['equivalentClass', ENCODES, HAS_DBXREF], blank=False, memo=memo)
+        r = fo.run()
+        r.raise_for_errors()
+        objs = r.get('direct') + r.get('equivalent')
         return [x.id for x in objs]
 
     def phenotype_to_entity_list(self, id):
@@ -0,0 +1,35 @@
+from scigraph.model.BBOPGraph import BBOPGraph
+
+def node(id):
+    return {'id': id, 'lbl': id.lower(), 'meta': {'types': ['Class']}}
+
+def edge(s, p, o):
+    return {'sub': s, 'pred': p, 'obj': o}
+
+g1 = {'nodes': [node('A'), node('B'), node('C')],
+      'edges': [edge('B', 'subClassOf', 'A'), edge('C', 'subClassOf', 'B'), edge('C', 'part_of', 'A')]}
+g2 = {'nodes': [node('C'), node('D')],
+      'edges': [edge('C', 'subClassOf', 'B'), edge('D', 'subClassOf', 'C')]}
+
+def test_adjacency():
+    g = BBOPGraph(g1)
+    assert len(g.get_outgoing_edges('C')) == 2
+    assert [e.obj for e in g.get_outgoing_edges('C', ['part_of'])] == ['A']
+    assert [e.sub for e in g.get_incoming_edges('A', ['subClassOf'])] == ['B']
+    assert [n.id for n in g.get_root_nodes()] == ['A']
+    assert [n.id for n in g.get_root_nodes(['part_of'])] == ['A', 'B']
+    assert [n.id for n in g.get_leaf_nodes()] == ['C']
+
+def test_merge_dedup():
+    g = BBOPGraph(g1)
+    g.merge(BBOPGraph(g2))
+    assert [n.id for n in g.nodes] == ['A', 'B', 'C', 'D']
+    assert len(g.edges) == 4
+    assert [n.id for n in g.get_leaf_nodes()] == ['D']
+
+def test_per_instance_nodemap():
+    g = BBOPGraph(g2)
+    empty = BBOPGraph()
+    assert not empty.has_node('D')
+    assert g.get_lbl('D') == 'd'
+    assert g.get_lbl('A') is None
@@ -0,0 +1,24 @@
+from scigraph.scigraph_util import SciGraph, get_session, configure_session, POOL_MAXSIZE
+
+def test_shared_session():
+    sg1 = SciGraph()
+    sg2 = SciGraph(url='https://scigraph-data.monarchinitiative.org/scigraph/', endpoint='scigraph_data')
+    assert get_session() is get_session()
+    adapter = get_session().get_adapter('https://scigraph-data.monarchinitiative.org/')
+    assert adapter._pool_maxsize == POOL_MAXSIZE
+    assert sg1.timeout is not None
+    assert sg2.timeout is not None
+
+def test_configure_session():
+    s1 = get_session()
+    configure_session(pool_maxsize=5, max_retries=1)
+    s2 = get_session()
+    assert s1 is not s2
+    adapter = s2.get_adapter('http://example.org/')
+    assert adapter._pool_maxsize == 5
+    assert adapter.max_retries.total == 1
+    configure_session(pool_maxsize=POOL_MAXSIZE, max_retries=3)
+
+def test_explicit_timeout():
+    sg = SciGraph(timeout=7)
+    assert sg.timeout == 7
@@ -0,0 +1,76 @@
+from scigraph.scigraph_util import SciGraph, ENCODES, HAS_DBXREF
+from scigraph.model.BBOPGraph import BBOPGraph
+
+# chain D -> C -> B -> A, plus D -> B
+PARENTS = {'D': ['C', 'B'], 'C': ['B'], 'B': ['A'], 'A': []}
+
+class FakeSciGraph(SciGraph):
+    def __init__(self):
+        super().__init__(timeout=1)
+        self.calls = []
+
+    def neighbors(self, id=None, **params):
+        self.calls.append((id, params))
+        nodes = [{'id': x, 'lbl': x, 'meta': {'types': []}} for x in [id] + PARENTS[id]]
+        edges = [{'sub': id, 'pred': 'subClassOf', 'obj': x} for x in PARENTS[id]]
+        return BBOPGraph({'nodes': nodes, 'edges': edges})
+
+def test_extract_subgraph():
+    sg = FakeSciGraph()
+    g = sg.extract_subgraph(['D'])
+    assert sorted(n.id for n in g.nodes) == ['A', 'B', 'C', 'D']
+    assert len(g.edges) == 4
+    # each node expanded exactly once, with filters applied
+    assert sorted(c[0] for c in sg.calls) == ['A', 'B', 'C', 'D']
+    assert all(c[1]['relationshipType'] == 'subClassOf' and c[1]['depth'] == 1 for c in sg.calls)
+
+def test_budget():
+    sg = FakeSciGraph()
+    g = sg.extract_subgraph(['D'], max_depth=1)
+    assert sorted(c[0] for c in sg.calls) == ['D']
+    assert sorted(n.id for n in g.nodes) == ['B', 'C', 'D']
+    sg = FakeSciGraph()
+    sg.extract_subgraph(['D'], max_nodes=2)
+    assert len(sg.calls) == 1
+
+# gene -encodes-> protein -xref-> uniprot; gene -equivalentClass-> gene2 -encodes-> protein
+CHAIN = {('G', ENCODES): ['P'], ('P', HAS_DBXREF): ['UniProtKB:1'],
+         ('G', 'equivalentClass'): ['G2'], ('G2', ENCODES): ['P']}
+
+class FakeChainSciGraph(FakeSciGraph):
+    def neighbors(self, id=None, relationshipType=None, **params):
+        import time
+        self.calls.append((id, relationshipType))
+        # the direct chain's xref lookup is still in flight when the other chain reaches P
+        time.sleep(0.2 if (id, relationshipType) == ('P', HAS_DBXREF) else 0.02)
+        objs = CHAIN.get((id, relationshipType), [])
+        nodes = [{'id': x, 'lbl': x, 'meta': {'types': []}} for x in [id] + objs]
+        edges = [{'sub': id, 'pred': relationshipType, 'obj': x} for x in objs]
+        return BBOPGraph({'nodes': nodes, 'edges': edges})
+
+def test_traverse_chain_memo():
+    from scigraph.scigraph_util import chain_cache
+    chain_cache.clear()
+    sg = FakeChainSciGraph()
+    memo = {}
+    sinks = sg.traverse_chain('G', ['equivalentClass', ENCODES, HAS_DBXREF], memo=memo)
+    assert [n.id for n in sinks] == ['UniProtKB:1']
+    sinks = sg.traverse_chain('G', [ENCODES, HAS_DBXREF], memo=memo)
+    assert [n.id for n in sinks] == ['UniProtKB:1']
+    # (P, xref) looked up once only
+    assert sg.calls.count(('P', HAS_DBXREF)) == 1
+    # both chains share lookups, including one in flight when the second chain needs it
+    chain_cache.clear()
+    sg2 = FakeChainSciGraph()
+    assert sg2.gene_to_uniprot_proteins('G') == ['UniProtKB:1', 'UniProtKB:1']
+    assert sorted(sg2.calls) == sorted([('G', ENCODES), ('G', 'equivalentClass'), ('G2', ENCODES), ('P', HAS_DBXREF)])
+    # a second instance hits the process-wide cache
+    sg3 = FakeChainSciGraph()
+    assert sg3.gene_to_uniprot_proteins('G') == ['UniProtKB:1', 'UniProtKB:1']
+    assert sg3.calls == []
+
+def test_traverse_default():
+    sg = FakeSciGraph()
+    g = sg.traverse(['D'], relationshipType='subClassOf')
+    assert sorted(n.id for n in g.nodes) == ['A', 'B', 'C', 'D']
+    assert sorted(c[0] for c in sg.calls) == ['A', 'B', 'C', 'D']
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""
+Per-query overhead of building Wikidata SPARQL queries, before and after
+precomputing the prefix header and templates. No queries are sent.
+
+    PYTHONPATH=. python util/bench-sparql-templates.py
+"""
+
+import timeit
+
+from biowikidata.wd_sparql import prefix_map, DBPREFIX2PROP, RELMAP, NEIGHBORS
+from biolink.util.sparql import iri
+
+N = 20000
+ID = 'http://www.wikidata.org/entity/Q35869'
+
+def gen_header():
+    # the original PrefixMap.gen_header, which ran for every query
+    return "\n".join(["prefix {}: <{}>".format(attr, prefix_map.get_uri(attr)) for attr in prefix_map.prefixes()])
+
+def before():
+    # header rebuilt by reflection and maps rebuilt inside the loops, as wd_neighbors did
+    for (scat, ocat, pred) in prefix_map.relmap():
+        for (prefix, (cat, is_curie, idp)) in prefix_map.dbprefix2prop().items():
+            if cat == 'domain':
+                q = """
+                SELECT ?o WHERE {{<{s}> <{p}> ?z . ?z <{idp}> ?o }}
+                """.format(s=ID, p=pred, idp=idp)
+                "{}\n{}\nLIMIT {}".format(gen_header(), q, 1000)
+
+def after():
+    for (scat, ocat, pred) in RELMAP:
+        for (prefix, (cat, is_curie, idp)) in DBPREFIX2PROP.items():
+            if cat == 'domain':
+                NEIGHBORS.render(limit=1000, values=iri(ID), p=iri(pred), idp=iri(idp))
+
+if __name__ == "__main__":
+    for fn in [before, after]:
+        t = min(timeit.repeat(fn, number=N, repeat=3))
+        print("{:8s} {:7.2f} us/query".format(fn.__name__, t / N * 1e6))